@@ -1,7 +1,8 @@
 use anyhow::Result;
 use axum::{
-    extract::{Json, State},
-    http::StatusCode,
+    body::{Body, Bytes},
+    extract::{Json, Query, State},
+    http::{header, HeaderMap, StatusCode},
     middleware,
     response::{IntoResponse, Response},
     routing::{get, post},
@@ -9,19 +10,32 @@ use axum::{
 };
 use serde::{Deserialize, Serialize};
 use serde_json::{json, Value};
+use hyper::body::Frame;
+use std::convert::Infallible;
+use std::pin::Pin;
+use std::sync::atomic::AtomicBool;
+use std::sync::Arc;
+use std::task::{Context, Poll};
+use std::time::Duration;
+use tokio::sync::mpsc;
 use tower_http::cors::CorsLayer;
 use tracing::{info, debug, error};
 
 use crate::auth::{AuthConfig, auth_middleware};
 use crate::tcl_tools::{TclToolBox, TclExecuteRequest, TclToolAddRequest, TclToolRemoveRequest, TclToolListRequest, TclExecToolRequest};
-use crate::tcl_executor::TclExecutor;
+use crate::tcl_executor::{TclExecutor, ExecutorConfig, Cancellations, ServerBusy, SERVER_BUSY_CODE};
 use crate::namespace::ToolPath;
 use crate::tcl_runtime::RuntimeConfig;
+use crate::tool_listing::{RenderedToolList, ToolListCache, system_tool_entry};
+use crate::streaming::{forward_output, script_output_channel, SCRIPT_OUTPUT_CAPACITY};
 
 #[derive(Clone)]
 pub struct HttpMcpServer {
     tool_box: TclToolBox,
     privileged: bool,
+    listing: Arc<ToolListCache>,
+    /// Running `tools/call` requests, for `notifications/cancelled`
+    cancellations: Cancellations,
 }
 
 #[derive(Debug, Serialize, Deserialize)]
@@ -58,6 +72,11 @@ pub struct McpListToolsResult {
     pub tools: Vec<McpToolInfo>,
 }
 
+#[derive(Debug, Serialize, Deserialize)]
+pub struct McpListToolsParams {
+    pub cursor: Option<String>,
+}
+
 #[derive(Debug, Serialize, Deserialize)]
 pub struct McpCallToolParams {
     pub name: String,
@@ -80,15 +99,29 @@ impl HttpMcpServer {
     pub fn new(privileged: bool) -> Self {
         let executor = TclExecutor::spawn(privileged);
         let tool_box = TclToolBox::new(executor);
+        let listing = Arc::new(system_tool_listing(privileged));
         
-        Self { tool_box, privileged }
+        Self { tool_box, privileged, listing, cancellations: Cancellations::default() }
     }
     
     pub fn new_with_runtime(privileged: bool, runtime_config: RuntimeConfig) -> Result<Self, String> {
-        let executor = TclExecutor::spawn_with_runtime(privileged, runtime_config)?;
+        Self::new_with_config(privileged, runtime_config, ExecutorConfig::default())
+    }
+    
+    pub fn new_with_config(privileged: bool, runtime_config: RuntimeConfig, executor_config: ExecutorConfig) -> Result<Self, String> {
+        let executor = TclExecutor::spawn_pool(privileged, runtime_config, executor_config)?;
         let tool_box = TclToolBox::new(executor);
+        let listing = Arc::new(system_tool_listing(privileged));
         
-        Ok(Self { tool_box, privileged })
+        Ok(Self { tool_box, privileged, listing, cancellations: Cancellations::default() })
+    }
+    
+    /// A server whose script runs stop once `cancel` is set
+    fn with_cancel(&self, cancel: Arc<AtomicBool>) -> Self {
+        Self {
+            tool_box: self.tool_box.with_cancel(cancel),
+            ..self.clone()
+        }
     }
     
     pub async fn initialize_persistence(&self) -> Result<()> {
@@ -114,6 +147,7 @@ impl HttpMcpServer {
             .route("/initialize", post(handle_initialize))
             .route("/tools/list", get(handle_tools_list))
             .route("/tools/call", post(handle_tools_call))
+            .route("/stats", get(handle_stats))
             .route("/auth/generate-key", post(generate_api_key_endpoint))
             .layer(middleware::from_fn_with_state(auth_config.clone(), auth_middleware))
             .layer(CorsLayer::permissive())
@@ -135,200 +169,18 @@ impl HttpMcpServer {
         }))
     }
     
-    async fn handle_tools_list(&self) -> Result<McpListToolsResult, McpError> {
+    async fn handle_tools_list(&self, cursor: Option<String>) -> Result<Arc<RenderedToolList>, McpError> {
         debug!("MCP tools/list called (privileged: {})", self.privileged);
         
-        let mut tools = vec![];
-        
-        // Add system tools with MCP-compatible names
-        let mut system_tools = vec![
-            (ToolPath::bin("tcl_execute"), "Execute a TCL script and return the result", json!({
-                "$schema": "https://json-schema.org/draft/2020-12/schema",
-                "type": "object",
-                "properties": {
-                    "script": {
-                        "type": "string",
-                        "description": "TCL script to execute"
-                    }
-                },
-                "required": ["script"]
-            })),
-            (ToolPath::bin("tcl_tool_list"), "List all available TCL tools", json!({
-                "$schema": "https://json-schema.org/draft/2020-12/schema",
-                "type": "object",
-                "properties": {
-                    "namespace": {
-                        "type": "string",
-                        "description": "Filter tools by namespace (optional)"
-                    },
-                    "filter": {
-                        "type": "string",
-                        "description": "Filter tools by name pattern (optional)"
-                    }
-                }
-            })),
-            (ToolPath::docs("molt_book"), "Access Molt TCL interpreter documentation and examples", json!({
-                "$schema": "https://json-schema.org/draft/2020-12/schema",
-                "type": "object",
-                "properties": {
-                    "topic": {
-                        "type": "string",
-                        "description": "Documentation topic: 'overview', 'commands', 'examples', 'links', or 'basic_syntax'",
-                        "enum": ["overview", "commands", "examples", "links", "basic_syntax"]
-                    }
-                },
-                "required": ["topic"]
-            })),
-            (ToolPath::bin("exec_tool"), "Execute a tool by its path with parameters", json!({
-                "$schema": "https://json-schema.org/draft/2020-12/schema",
-                "type": "object",
-                "properties": {
-                    "tool_path": {
-                        "type": "string",
-                        "description": "Full path to the tool (e.g., '/bin/list_dir')"
-                    },
-                    "params": {
-                        "type": "object",
-                        "description": "Parameters to pass to the tool",
-                        "default": {}
-                    }
-                },
-                "required": ["tool_path"]
-            })),
-            (ToolPath::bin("discover_tools"), "Discover and index tools from the filesystem", json!({
-                "$schema": "https://json-schema.org/draft/2020-12/schema",
-                "type": "object",
-                "properties": {}
-            })),
-        ];
-        
-        // Add privileged tools only if in privileged mode
-        if self.privileged {
-            system_tools.push((ToolPath::sbin("tcl_tool_add"), "Add a new TCL tool to the available tools (PRIVILEGED)", json!({
-                "$schema": "https://json-schema.org/draft/2020-12/schema",
-                "type": "object",
-                "properties": {
-                    "user": {
-                        "type": "string",
-                        "description": "User namespace"
-                    },
-                    "package": {
-                        "type": "string",
-                        "description": "Package name"
-                    },
-                    "name": {
-                        "type": "string",
-                        "description": "Name of the new tool"
-                    },
-                    "version": {
-                        "type": "string",
-                        "description": "Version of the tool (defaults to 'latest')",
-                        "default": "latest"
-                    },
-                    "description": {
-                        "type": "string",
-                        "description": "Description of what the tool does"
-                    },
-                    "script": {
-                        "type": "string",
-                        "description": "TCL script that implements the tool"
-                    },
-                    "parameters": {
-                        "type": "array",
-                        "description": "Parameters that the tool accepts",
-                        "items": {
-                            "type": "object",
-                            "properties": {
-                                "name": { "type": "string" },
-                                "description": { "type": "string" },
-                                "required": { "type": "boolean" },
-                                "type_name": { "type": "string" }
-                            },
-                            "required": ["name", "description", "required", "type_name"]
-                        }
-                    }
-                },
-                "required": ["user", "package", "name", "description", "script"]
-            })));
-            system_tools.push((ToolPath::sbin("tcl_tool_remove"), "Remove a TCL tool from the available tools (PRIVILEGED)", json!({
-                "$schema": "https://json-schema.org/draft/2020-12/schema",
-                "type": "object",
-                "properties": {
-                    "path": {
-                        "type": "string",
-                        "description": "Full tool path (e.g., '/alice/utils/reverse_string:1.0')"
-                    }
-                },
-                "required": ["path"]
-            })));
-        }
-        
-        for (path, description, schema) in system_tools {
-            tools.push(McpToolInfo {
-                name: path.to_mcp_name(),
-                description: Some(format!("{} [{}]", description, path)),
-                input_schema: schema,
-            });
-        }
-        
-        // Get custom tools
-        let custom_tools = self.tool_box.get_tool_definitions().await.map_err(|e| {
-            McpError {
+        let page = self.tool_box.list_tools_page(cursor).await.map_err(|e| {
+            McpError::busy(&e).unwrap_or_else(|| McpError {
                 code: -32603,
                 message: format!("Failed to get tool definitions: {}", e),
                 data: None,
-            }
+            })
         })?;
         
-        // Add custom tools to the list
-        for tool_def in custom_tools {
-            let mut properties = serde_json::Map::new();
-            let mut required = Vec::new();
-            
-            for param in &tool_def.parameters {
-                let json_type = match param.type_name.to_lowercase().as_str() {
-                    "string" | "str" | "text" => "string",
-                    "number" | "float" | "double" | "real" => "number",
-                    "integer" | "int" | "long" => "integer", 
-                    "boolean" | "bool" => "boolean",
-                    "array" | "list" => "array",
-                    "object" | "dict" | "map" => "object",
-                    "null" | "nil" | "none" => "null",
-                    _ => "string"
-                };
-                
-                properties.insert(
-                    param.name.clone(),
-                    json!({
-                        "type": json_type,
-                        "description": param.description,
-                    }),
-                );
-                
-                if param.required {
-                    required.push(param.name.clone());
-                }
-            }
-            
-            let mut schema_obj = serde_json::Map::new();
-            schema_obj.insert("$schema".to_string(), json!("https://json-schema.org/draft/2020-12/schema"));
-            schema_obj.insert("type".to_string(), json!("object"));
-            schema_obj.insert("properties".to_string(), json!(properties));
-            
-            if !required.is_empty() {
-                schema_obj.insert("required".to_string(), json!(required));
-            }
-            
-            let input_schema = serde_json::Value::Object(schema_obj);
-            
-            tools.push(McpToolInfo {
-                name: tool_def.path.to_mcp_name(),
-                description: Some(format!("{} [{}]", tool_def.description, tool_def.path)),
-                input_schema,
-            });
-        }
-        
-        Ok(McpListToolsResult { tools })
+        Ok(self.listing.render(&page))
     }
     
     async fn handle_tools_call(&self, params: McpCallToolParams) -> Result<McpCallToolResult, McpError> {
@@ -597,8 +449,8 @@ For Molt-specific capabilities and limitations, refer to the Molt Book."#)),
                     _ => Err(anyhow::anyhow!("Unknown documentation topic: {}. Available topics: overview, basic_syntax, commands, examples, links", topic))
                 }
             }
-            mcp_name => {
-                self.tool_box.execute_custom_tool(mcp_name, params.arguments).await
+            _ => {
+                self.tool_box.execute_custom_tool(params.name, params.arguments).await
             }
         };
         
@@ -606,15 +458,195 @@ For Molt-specific capabilities and limitations, refer to the Molt Book."#)),
             Ok(text) => Ok(McpCallToolResult {
                 content: vec![McpContent::Text { text }],
             }),
-            Err(e) => Err(McpError {
+            Err(e) => Err(McpError::busy(&e).unwrap_or_else(|| McpError {
                 code: -32603,
                 message: e.to_string(),
                 data: None,
-            }),
+            })),
         }
     }
 }
 
+impl McpError {
+    /// The "server busy" error for a request the executor queue turned away
+    fn busy(error: &anyhow::Error) -> Option<Self> {
+        error.downcast_ref::<ServerBusy>().map(|busy| McpError {
+            code: SERVER_BUSY_CODE,
+            message: busy.to_string(),
+            data: Some(json!({ "retryAfterMs": busy.retry_after.as_millis() as u64 })),
+        })
+    }
+    
+    /// How long a client should back off for, if this is a "server busy" error
+    fn retry_after(&self) -> Option<Duration> {
+        if self.code != SERVER_BUSY_CODE {
+            return None;
+        }
+        self.data.as_ref()
+            .and_then(|data| data.get("retryAfterMs"))
+            .and_then(Value::as_u64)
+            .map(Duration::from_millis)
+    }
+    
+    /// The error as a plain HTTP response: 503 with `Retry-After` when the server
+    /// is busy, 500 otherwise
+    fn into_http_response(self) -> Response {
+        let body = Json(json!({ "error": self.message }));
+        match self.retry_after() {
+            Some(retry_after) => (
+                StatusCode::SERVICE_UNAVAILABLE,
+                [(header::RETRY_AFTER, retry_after_secs(retry_after))],
+                body,
+            ).into_response(),
+            None => (StatusCode::INTERNAL_SERVER_ERROR, body).into_response(),
+        }
+    }
+}
+
+/// A `Retry-After` value in whole seconds, rounded up
+fn retry_after_secs(retry_after: Duration) -> String {
+    let millis = retry_after.as_millis().max(1);
+    ((millis + 999) / 1000).to_string()
+}
+
+/// Build the fixed part of the `tools/list` result for the given privilege level
+fn system_tool_listing(privileged: bool) -> ToolListCache {
+    let mut tools = vec![];
+    
+    // Add system tools with MCP-compatible names
+    let mut system_tools = vec![
+        (ToolPath::bin("tcl_execute"), "Execute a TCL script and return the result", json!({
+            "$schema": "https://json-schema.org/draft/2020-12/schema",
+            "type": "object",
+            "properties": {
+                "script": {
+                    "type": "string",
+                    "description": "TCL script to execute"
+                },
+                "timeout_ms": {
+                    "type": "integer",
+                    "description": "Stop the script after this many milliseconds (optional)"
+                }
+            },
+            "required": ["script"]
+        })),
+        (ToolPath::bin("tcl_tool_list"), "List all available TCL tools", json!({
+            "$schema": "https://json-schema.org/draft/2020-12/schema",
+            "type": "object",
+            "properties": {
+                "namespace": {
+                    "type": "string",
+                    "description": "Filter tools by namespace (optional)"
+                },
+                "filter": {
+                    "type": "string",
+                    "description": "Filter tools by name pattern (optional)"
+                }
+            }
+        })),
+        (ToolPath::docs("molt_book"), "Access Molt TCL interpreter documentation and examples", json!({
+            "$schema": "https://json-schema.org/draft/2020-12/schema",
+            "type": "object",
+            "properties": {
+                "topic": {
+                    "type": "string",
+                    "description": "Documentation topic: 'overview', 'commands', 'examples', 'links', or 'basic_syntax'",
+                    "enum": ["overview", "commands", "examples", "links", "basic_syntax"]
+                }
+            },
+            "required": ["topic"]
+        })),
+        (ToolPath::bin("exec_tool"), "Execute a tool by its path with parameters", json!({
+            "$schema": "https://json-schema.org/draft/2020-12/schema",
+            "type": "object",
+            "properties": {
+                "tool_path": {
+                    "type": "string",
+                    "description": "Full path to the tool (e.g., '/bin/list_dir')"
+                },
+                "params": {
+                    "type": "object",
+                    "description": "Parameters to pass to the tool",
+                    "default": {}
+                }
+            },
+            "required": ["tool_path"]
+        })),
+        (ToolPath::bin("discover_tools"), "Discover and index tools from the filesystem", json!({
+            "$schema": "https://json-schema.org/draft/2020-12/schema",
+            "type": "object",
+            "properties": {}
+        })),
+    ];
+    
+    // Add privileged tools only if in privileged mode
+    if privileged {
+        system_tools.push((ToolPath::sbin("tcl_tool_add"), "Add a new TCL tool to the available tools (PRIVILEGED)", json!({
+            "$schema": "https://json-schema.org/draft/2020-12/schema",
+            "type": "object",
+            "properties": {
+                "user": {
+                    "type": "string",
+                    "description": "User namespace"
+                },
+                "package": {
+                    "type": "string",
+                    "description": "Package name"
+                },
+                "name": {
+                    "type": "string",
+                    "description": "Name of the new tool"
+                },
+                "version": {
+                    "type": "string",
+                    "description": "Version of the tool (defaults to 'latest')",
+                    "default": "latest"
+                },
+                "description": {
+                    "type": "string",
+                    "description": "Description of what the tool does"
+                },
+                "script": {
+                    "type": "string",
+                    "description": "TCL script that implements the tool"
+                },
+                "parameters": {
+                    "type": "array",
+                    "description": "Parameters that the tool accepts",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "name": { "type": "string" },
+                            "description": { "type": "string" },
+                            "required": { "type": "boolean" },
+                            "type_name": { "type": "string" }
+                        },
+                        "required": ["name", "description", "required", "type_name"]
+                    }
+                }
+            },
+            "required": ["user", "package", "name", "description", "script"]
+        })));
+        system_tools.push((ToolPath::sbin("tcl_tool_remove"), "Remove a TCL tool from the available tools (PRIVILEGED)", json!({
+            "$schema": "https://json-schema.org/draft/2020-12/schema",
+            "type": "object",
+            "properties": {
+                "path": {
+                    "type": "string",
+                    "description": "Full tool path (e.g., '/alice/utils/reverse_string:1.0')"
+                }
+            },
+            "required": ["path"]
+        })));
+    }
+    
+    for (path, description, schema) in system_tools {
+        tools.push(system_tool_entry(&path, description, schema));
+    }
+    
+    ToolListCache::new(tools)
+}
+
 // HTTP handlers
 async fn health_check() -> impl IntoResponse {
     json!({
@@ -626,22 +658,201 @@ async fn health_check() -> impl IntoResponse {
 
 async fn handle_mcp_request(
     State(server): State<HttpMcpServer>,
-    Json(request): Json<McpRequest>,
-) -> Result<Json<McpResponse>, Response> {
+    headers: HeaderMap,
+    Json(body): Json<Value>,
+) -> Response {
+    match body {
+        Value::Array(requests) => handle_mcp_batch(server, requests).await,
+        request => match stream_token(&headers, &request) {
+            Some(token) => stream_mcp_request(server, request, token),
+            None => dispatch_mcp_value(server, request).await.into_response(),
+        },
+    }
+}
+
+/// The progress token of a `tools/call` whose output should be streamed: the client
+/// asked for progress and accepts server-sent events
+fn stream_token(headers: &HeaderMap, request: &Value) -> Option<Value> {
+    let accepts_events = headers.get_all(header::ACCEPT).iter()
+        .filter_map(|value| value.to_str().ok())
+        .any(|value| value.contains("text/event-stream"));
+    
+    if accepts_events && request.get("method").and_then(Value::as_str) == Some("tools/call") {
+        request.pointer("/params/_meta/progressToken").cloned()
+    } else {
+        None
+    }
+}
+
+/// Answer a `tools/call` with a server-sent event stream: the script's output as
+/// progress notifications while it runs, then the response. The stream starts
+/// before the script does, and output is buffered only up to the channel capacity.
+fn stream_mcp_request(server: HttpMcpServer, request: Value, token: Value) -> Response {
+    let (output, chunks) = script_output_channel();
+    let (events, stream) = mpsc::channel::<String>(SCRIPT_OUTPUT_CAPACITY);
+    let server = HttpMcpServer {
+        tool_box: server.tool_box.with_output(output),
+        ..server
+    };
+    
+    let notifications = events.clone();
+    let forwarder = tokio::task::spawn_blocking(move || {
+        forward_output(chunks, &token, |notification| {
+            notifications.blocking_send(sse_event(&notification)).is_ok()
+        })
+    });
+    
+    tokio::spawn(async move {
+        let reply = dispatch_mcp_value(server, request).await;
+        // The output stream has ended with the call; send what is left of it first
+        let _ = forwarder.await;
+        let _ = events.send(sse_event(&reply.body)).await;
+    });
+    
+    (
+        StatusCode::OK,
+        [
+            (header::CONTENT_TYPE, "text/event-stream"),
+            (header::CACHE_CONTROL, "no-cache"),
+        ],
+        Body::new(EventStream { events: stream }),
+    ).into_response()
+}
+
+fn sse_event(data: &str) -> String {
+    format!("event: message\ndata: {}\n\n", data)
+}
+
+/// Response body written from a channel of server-sent events as they arrive
+struct EventStream {
+    events: mpsc::Receiver<String>,
+}
+
+impl hyper::body::Body for EventStream {
+    type Data = Bytes;
+    type Error = Infallible;
+    
+    fn poll_frame(mut self: Pin<&mut Self>, cx: &mut Context<'_>) -> Poll<Option<Result<Frame<Bytes>, Infallible>>> {
+        self.events.poll_recv(cx).map(|event| event.map(|event| Ok(Frame::data(Bytes::from(event)))))
+    }
+}
+
+/// Answer a JSON-RPC batch. Every entry is dispatched at once, so the `tools/call`
+/// entries of a batch run in parallel across the interpreter pool; the replies are
+/// returned in request order.
+async fn handle_mcp_batch(server: HttpMcpServer, requests: Vec<Value>) -> Response {
+    debug!("Received MCP batch of {} requests", requests.len());
+    
+    if requests.is_empty() {
+        return invalid_request_reply("empty batch".to_string()).into_response();
+    }
+    
+    let pending: Vec<_> = requests.into_iter()
+        .map(|request| tokio::spawn(dispatch_mcp_value(server.clone(), request)))
+        .collect();
+    
+    let mut replies = Vec::with_capacity(pending.len());
+    for reply in pending {
+        let reply = match reply.await {
+            Ok(reply) => reply,
+            Err(e) => error_reply(None, McpError {
+                code: -32603,
+                message: format!("Request failed: {}", e),
+                data: None,
+            }),
+        };
+        // Notifications have no entry in the batch reply
+        if !reply.body.is_empty() {
+            replies.push(reply.body);
+        }
+    }
+    
+    if replies.is_empty() {
+        return StatusCode::ACCEPTED.into_response();
+    }
+    
+    (
+        StatusCode::OK,
+        [(header::CONTENT_TYPE, "application/json")],
+        format!("[{}]", replies.join(",")),
+    ).into_response()
+}
+
+/// A serialized MCP response, with the entity tag of its result when it has one.
+/// Notifications are answered with an empty body.
+struct McpReply {
+    body: String,
+    etag: Option<String>,
+    /// Set when the request was turned away because the server is busy
+    retry_after: Option<Duration>,
+}
+
+impl IntoResponse for McpReply {
+    fn into_response(self) -> Response {
+        if self.body.is_empty() {
+            return StatusCode::ACCEPTED.into_response();
+        }
+        
+        if let Some(retry_after) = self.retry_after {
+            return (
+                StatusCode::SERVICE_UNAVAILABLE,
+                [
+                    (header::CONTENT_TYPE, "application/json".to_string()),
+                    (header::RETRY_AFTER, retry_after_secs(retry_after)),
+                ],
+                self.body,
+            ).into_response();
+        }
+        
+        match self.etag {
+            Some(etag) => json_body_response(StatusCode::OK, &etag, self.body),
+            None => (StatusCode::OK, [(header::CONTENT_TYPE, "application/json")], self.body).into_response(),
+        }
+    }
+}
+
+async fn dispatch_mcp_value(server: HttpMcpServer, request: Value) -> McpReply {
+    match serde_json::from_value::<McpRequest>(request) {
+        Ok(request) => dispatch_mcp_request(&server, request).await,
+        Err(e) => invalid_request_reply(e.to_string()),
+    }
+}
+
+async fn dispatch_mcp_request(server: &HttpMcpServer, request: McpRequest) -> McpReply {
     debug!("Received MCP request: {:?}", request);
     
     let result = match request.method.as_str() {
         "initialize" => server.handle_initialize().await,
-        "tools/list" => server.handle_tools_list().await.map(|r| serde_json::to_value(r).unwrap()),
+        "tools/list" => match server.handle_tools_list(list_cursor(request.params.as_ref())).await {
+            // The listing is already serialized, so splice it into the envelope as is
+            Ok(listing) => {
+                let id = serde_json::to_string(&request.id).unwrap_or_else(|_| "null".to_string());
+                return McpReply {
+                    body: format!(r#"{{"result":{},"error":null,"id":{}}}"#, listing.body, id),
+                    etag: Some(listing.etag.clone()),
+                    retry_after: None,
+                };
+            }
+            Err(error) => Err(error),
+        },
         "tools/call" => {
             if let Some(params) = request.params {
-                let call_params: McpCallToolParams = serde_json::from_value(params)
-                    .map_err(|e| McpError {
+                match serde_json::from_value::<McpCallToolParams>(params) {
+                    Ok(call_params) => {
+                        // Registered under its id while it runs, so it can be cancelled
+                        let tracked = request.id.as_ref().map(|id| server.cancellations.track(id));
+                        let server = match &tracked {
+                            Some(tracked) => server.with_cancel(tracked.cancel_flag()),
+                            None => server.clone(),
+                        };
+                        server.handle_tools_call(call_params).await.map(|r| serde_json::to_value(r).unwrap())
+                    }
+                    Err(e) => Err(McpError {
                         code: -32602,
                         message: format!("Invalid parameters: {}", e),
                         data: None,
-                    })?;
-                server.handle_tools_call(call_params).await.map(|r| serde_json::to_value(r).unwrap())
+                    }),
+                }
             } else {
                 Err(McpError {
                     code: -32602,
@@ -650,6 +861,15 @@ async fn handle_mcp_request(
                 })
             }
         }
+        "notifications/cancelled" => {
+            let request_id = request.params.as_ref().and_then(|params| params.get("requestId"));
+            if let Some(request_id) = request_id {
+                if server.cancellations.cancel(request_id) {
+                    info!("Cancelling request {}", request_id);
+                }
+            }
+            return McpReply { body: String::new(), etag: None, retry_after: None };
+        }
         _ => Err(McpError {
             code: -32601,
             message: format!("Method not found: {}", request.method),
@@ -657,20 +877,38 @@ async fn handle_mcp_request(
         }),
     };
     
-    let response = match result {
-        Ok(result) => McpResponse {
+    match result {
+        Ok(result) => reply(McpResponse {
             result: Some(result),
             error: None,
             id: request.id,
-        },
-        Err(error) => McpResponse {
-            result: None,
-            error: Some(error),
-            id: request.id,
-        },
-    };
-    
-    Ok(Json(response))
+        }),
+        Err(error) => error_reply(request.id, error),
+    }
+}
+
+fn reply(response: McpResponse) -> McpReply {
+    McpReply {
+        body: serde_json::to_string(&response).unwrap_or_else(|_| "null".to_string()),
+        etag: None,
+        retry_after: response.error.as_ref().and_then(McpError::retry_after),
+    }
+}
+
+fn error_reply(id: Option<Value>, error: McpError) -> McpReply {
+    reply(McpResponse {
+        result: None,
+        error: Some(error),
+        id,
+    })
+}
+
+fn invalid_request_reply(reason: String) -> McpReply {
+    error_reply(None, McpError {
+        code: -32600,
+        message: format!("Invalid request: {}", reason),
+        data: None,
+    })
 }
 
 async fn handle_initialize(State(server): State<HttpMcpServer>) -> impl IntoResponse {
@@ -682,23 +920,71 @@ async fn handle_initialize(State(server): State<HttpMcpServer>) -> impl IntoResp
     }
 }
 
-async fn handle_tools_list(State(server): State<HttpMcpServer>) -> impl IntoResponse {
-    match server.handle_tools_list().await {
-        Ok(result) => (StatusCode::OK, Json(result)),
-        Err(error) => (StatusCode::INTERNAL_SERVER_ERROR, Json(json!({
-            "error": error.message
-        }))),
+async fn handle_tools_list(
+    State(server): State<HttpMcpServer>,
+    Query(query): Query<McpListToolsParams>,
+    headers: HeaderMap,
+) -> Response {
+    match server.handle_tools_list(query.cursor).await {
+        Ok(listing) => {
+            let not_modified = headers.get(header::IF_NONE_MATCH)
+                .and_then(|value| value.to_str().ok())
+                .map_or(false, |value| etag_matches(value, &listing.etag));
+            
+            if not_modified {
+                (StatusCode::NOT_MODIFIED, [(header::ETAG, listing.etag.clone())]).into_response()
+            } else {
+                json_body_response(StatusCode::OK, &listing.etag, listing.body.clone())
+            }
+        }
+        Err(error) => error.into_http_response(),
     }
 }
 
+/// The pagination cursor of a `tools/list` request, if any
+fn list_cursor(params: Option<&Value>) -> Option<String> {
+    params
+        .and_then(|params| params.get("cursor"))
+        .and_then(Value::as_str)
+        .map(str::to_string)
+}
+
+/// A response carrying an already serialized JSON body and its entity tag
+fn json_body_response(status: StatusCode, etag: &str, body: String) -> Response {
+    (
+        status,
+        [
+            (header::CONTENT_TYPE, "application/json".to_string()),
+            (header::ETAG, etag.to_string()),
+            (header::CACHE_CONTROL, "no-cache".to_string()),
+        ],
+        body,
+    ).into_response()
+}
+
+/// Whether an `If-None-Match` header value matches the given entity tag
+fn etag_matches(if_none_match: &str, etag: &str) -> bool {
+    if_none_match.split(',').any(|candidate| {
+        let candidate = candidate.trim();
+        candidate == "*" || candidate.trim_start_matches("W/") == etag
+    })
+}
+
 async fn handle_tools_call(
     State(server): State<HttpMcpServer>,
     Json(params): Json<McpCallToolParams>,
-) -> impl IntoResponse {
+) -> Response {
     match server.handle_tools_call(params).await {
-        Ok(result) => (StatusCode::OK, Json(result)),
-        Err(error) => (StatusCode::INTERNAL_SERVER_ERROR, Json(json!({
-            "error": error.message
+        Ok(result) => (StatusCode::OK, Json(result)).into_response(),
+        Err(error) => error.into_http_response(),
+    }
+}
+
+async fn handle_stats(State(server): State<HttpMcpServer>) -> impl IntoResponse {
+    match server.tool_box.get_stats().await {
+        Ok(stats) => (StatusCode::OK, Json(json!(stats))),
+        Err(e) => (StatusCode::INTERNAL_SERVER_ERROR, Json(json!({
+            "error": e.to_string()
         }))),
     }
 }
@@ -718,4 +1004,56 @@ async fn generate_api_key_endpoint() -> impl IntoResponse {
         },
         "note": "Store the api_key securely. The hash is for verification purposes only."
     })))
-}
\ No newline at end of file
+}
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    #[test]
+    fn test_etag_matches() {
+        let etag = "\"3-abc\"";
+        assert!(etag_matches("\"3-abc\"", etag));
+        assert!(etag_matches("\"2-xyz\", W/\"3-abc\"", etag));
+        assert!(etag_matches("*", etag));
+        assert!(!etag_matches("\"2-abc\"", etag));
+    }
+    
+    #[test]
+    fn test_stream_token() {
+        let request = json!({
+            "method": "tools/call",
+            "params": {"name": "bin___tcl_execute", "arguments": {}, "_meta": {"progressToken": 7}},
+            "id": 1,
+        });
+        let mut headers = HeaderMap::new();
+        assert_eq!(stream_token(&headers, &request), None);
+        
+        headers.insert(header::ACCEPT, "application/json, text/event-stream".parse().unwrap());
+        assert_eq!(stream_token(&headers, &request), Some(json!(7)));
+        assert_eq!(stream_token(&headers, &json!({"method": "tools/list", "id": 2})), None);
+    }
+    
+    #[tokio::test(flavor = "multi_thread")]
+    async fn test_tool_output_streams_as_events() {
+        let server = HttpMcpServer::new_with_config(true, RuntimeConfig::default(), ExecutorConfig::default()).unwrap();
+        let request = json!({
+            "method": "tools/call",
+            "params": {"name": "bin___tcl_execute", "arguments": {"script": "puts hello; expr {1 + 1}"}},
+            "id": 1,
+        });
+        
+        let response = stream_mcp_request(server, request, json!("run-1"));
+        assert_eq!(response.headers()[header::CONTENT_TYPE], "text/event-stream");
+        
+        let body = axum::body::to_bytes(response.into_body(), usize::MAX).await.unwrap();
+        let events: Vec<Value> = String::from_utf8(body.to_vec()).unwrap()
+            .split("\n\n")
+            .filter_map(|event| event.strip_prefix("event: message\ndata: "))
+            .map(|data| serde_json::from_str(data).unwrap())
+            .collect();
+        
+        assert_eq!(events.len(), 2);
+        assert_eq!(events[0]["params"]["message"], json!("hello\n"));
+        assert_eq!(events[1]["result"]["content"][0]["text"], json!("2"));
+    }
+}
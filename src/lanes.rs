@@ -0,0 +1,240 @@
+//! Priority lanes for requests waiting to be dispatched.
+//!
+//! Requests wait in one of three lanes and are taken off by weighted round robin.
+//! While several lanes have requests waiting, each gets up to its weight of turns
+//! per round, so control requests overtake a backlog of script calls, and the
+//! backlog still gets a turn every round.
+
+use anyhow::{anyhow, Result};
+use serde::{Deserialize, Serialize};
+use std::collections::VecDeque;
+use std::fmt;
+use std::sync::{Arc, Mutex};
+use std::time::Instant;
+use tokio::sync::Notify;
+
+use crate::tcl_executor::{QueueStats, QueueStatsSnapshot};
+
+/// Requests each lane holds before new ones have to wait to be queued
+pub const DEFAULT_LANE_DEPTH: usize = 100;
+
+/// Priority class of a request
+#[derive(Debug, Clone, Copy, PartialEq, Eq)]
+pub enum Lane {
+    /// Handshakes, stats, tool management and other short requests
+    Control,
+    /// Tool listings and documentation
+    Metadata,
+    /// Scripts and tool calls
+    Execution,
+}
+
+impl Lane {
+    pub const ALL: [Lane; 3] = [Lane::Control, Lane::Metadata, Lane::Execution];
+
+    /// Turns per round while the lane has requests waiting
+    pub fn weight(self) -> u32 {
+        match self {
+            Lane::Control => 4,
+            Lane::Metadata => 2,
+            Lane::Execution => 1,
+        }
+    }
+
+    pub fn as_str(self) -> &'static str {
+        match self {
+            Lane::Control => "control",
+            Lane::Metadata => "metadata",
+            Lane::Execution => "execution",
+        }
+    }
+
+    fn index(self) -> usize {
+        self as usize
+    }
+}
+
+impl fmt::Display for Lane {
+    fn fmt(&self, f: &mut fmt::Formatter<'_>) -> fmt::Result {
+        f.write_str(self.as_str())
+    }
+}
+
+/// Occupancy and waiting times of each lane
+#[derive(Debug)]
+pub struct LaneStats {
+    lanes: [QueueStats; 3],
+}
+
+/// Point-in-time view of the lane counters
+#[derive(Debug, Clone, Default, Serialize, Deserialize)]
+pub struct LaneStatsSnapshot {
+    pub control: QueueStatsSnapshot,
+    pub metadata: QueueStatsSnapshot,
+    pub execution: QueueStatsSnapshot,
+}
+
+impl LaneStats {
+    pub fn new(depth: usize) -> Self {
+        Self { lanes: Lane::ALL.map(|_| QueueStats::new(depth)) }
+    }
+
+    pub fn lane(&self, lane: Lane) -> &QueueStats {
+        &self.lanes[lane.index()]
+    }
+
+    pub fn snapshot(&self) -> LaneStatsSnapshot {
+        LaneStatsSnapshot {
+            control: self.lane(Lane::Control).snapshot(),
+            metadata: self.lane(Lane::Metadata).snapshot(),
+            execution: self.lane(Lane::Execution).snapshot(),
+        }
+    }
+}
+
+struct Waiting<T> {
+    item: T,
+    queued_at: Instant,
+}
+
+struct LaneState<T> {
+    lanes: [VecDeque<Waiting<T>>; 3],
+    /// Turns each lane has left in the current round
+    turns: [u32; 3],
+    closed: bool,
+}
+
+impl<T> LaneState<T> {
+    fn has_turn(&self, lane: Lane) -> bool {
+        !self.lanes[lane.index()].is_empty() && self.turns[lane.index()] > 0
+    }
+
+    /// The lane to serve next: the first lane with requests waiting and turns left,
+    /// starting a new round once every waiting lane has used its turns
+    fn next_lane(&mut self) -> Option<Lane> {
+        if self.lanes.iter().all(VecDeque::is_empty) {
+            return None;
+        }
+
+        if !Lane::ALL.iter().any(|lane| self.has_turn(*lane)) {
+            self.turns = Lane::ALL.map(Lane::weight);
+        }
+
+        let lane = Lane::ALL.into_iter().find(|lane| self.has_turn(*lane))?;
+        self.turns[lane.index()] -= 1;
+        Some(lane)
+    }
+}
+
+/// Bounded per-lane queues with a single consumer
+pub struct LaneQueue<T> {
+    state: Mutex<LaneState<T>>,
+    depth: usize,
+    stats: Arc<LaneStats>,
+    /// Signalled when a request is queued or the queue is closed
+    queued: Notify,
+    /// Signalled when a request leaves its lane or the queue is closed
+    space: Notify,
+}
+
+impl<T> LaneQueue<T> {
+    pub fn new(depth: usize, stats: Arc<LaneStats>) -> Self {
+        Self {
+            state: Mutex::new(LaneState {
+                lanes: Lane::ALL.map(|_| VecDeque::new()),
+                turns: Lane::ALL.map(Lane::weight),
+                closed: false,
+            }),
+            depth: depth.max(1),
+            stats,
+            queued: Notify::new(),
+            space: Notify::new(),
+        }
+    }
+
+    /// Queue `item` in `lane`, waiting while that lane is full. Fails once the queue
+    /// is closed.
+    pub async fn push(&self, lane: Lane, item: T) -> Result<()> {
+        loop {
+            let space = self.space.notified();
+            {
+                let mut state = self.state.lock().unwrap();
+                if state.closed {
+                    return Err(anyhow!("Lane queue is closed"));
+                }
+                if state.lanes[lane.index()].len() < self.depth {
+                    // Count the request before it becomes visible to `pop`, which
+                    // records its wait as soon as it takes it
+                    self.stats.lane(lane).record_queued();
+                    state.lanes[lane.index()].push_back(Waiting { item, queued_at: Instant::now() });
+                    break;
+                }
+            }
+            space.await;
+        }
+
+        self.queued.notify_one();
+        Ok(())
+    }
+
+    /// Take the next request by weighted round robin, waiting while every lane is
+    /// empty. Returns `None` once the queue is closed and empty.
+    pub async fn pop(&self) -> Option<(Lane, T)> {
+        loop {
+            let queued = self.queued.notified();
+            let next = {
+                let mut state = self.state.lock().unwrap();
+                match state.next_lane() {
+                    Some(lane) => state.lanes[lane.index()].pop_front().map(|waiting| (lane, waiting)),
+                    None if state.closed => return None,
+                    None => None,
+                }
+            };
+
+            if let Some((lane, waiting)) = next {
+                let wait = waiting.queued_at.elapsed();
+                tracing::debug!("Request waited {:?} in the {} lane", wait, lane);
+                self.stats.lane(lane).record_wait(wait);
+                self.space.notify_waiters();
+                return Some((lane, waiting.item));
+            }
+            queued.await;
+        }
+    }
+
+    /// Stop taking new requests. Those already queued are still handed out.
+    pub fn close(&self) {
+        self.state.lock().unwrap().closed = true;
+        self.queued.notify_one();
+        self.space.notify_waiters();
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    #[tokio::test]
+    async fn test_lanes_are_weighted_and_never_starved() {
+        let queue = LaneQueue::new(16, Arc::new(LaneStats::new(16)));
+        for n in 0..6 {
+            queue.push(Lane::Execution, format!("run{}", n)).await.unwrap();
+            queue.push(Lane::Control, format!("ctl{}", n)).await.unwrap();
+        }
+        queue.close();
+
+        let mut order = Vec::new();
+        while let Some((_, item)) = queue.pop().await {
+            order.push(item);
+        }
+
+        // Four control requests per round, then one execution request
+        assert_eq!(&order[..7], ["ctl0", "ctl1", "ctl2", "ctl3", "run0", "ctl4", "ctl5"]);
+        assert_eq!(order.len(), 12);
+
+        let stats = queue.stats.snapshot();
+        assert_eq!(stats.control.dequeued, 6);
+        assert_eq!(stats.execution.dequeued, 6);
+        assert_eq!(stats.execution.queued, 0);
+    }
+}
@@ -3,8 +3,13 @@ pub mod tcl_runtime;
 pub mod namespace;
 pub mod tcl_tools;
 pub mod tcl_executor;
+pub mod script_cache;
 pub mod persistence;
 pub mod tool_discovery;
+pub mod tool_listing;
+pub mod streaming;
+pub mod lanes;
+pub mod tenants;
 pub mod capabilities;
 pub mod http_server;
 pub mod auth;
\ No newline at end of file
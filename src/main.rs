@@ -5,10 +5,15 @@ use tracing::info;
 mod server;
 mod tcl_tools;
 mod tcl_executor;
+mod script_cache;
 mod tcl_runtime;
 mod namespace;
 mod persistence;
 mod tool_discovery;
+mod tool_listing;
+mod streaming;
+mod lanes;
+mod tenants;
 
 use server::TclMcpServer;
 
@@ -27,6 +32,17 @@ struct Args {
         help = "TCL runtime to use (molt|tcl). Can also be set via TCL_MCP_RUNTIME environment variable"
     )]
     runtime: Option<String>,
+    
+    /// Maximum number of requests processed at once
+    #[arg(
+        long,
+        value_name = "N",
+        help = "Maximum number of stdio requests processed concurrently. Can also be set via TCL_MCP_MAX_IN_FLIGHT environment variable"
+    )]
+    max_in_flight: Option<usize>,
+    
+    #[command(flatten)]
+    executor: tcl_executor::ExecutorArgs,
 }
 
 #[tokio::main]
@@ -51,6 +67,33 @@ async fn main() -> Result<()> {
         }
     };
 
+    // Determine executor pool configuration
+    let executor_config = match tcl_executor::ExecutorConfig::from_args_and_env(
+        &args.executor,
+        |name| std::env::var(name).ok(),
+    ) {
+        Ok(config) => config,
+        Err(e) => {
+            eprintln!("Error: {}", e);
+            std::process::exit(1);
+        }
+    };
+
+    // Determine how many stdio requests may be processed at once
+    let max_in_flight = match args.max_in_flight {
+        Some(limit) => limit,
+        None => match std::env::var("TCL_MCP_MAX_IN_FLIGHT") {
+            Ok(value) => match value.trim().parse() {
+                Ok(limit) => limit,
+                Err(_) => {
+                    eprintln!("Error: Invalid TCL_MCP_MAX_IN_FLIGHT '{}'. Expected a positive integer", value);
+                    std::process::exit(1);
+                }
+            },
+            Err(_) => server::DEFAULT_MAX_IN_FLIGHT,
+        },
+    };
+
     // Show available runtimes if requested runtime is not available  
     let requested_available = runtime_config.runtime_type
         .as_ref()
@@ -73,8 +116,8 @@ async fn main() -> Result<()> {
     }
 
     // Create and run the MCP server with privilege and runtime settings
-    let server = match TclMcpServer::new_with_runtime(args.privileged, runtime_config) {
-        Ok(server) => server,
+    let server = match TclMcpServer::new_with_config(args.privileged, runtime_config, executor_config) {
+        Ok(server) => server.with_max_in_flight(max_in_flight),
         Err(e) => {
             eprintln!("Failed to create server: {}", e);
             std::process::exit(1);
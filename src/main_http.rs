@@ -8,10 +8,14 @@ use tower_http::trace::TraceLayer;
 mod http_server;
 mod tcl_tools;
 mod tcl_executor;
+mod script_cache;
 mod tcl_runtime;
 mod namespace;
 mod persistence;
 mod tool_discovery;
+mod tool_listing;
+mod streaming;
+mod tenants;
 mod auth;
 
 use http_server::HttpMcpServer;
@@ -32,6 +36,9 @@ struct Args {
     )]
     runtime: Option<String>,
     
+    #[command(flatten)]
+    executor: tcl_executor::ExecutorArgs,
+    
     /// Port to listen on
     #[arg(long, default_value = "3000", help = "Port to listen on")]
     port: u16,
@@ -63,6 +70,18 @@ async fn main() -> Result<()> {
         }
     };
 
+    // Determine executor pool configuration
+    let executor_config = match tcl_executor::ExecutorConfig::from_args_and_env(
+        &args.executor,
+        |name| std::env::var(name).ok(),
+    ) {
+        Ok(config) => config,
+        Err(e) => {
+            eprintln!("Error: {}", e);
+            std::process::exit(1);
+        }
+    };
+
     // Show available runtimes if requested runtime is not available  
     let requested_available = runtime_config.runtime_type
         .as_ref()
@@ -85,7 +104,7 @@ async fn main() -> Result<()> {
     }
 
     // Create and configure the HTTP server
-    let server = match HttpMcpServer::new_with_runtime(args.privileged, runtime_config) {
+    let server = match HttpMcpServer::new_with_config(args.privileged, runtime_config, executor_config) {
         Ok(server) => server,
         Err(e) => {
             eprintln!("Failed to create server: {}", e);
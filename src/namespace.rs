@@ -1,6 +1,10 @@
 use anyhow::{Result, anyhow};
 use serde::{Deserialize, Serialize};
+use std::collections::hash_map::DefaultHasher;
+use std::collections::HashSet;
 use std::fmt;
+use std::hash::{Hash, Hasher};
+use std::sync::{Arc, Mutex, OnceLock};
 
 #[derive(Debug, Clone, PartialEq, Eq, Hash, Serialize, Deserialize)]
 pub enum Namespace {
@@ -10,55 +14,158 @@ pub enum Namespace {
     User(String), // User namespace
 }
 
-#[derive(Debug, Clone, PartialEq, Eq, Hash, Serialize, Deserialize)]
+/// A tool's location. Cloning is a reference-count increment; the hash, the display
+/// form and the MCP name are computed once when the path is built.
+#[derive(Clone, Serialize, Deserialize)]
+#[serde(from = "ToolPathFields", into = "ToolPathFields")]
 pub struct ToolPath {
-    pub namespace: Namespace,
-    pub package: Option<String>,
-    pub name: String,
-    pub version: String,
+    inner: Arc<ToolPathInner>,
+}
+
+struct ToolPathInner {
+    namespace: Namespace,
+    /// Interned: shared by every tool in the package
+    package: Option<Arc<str>>,
+    name: Box<str>,
+    /// Interned: almost always the shared "latest"
+    version: Arc<str>,
+    hash: u64,
+    display: Box<str>,
+    mcp_name: Box<str>,
+}
+
+/// Serialized form of a `ToolPath`, unchanged from when its fields were stored directly
+#[derive(Serialize, Deserialize)]
+struct ToolPathFields {
+    namespace: Namespace,
+    package: Option<String>,
+    name: String,
+    version: String,
+}
+
+impl From<ToolPathFields> for ToolPath {
+    fn from(fields: ToolPathFields) -> Self {
+        Self::from_parts(fields.namespace, fields.package.as_deref(), &fields.name, &fields.version)
+    }
+}
+
+impl From<ToolPath> for ToolPathFields {
+    fn from(path: ToolPath) -> Self {
+        Self {
+            namespace: path.inner.namespace.clone(),
+            package: path.package().map(str::to_string),
+            name: path.name().to_string(),
+            version: path.version().to_string(),
+        }
+    }
 }
 
 impl ToolPath {
     /// Create a new system binary tool path
     pub fn bin(name: impl Into<String>) -> Self {
-        Self {
-            namespace: Namespace::Bin,
-            package: None,
-            name: name.into(),
-            version: "latest".to_string(),
-        }
+        let name: String = name.into();
+        Self::from_parts(Namespace::Bin, None, &name, "latest")
     }
     
     /// Create a new system admin tool path
     pub fn sbin(name: impl Into<String>) -> Self {
-        Self {
-            namespace: Namespace::Sbin,
-            package: None,
-            name: name.into(),
-            version: "latest".to_string(),
-        }
+        let name: String = name.into();
+        Self::from_parts(Namespace::Sbin, None, &name, "latest")
     }
     
     /// Create a new documentation tool path
     pub fn docs(name: impl Into<String>) -> Self {
-        Self {
-            namespace: Namespace::Docs,
-            package: None,
-            name: name.into(),
-            version: "latest".to_string(),
-        }
+        let name: String = name.into();
+        Self::from_parts(Namespace::Docs, None, &name, "latest")
     }
     
     /// Create a new user tool path
     pub fn user(user: impl Into<String>, package: impl Into<String>, name: impl Into<String>, version: impl Into<String>) -> Self {
+        let (package, name, version): (String, String, String) = (package.into(), name.into(), version.into());
+        Self::from_parts(Namespace::User(user.into()), Some(package.as_str()), &name, &version)
+    }
+    
+    fn from_parts(namespace: Namespace, package: Option<&str>, name: &str, version: &str) -> Self {
+        let package = package.map(intern);
+        let version = intern(version);
+        
+        let mut hasher = DefaultHasher::new();
+        (&namespace, package.as_deref(), name, &*version).hash(&mut hasher);
+        let hash = hasher.finish();
+        
+        let display = match &namespace {
+            Namespace::Bin => format!("/bin/{}", name),
+            Namespace::Sbin => format!("/sbin/{}", name),
+            Namespace::Docs => format!("/docs/{}", name),
+            Namespace::User(user) => {
+                if let Some(package) = &package {
+                    if &*version == "latest" {
+                        format!("/{}/{}/{}", user, package, name)
+                    } else {
+                        format!("/{}/{}/{}:{}", user, package, name, version)
+                    }
+                } else {
+                    format!("/{}/{}", user, name)
+                }
+            }
+        };
+        
+        let mcp_name = match &namespace {
+            Namespace::Bin => format!("bin___{}", name),
+            Namespace::Sbin => format!("sbin___{}", name),
+            Namespace::Docs => format!("docs___{}", name),
+            Namespace::User(user) => {
+                if let Some(package) = &package {
+                    if &*version == "latest" {
+                        format!("user_{}__{}___{}", user, package, name)
+                    } else {
+                        format!("user_{}__{}___{}__v{}", user, package, name, version.replace('.', "_"))
+                    }
+                } else {
+                    format!("user_{}___{}", user, name)
+                }
+            }
+        };
+        
         Self {
-            namespace: Namespace::User(user.into()),
-            package: Some(package.into()),
-            name: name.into(),
-            version: version.into(),
+            inner: Arc::new(ToolPathInner {
+                namespace,
+                package,
+                name: name.into(),
+                version,
+                hash,
+                display: display.into_boxed_str(),
+                mcp_name: mcp_name.into_boxed_str(),
+            }),
         }
     }
     
+    pub fn namespace(&self) -> &Namespace {
+        &self.inner.namespace
+    }
+    
+    pub fn package(&self) -> Option<&str> {
+        self.inner.package.as_deref()
+    }
+    
+    pub fn name(&self) -> &str {
+        &self.inner.name
+    }
+    
+    pub fn version(&self) -> &str {
+        &self.inner.version
+    }
+    
+    /// The path in its string form, e.g. "/alice/utils/reverse_string:1.0"
+    pub fn as_str(&self) -> &str {
+        &self.inner.display
+    }
+    
+    /// The MCP-compatible tool name, e.g. "user_alice__utils___reverse_string__v1_0"
+    pub fn mcp_name(&self) -> &str {
+        &self.inner.mcp_name
+    }
+    
     /// Parse a tool path from a string representation
     /// Examples:
     /// - "/bin/tcl_execute"
@@ -100,22 +207,7 @@ impl ToolPath {
     
     /// Convert to MCP-compatible tool name (snake_case with prefixes)
     pub fn to_mcp_name(&self) -> String {
-        match &self.namespace {
-            Namespace::Bin => format!("bin___{}", self.name),
-            Namespace::Sbin => format!("sbin___{}", self.name),
-            Namespace::Docs => format!("docs___{}", self.name),
-            Namespace::User(user) => {
-                if let Some(package) = &self.package {
-                    if self.version == "latest" {
-                        format!("user_{}__{}___{}", user, package, self.name)
-                    } else {
-                        format!("user_{}__{}___{}__v{}", user, package, self.name, self.version.replace('.', "_"))
-                    }
-                } else {
-                    format!("user_{}___{}", user, self.name)
-                }
-            }
-        }
+        self.mcp_name().to_string()
     }
     
     /// Convert from MCP tool name back to ToolPath
@@ -133,26 +225,26 @@ impl ToolPath {
             
             let parts: Vec<&str> = rest.split("__").collect();
             match parts.as_slice() {
-                [user, name] => Ok(Self {
-                    namespace: Namespace::User(user.to_string()),
-                    package: None,
-                    name: name.strip_prefix('_').unwrap_or(name).to_string(),
-                    version: "latest".to_string(),
-                }),
-                [user, package, name] => Ok(Self {
-                    namespace: Namespace::User(user.to_string()),
-                    package: Some(package.to_string()),
-                    name: name.strip_prefix('_').unwrap_or(name).to_string(),
-                    version: "latest".to_string(),
-                }),
+                [user, name] => Ok(Self::from_parts(
+                    Namespace::User(user.to_string()),
+                    None,
+                    name.strip_prefix('_').unwrap_or(name),
+                    "latest",
+                )),
+                [user, package, name] => Ok(Self::from_parts(
+                    Namespace::User(user.to_string()),
+                    Some(*package),
+                    name.strip_prefix('_').unwrap_or(name),
+                    "latest",
+                )),
                 [user, package, name, version] if version.starts_with('v') => {
                     let version = version[1..].replace('_', ".");
-                    Ok(Self {
-                        namespace: Namespace::User(user.to_string()),
-                        package: Some(package.to_string()),
-                        name: name.strip_prefix('_').unwrap_or(name).to_string(),
-                        version,
-                    })
+                    Ok(Self::from_parts(
+                        Namespace::User(user.to_string()),
+                        Some(*package),
+                        name.strip_prefix('_').unwrap_or(name),
+                        &version,
+                    ))
                 }
                 _ => Err(anyhow!("Invalid MCP tool name format: {}", mcp_name)),
             }
@@ -163,32 +255,60 @@ impl ToolPath {
     
     /// Check if this is a system tool (bin, sbin, or docs)
     pub fn is_system(&self) -> bool {
-        matches!(self.namespace, Namespace::Bin | Namespace::Sbin | Namespace::Docs)
+        matches!(self.inner.namespace, Namespace::Bin | Namespace::Sbin | Namespace::Docs)
     }
     
 }
 
+impl PartialEq for ToolPath {
+    fn eq(&self, other: &Self) -> bool {
+        Arc::ptr_eq(&self.inner, &other.inner)
+            || (self.inner.hash == other.inner.hash
+                && self.inner.namespace == other.inner.namespace
+                && self.inner.package == other.inner.package
+                && self.inner.name == other.inner.name
+                && self.inner.version == other.inner.version)
+    }
+}
+
+impl Eq for ToolPath {}
+
+impl Hash for ToolPath {
+    fn hash<H: Hasher>(&self, state: &mut H) {
+        state.write_u64(self.inner.hash);
+    }
+}
+
+impl fmt::Debug for ToolPath {
+    fn fmt(&self, f: &mut fmt::Formatter<'_>) -> fmt::Result {
+        f.debug_struct("ToolPath")
+            .field("namespace", &self.inner.namespace)
+            .field("package", &self.inner.package)
+            .field("name", &self.inner.name)
+            .field("version", &self.inner.version)
+            .finish()
+    }
+}
+
 impl fmt::Display for ToolPath {
     fn fmt(&self, f: &mut fmt::Formatter<'_>) -> fmt::Result {
-        match &self.namespace {
-            Namespace::Bin => write!(f, "/bin/{}", self.name),
-            Namespace::Sbin => write!(f, "/sbin/{}", self.name),
-            Namespace::Docs => write!(f, "/docs/{}", self.name),
-            Namespace::User(user) => {
-                if let Some(package) = &self.package {
-                    if self.version == "latest" {
-                        write!(f, "/{}/{}/{}", user, package, self.name)
-                    } else {
-                        write!(f, "/{}/{}/{}:{}", user, package, self.name, self.version)
-                    }
-                } else {
-                    write!(f, "/{}/{}", user, self.name)
-                }
-            }
-        }
+        f.write_str(self.as_str())
     }
 }
 
+/// Share one allocation between every path with the same package or version
+fn intern(symbol: &str) -> Arc<str> {
+    static SYMBOLS: OnceLock<Mutex<HashSet<Arc<str>>>> = OnceLock::new();
+    
+    let mut symbols = SYMBOLS.get_or_init(Default::default).lock().unwrap();
+    if let Some(interned) = symbols.get(symbol) {
+        return interned.clone();
+    }
+    let interned: Arc<str> = Arc::from(symbol);
+    symbols.insert(interned.clone());
+    interned
+}
+
 #[cfg(test)]
 mod tests {
     use super::*;
@@ -249,4 +369,33 @@ mod tests {
             assert_eq!(path, parsed);
         }
     }
-}
\ No newline at end of file
+    
+    #[test]
+    fn test_compact_paths() {
+        let a = ToolPath::user("alice", "utils", "reverse_string", "latest");
+        let b = ToolPath::parse("/alice/utils/reverse_string").unwrap();
+        
+        // Separately built paths are equal, hash alike and share interned parts
+        assert_eq!(a, b);
+        let mut set = HashSet::new();
+        set.insert(a.clone());
+        assert!(set.contains(&b));
+        assert!(Arc::ptr_eq(&a.inner.version, &b.inner.version));
+        assert!(Arc::ptr_eq(a.inner.package.as_ref().unwrap(), b.inner.package.as_ref().unwrap()));
+        assert_ne!(a, ToolPath::user("alice", "utils", "reverse_string", "1.0"));
+        
+        assert_eq!(a.as_str(), "/alice/utils/reverse_string");
+        assert_eq!(a.mcp_name(), "user_alice__utils___reverse_string");
+        assert_eq!(a.package(), Some("utils"));
+        
+        // The serialized form is unchanged
+        let json = serde_json::to_value(&a).unwrap();
+        assert_eq!(json, serde_json::json!({
+            "namespace": {"User": "alice"},
+            "package": "utils",
+            "name": "reverse_string",
+            "version": "latest"
+        }));
+        assert_eq!(serde_json::from_value::<ToolPath>(json).unwrap(), a);
+    }
+}
@@ -2,8 +2,15 @@ use anyhow::{Result, anyhow};
 use chrono::{DateTime, Utc};
 use serde::{Deserialize, Serialize};
 use std::collections::HashMap;
+use std::future::Future;
 use std::path::{Path, PathBuf};
+use std::pin::Pin;
+use std::sync::{Arc, Mutex as StdMutex};
+use std::time::{Duration, Instant};
 use tokio::fs;
+use tokio::io::AsyncWriteExt;
+use tokio::sync::Mutex;
+use tokio::task::JoinSet;
 use uuid::Uuid;
 
 use crate::tcl_tools::ToolDefinition;
@@ -41,60 +48,186 @@ pub struct ToolIndexEntry {
     pub updated_at: DateTime<Utc>,
 }
 
+/// Maximum number of tool files read concurrently when listing stored tools
+const LOAD_CONCURRENCY: usize = 32;
+
+type BoxFuture<'a, T> = Pin<Box<dyn Future<Output = T> + Send + 'a>>;
+
+/// Storage for user tools. Implementations decide the on-disk layout.
+pub trait StorageBackend: Send + Sync {
+    fn save_tool<'a>(&'a mut self, tool: &'a ToolDefinition) -> BoxFuture<'a, Result<()>>;
+    fn load_tool<'a>(&'a self, path: &'a ToolPath) -> BoxFuture<'a, Result<Option<ToolDefinition>>>;
+    fn list_tools<'a>(&'a self, namespace_filter: Option<&'a str>) -> BoxFuture<'a, Result<Vec<ToolDefinition>>>;
+    fn delete_tool<'a>(&'a mut self, path: &'a ToolPath) -> BoxFuture<'a, Result<bool>>;
+}
+
+/// Available storage backends
+#[derive(Debug, Clone, Copy, PartialEq, Eq, Default)]
+pub enum StorageBackendKind {
+    /// One JSON file per tool plus `index.json`
+    #[default]
+    Json,
+    /// Append-only, checksummed log with compaction
+    Log,
+}
+
+impl std::str::FromStr for StorageBackendKind {
+    type Err = anyhow::Error;
+    
+    fn from_str(s: &str) -> Result<Self> {
+        match s.to_lowercase().as_str() {
+            "json" => Ok(StorageBackendKind::Json),
+            "log" => Ok(StorageBackendKind::Log),
+            _ => Err(anyhow!("Invalid storage backend '{}'. Valid options: json, log", s)),
+        }
+    }
+}
+
+impl StorageBackendKind {
+    pub fn as_str(&self) -> &'static str {
+        match self {
+            StorageBackendKind::Json => "json",
+            StorageBackendKind::Log => "log",
+        }
+    }
+}
+
+/// When storage writes are flushed to stable storage
+#[derive(Debug, Clone, Copy, PartialEq, Eq, Default)]
+pub enum FsyncPolicy {
+    /// fsync every write (and the directory after a rename) before reporting success
+    #[default]
+    Always,
+    /// Leave flushing to the operating system; writes are still atomic
+    Never,
+}
+
+impl std::str::FromStr for FsyncPolicy {
+    type Err = anyhow::Error;
+    
+    fn from_str(s: &str) -> Result<Self> {
+        match s.to_lowercase().as_str() {
+            "always" => Ok(FsyncPolicy::Always),
+            "never" => Ok(FsyncPolicy::Never),
+            _ => Err(anyhow!("Invalid fsync policy '{}'. Valid options: always, never", s)),
+        }
+    }
+}
+
+/// How persistent storage is opened and written
+#[derive(Debug, Clone, Default)]
+pub struct StorageOptions {
+    pub backend: StorageBackendKind,
+    pub fsync: FsyncPolicy,
+    /// Batch index writes arriving within this window into one (JSON backend only)
+    pub group_commit: Option<Duration>,
+}
+
 /// File-based tool persistence manager
 pub struct FilePersistence {
-    storage_dir: PathBuf,
-    index_path: PathBuf,
-    index: ToolIndex,
+    backend: Box<dyn StorageBackend>,
 }
 
 impl FilePersistence {
-    /// Create a new file persistence manager
+    /// Create a new file persistence manager with the default options
     pub async fn new() -> Result<Self> {
-        let storage_dir = get_storage_directory()?;
-        let index_path = storage_dir.join("index.json");
-        
-        // Create storage directory if it doesn't exist
-        fs::create_dir_all(&storage_dir).await?;
-        
-        // Load or create index
-        let index = Self::load_or_create_index(&index_path).await?;
-        
-        Ok(Self {
-            storage_dir,
-            index_path,
-            index,
-        })
+        Self::open(&StorageOptions::default()).await
+    }
+    
+    /// Open persistent storage in the platform data directory
+    pub async fn open(options: &StorageOptions) -> Result<Self> {
+        Self::open_in(options, get_storage_directory()?).await
+    }
+    
+    /// Open persistent storage in a specific directory
+    pub async fn open_in(options: &StorageOptions, storage_dir: PathBuf) -> Result<Self> {
+        let backend: Box<dyn StorageBackend> = match options.backend {
+            StorageBackendKind::Json => Box::new(JsonFileBackend::open(storage_dir, options.clone()).await?),
+            StorageBackendKind::Log => Box::new(LogBackend::open(storage_dir, options.fsync).await?),
+        };
+        Ok(Self { backend })
     }
     
     /// Create with custom storage directory (for testing)
     #[cfg(test)]
     pub async fn with_directory(storage_dir: PathBuf) -> Result<Self> {
+        Self::open_in(&StorageOptions::default(), storage_dir).await
+    }
+    
+    /// Save a tool to persistent storage
+    pub async fn save_tool(&mut self, tool: &ToolDefinition) -> Result<()> {
+        self.backend.save_tool(tool).await
+    }
+    
+    /// Load a tool from persistent storage
+    pub async fn load_tool(&self, path: &ToolPath) -> Result<Option<ToolDefinition>> {
+        self.backend.load_tool(path).await
+    }
+    
+    /// List all persisted tools
+    pub async fn list_tools(&self, namespace_filter: Option<&str>) -> Result<Vec<ToolDefinition>> {
+        self.backend.list_tools(namespace_filter).await
+    }
+    
+    /// Delete a tool from persistent storage
+    pub async fn delete_tool(&mut self, path: &ToolPath) -> Result<bool> {
+        self.backend.delete_tool(path).await
+    }
+}
+
+/// Storage backend keeping one JSON file per tool and an `index.json` of all tools
+pub struct JsonFileBackend {
+    storage_dir: PathBuf,
+    index_path: PathBuf,
+    /// Shared with the group commit flush task
+    index: Arc<StdMutex<ToolIndex>>,
+    options: StorageOptions,
+    /// Whether a group commit flush is pending; held while the index is written
+    commit: Arc<Mutex<bool>>,
+}
+
+impl JsonFileBackend {
+    pub async fn open(storage_dir: PathBuf, options: StorageOptions) -> Result<Self> {
         let index_path = storage_dir.join("index.json");
         
+        // Create storage directory if it doesn't exist
         fs::create_dir_all(&storage_dir).await?;
-        let index = Self::load_or_create_index(&index_path).await?;
+        
+        // Load or create index
+        let index = Self::load_or_create_index(&storage_dir, &index_path, options.fsync).await?;
         
         Ok(Self {
             storage_dir,
             index_path,
-            index,
+            index: Arc::new(StdMutex::new(index)),
+            options,
+            commit: Arc::new(Mutex::new(false)),
         })
     }
     
-    async fn load_or_create_index(index_path: &Path) -> Result<ToolIndex> {
-        if index_path.exists() {
+    async fn load_or_create_index(storage_dir: &Path, index_path: &Path, fsync: FsyncPolicy) -> Result<ToolIndex> {
+        // An index update that was never flushed, or an unreadable index, is
+        // recovered from the tool files themselves rather than starting empty
+        let dirty = storage_dir.join(INDEX_DIRTY_MARKER).exists();
+        if index_path.exists() && !dirty {
             let content = fs::read_to_string(index_path).await?;
             match serde_json::from_str(&content) {
-                Ok(index) => Ok(index),
-                Err(e) => {
-                    tracing::warn!("Failed to parse index file, creating new one: {}", e);
-                    Ok(ToolIndex::default())
-                }
+                Ok(index) => return Ok(index),
+                Err(e) => tracing::warn!("Failed to parse index file, rebuilding it from tool files: {}", e),
             }
+        } else if !dirty {
+            return Ok(ToolIndex::default());
         } else {
-            Ok(ToolIndex::default())
+            tracing::warn!("Index was not flushed before shutdown, rebuilding it from tool files");
         }
+        
+        let dir = storage_dir.to_path_buf();
+        let index = tokio::task::spawn_blocking(move || rebuild_index(&dir)).await??;
+        write_atomic(index_path, serde_json::to_string_pretty(&index)?.as_bytes(), fsync).await?;
+        if dirty {
+            fs::remove_file(storage_dir.join(INDEX_DIRTY_MARKER)).await?;
+        }
+        Ok(index)
     }
     
     /// Save a tool to persistent storage
@@ -106,35 +239,25 @@ impl FilePersistence {
             fs::create_dir_all(parent).await?;
         }
         
-        // Calculate checksum
-        let checksum = calculate_checksum(&tool.script);
-        
-        // Create persisted tool
-        let now = Utc::now();
-        let persisted = PersistedTool {
-            metadata: ToolMetadata {
-                id: Uuid::new_v4().to_string(),
-                created_at: now,
-                updated_at: now,
-                checksum: checksum.clone(),
-                file_version: 1,
-            },
-            tool: tool.clone(),
-        };
+        let persisted = PersistedTool::new(tool);
+        let checksum = persisted.metadata.checksum.clone();
+        let now = persisted.metadata.updated_at;
         
         // Write tool file
         let json = serde_json::to_string_pretty(&persisted)?;
-        fs::write(&file_path, json).await?;
+        write_atomic(&file_path, json.as_bytes(), self.options.fsync).await?;
         
         // Update index
-        let path_key = tool.path.to_string();
-        self.index.tools.insert(path_key, ToolIndexEntry {
-            path: tool.path.clone(),
-            file_path: file_path.clone(),
-            checksum,
-            updated_at: now,
-        });
-        self.index.last_updated = now;
+        {
+            let mut index = self.index.lock().unwrap();
+            index.tools.insert(tool.path.to_string(), ToolIndexEntry {
+                path: tool.path.clone(),
+                file_path: file_path.clone(),
+                checksum,
+                updated_at: now,
+            });
+            index.last_updated = now;
+        }
         
         // Save index
         self.save_index().await?;
@@ -145,59 +268,52 @@ impl FilePersistence {
     
     /// Load a tool from persistent storage
     pub async fn load_tool(&self, path: &ToolPath) -> Result<Option<ToolDefinition>> {
-        let path_key = path.to_string();
+        let entry = self.index.lock().unwrap().tools.get(&path.to_string()).cloned();
+        let fallback = self.get_tool_file_path(path);
+        let path = path.clone();
         
-        // Check index first
-        if let Some(entry) = self.index.tools.get(&path_key) {
-            if entry.file_path.exists() {
-                let content = fs::read_to_string(&entry.file_path).await?;
-                let persisted: PersistedTool = serde_json::from_str(&content)?;
-                
-                // Verify checksum if desired
-                if persisted.metadata.checksum == entry.checksum {
-                    return Ok(Some(persisted.tool));
-                } else {
-                    tracing::warn!("Checksum mismatch for tool {}, file may be corrupted", path);
-                }
-            }
-        }
-        
-        // Fallback: try to load directly from expected path
-        let file_path = self.get_tool_file_path(path);
-        if file_path.exists() {
-            let content = fs::read_to_string(&file_path).await?;
-            let persisted: PersistedTool = serde_json::from_str(&content)?;
-            return Ok(Some(persisted.tool));
-        }
-        
-        Ok(None)
+        tokio::task::spawn_blocking(move || read_tool_file(&path, entry.as_ref(), &fallback)).await?
     }
     
-    /// List all persisted tools
+    /// List all persisted tools. Tool files are read and parsed concurrently, at
+    /// most `LOAD_CONCURRENCY` at a time.
     pub async fn list_tools(&self, namespace_filter: Option<&str>) -> Result<Vec<ToolDefinition>> {
-        let mut tools = Vec::new();
-        
-        for entry in self.index.tools.values() {
+        let started = Instant::now();
+        let mut pending = self.index.lock().unwrap().tools.values()
             // Apply namespace filter if specified
-            if let Some(filter) = namespace_filter {
-                let matches = match &entry.path.namespace {
-                    Namespace::User(user) => user == filter,
-                    Namespace::Bin => filter == "bin",
-                    Namespace::Sbin => filter == "sbin", 
-                    Namespace::Docs => filter == "docs",
+            .filter(|entry| matches_namespace(&entry.path, namespace_filter))
+            .map(|entry| (entry.clone(), self.get_tool_file_path(&entry.path)))
+            .collect::<Vec<_>>()
+            .into_iter();
+        
+        let mut tools = Vec::new();
+        let mut loads = JoinSet::new();
+        loop {
+            while loads.len() < LOAD_CONCURRENCY {
+                let (entry, fallback) = match pending.next() {
+                    Some(next) => next,
+                    None => break,
                 };
-                
-                if !matches {
-                    continue;
-                }
+                loads.spawn_blocking(move || {
+                    let result = read_tool_file(&entry.path, Some(&entry), &fallback);
+                    (entry.path, result)
+                });
             }
             
-            // Load tool
-            if let Ok(Some(tool)) = self.load_tool(&entry.path).await {
-                tools.push(tool);
+            match loads.join_next().await {
+                Some(load) => match load? {
+                    (_, Ok(Some(tool))) => tools.push(tool),
+                    (_, Ok(None)) => {}
+                    (path, Err(e)) => tracing::warn!("Skipping unreadable tool {}: {}", path, e),
+                },
+                None => break,
             }
         }
         
+        tracing::info!(
+            "Loaded {} tools from {} in {:?}",
+            tools.len(), self.storage_dir.display(), started.elapsed()
+        );
         Ok(tools)
     }
     
@@ -206,7 +322,8 @@ impl FilePersistence {
         let path_key = path.to_string();
         
         // Remove from index
-        if let Some(entry) = self.index.tools.remove(&path_key) {
+        let removed = self.index.lock().unwrap().tools.remove(&path_key);
+        if let Some(entry) = removed {
             // Delete file
             if entry.file_path.exists() {
                 fs::remove_file(&entry.file_path).await?;
@@ -217,7 +334,7 @@ impl FilePersistence {
             self.cleanup_empty_dirs(&entry.file_path).await?;
             
             // Update index
-            self.index.last_updated = Utc::now();
+            self.index.lock().unwrap().last_updated = Utc::now();
             self.save_index().await?;
             
             Ok(true)
@@ -226,22 +343,52 @@ impl FilePersistence {
         }
     }
     
-    
-    
-    
+    /// Write the index, or with group commit enabled, schedule one write for all
+    /// updates arriving within the commit window
     async fn save_index(&self) -> Result<()> {
-        let json = serde_json::to_string_pretty(&self.index)?;
-        fs::write(&self.index_path, json).await?;
+        let window = match self.options.group_commit {
+            Some(window) => window,
+            None => return write_index(&self.index, &self.index_path, self.options.fsync).await,
+        };
+        
+        let mut scheduled = self.commit.lock().await;
+        if *scheduled {
+            return Ok(());
+        }
+        
+        // Until the flush lands, the marker tells the next start to rebuild the index
+        write_atomic(&self.storage_dir.join(INDEX_DIRTY_MARKER), b"", self.options.fsync).await?;
+        *scheduled = true;
+        
+        let index = self.index.clone();
+        let commit = self.commit.clone();
+        let index_path = self.index_path.clone();
+        let marker_path = self.storage_dir.join(INDEX_DIRTY_MARKER);
+        let fsync = self.options.fsync;
+        tokio::spawn(async move {
+            tokio::time::sleep(window).await;
+            
+            let mut scheduled = commit.lock().await;
+            *scheduled = false;
+            let result = match write_index(&index, &index_path, fsync).await {
+                Ok(()) => fs::remove_file(&marker_path).await.map_err(anyhow::Error::from),
+                Err(e) => Err(e),
+            };
+            if let Err(e) = result {
+                tracing::warn!("Group commit of {} failed: {}", index_path.display(), e);
+            }
+        });
+        
         Ok(())
     }
     
     fn get_tool_file_path(&self, path: &ToolPath) -> PathBuf {
         let mut file_path = self.storage_dir.clone();
         
-        match &path.namespace {
+        match path.namespace() {
             Namespace::User(user) => {
                 file_path = file_path.join("users").join(user);
-                if let Some(package) = &path.package {
+                if let Some(package) = path.package() {
                     file_path = file_path.join(package);
                 }
             }
@@ -250,10 +397,10 @@ impl FilePersistence {
             Namespace::Docs => file_path = file_path.join("system").join("docs"),
         }
         
-        let filename = if path.version == "latest" {
-            format!("{}.json", path.name)
+        let filename = if path.version() == "latest" {
+            format!("{}.json", path.name())
         } else {
-            format!("{}_{}.json", path.name, path.version)
+            format!("{}_{}.json", path.name(), path.version())
         };
         
         file_path.join(filename)
@@ -282,6 +429,386 @@ impl FilePersistence {
     }
 }
 
+/// Read a tool file, checking it against its index entry when there is one and
+/// falling back to the tool's expected location
+fn read_tool_file(path: &ToolPath, entry: Option<&ToolIndexEntry>, fallback: &Path) -> Result<Option<ToolDefinition>> {
+    // Check index first
+    if let Some(entry) = entry {
+        if entry.file_path.exists() {
+            let persisted: PersistedTool = serde_json::from_slice(&std::fs::read(&entry.file_path)?)?;
+            
+            // Verify checksum if desired
+            if persisted.metadata.checksum == entry.checksum {
+                return Ok(Some(persisted.tool));
+            } else {
+                tracing::warn!("Checksum mismatch for tool {}, file may be corrupted", path);
+            }
+        }
+    }
+    
+    // Fallback: try to load directly from expected path
+    if fallback.exists() {
+        let persisted: PersistedTool = serde_json::from_slice(&std::fs::read(fallback)?)?;
+        return Ok(Some(persisted.tool));
+    }
+    
+    Ok(None)
+}
+
+/// Serialize the index and write it atomically
+async fn write_index(index: &StdMutex<ToolIndex>, index_path: &Path, fsync: FsyncPolicy) -> Result<()> {
+    let json = serde_json::to_string_pretty(&*index.lock().unwrap())?;
+    write_atomic(index_path, json.as_bytes(), fsync).await
+}
+
+/// Rebuild the index by reading every tool file under the storage directory
+fn rebuild_index(storage_dir: &Path) -> Result<ToolIndex> {
+    let mut index = ToolIndex::default();
+    let mut dirs = vec![storage_dir.join("users"), storage_dir.join("system")];
+    
+    while let Some(dir) = dirs.pop() {
+        if !dir.exists() {
+            continue;
+        }
+        for entry in std::fs::read_dir(&dir)? {
+            let file_path = entry?.path();
+            if file_path.is_dir() {
+                dirs.push(file_path);
+                continue;
+            }
+            if file_path.extension().and_then(|s| s.to_str()) != Some("json") {
+                continue;
+            }
+            
+            let persisted: PersistedTool = match std::fs::read(&file_path)
+                .map_err(anyhow::Error::from)
+                .and_then(|content| Ok(serde_json::from_slice(&content)?))
+            {
+                Ok(persisted) => persisted,
+                Err(e) => {
+                    tracing::warn!("Skipping unreadable tool file {}: {}", file_path.display(), e);
+                    continue;
+                }
+            };
+            index.tools.insert(persisted.tool.path.to_string(), ToolIndexEntry {
+                path: persisted.tool.path.clone(),
+                file_path,
+                checksum: persisted.metadata.checksum,
+                updated_at: persisted.metadata.updated_at,
+            });
+        }
+    }
+    
+    index.last_updated = Utc::now();
+    tracing::info!("Rebuilt index of {} tools in {}", index.tools.len(), storage_dir.display());
+    Ok(index)
+}
+
+/// Replace `path` with `content` so that readers (and a restart after a crash) see
+/// either the old or the new file, never a partial one
+async fn write_atomic(path: &Path, content: &[u8], fsync: FsyncPolicy) -> Result<()> {
+    let file_name = path.file_name()
+        .ok_or_else(|| anyhow!("Invalid storage path {}", path.display()))?
+        .to_string_lossy();
+    let temp_path = path.with_file_name(format!("{}.tmp", file_name));
+    
+    let mut file = fs::File::create(&temp_path).await?;
+    file.write_all(content).await?;
+    file.flush().await?;
+    if fsync == FsyncPolicy::Always {
+        file.sync_all().await?;
+    }
+    drop(file);
+    
+    fs::rename(&temp_path, path).await?;
+    if fsync == FsyncPolicy::Always {
+        sync_parent_dir(path).await?;
+    }
+    Ok(())
+}
+
+/// Make a rename or newly created file in a directory durable
+async fn sync_parent_dir(path: &Path) -> Result<()> {
+    // Only unix lets a directory be opened and synced
+    if cfg!(unix) {
+        if let Some(parent) = path.parent() {
+            fs::File::open(parent).await?.sync_all().await?;
+        }
+    }
+    Ok(())
+}
+
+impl StorageBackend for JsonFileBackend {
+    fn save_tool<'a>(&'a mut self, tool: &'a ToolDefinition) -> BoxFuture<'a, Result<()>> {
+        Box::pin(JsonFileBackend::save_tool(self, tool))
+    }
+    
+    fn load_tool<'a>(&'a self, path: &'a ToolPath) -> BoxFuture<'a, Result<Option<ToolDefinition>>> {
+        Box::pin(JsonFileBackend::load_tool(self, path))
+    }
+    
+    fn list_tools<'a>(&'a self, namespace_filter: Option<&'a str>) -> BoxFuture<'a, Result<Vec<ToolDefinition>>> {
+        Box::pin(JsonFileBackend::list_tools(self, namespace_filter))
+    }
+    
+    fn delete_tool<'a>(&'a mut self, path: &'a ToolPath) -> BoxFuture<'a, Result<bool>> {
+        Box::pin(JsonFileBackend::delete_tool(self, path))
+    }
+}
+
+impl PersistedTool {
+    /// Wrap a tool definition with fresh metadata for saving
+    fn new(tool: &ToolDefinition) -> Self {
+        let now = Utc::now();
+        Self {
+            metadata: ToolMetadata {
+                id: Uuid::new_v4().to_string(),
+                created_at: now,
+                updated_at: now,
+                checksum: calculate_checksum(&tool.script),
+                file_version: 1,
+            },
+            tool: tool.clone(),
+        }
+    }
+}
+
+/// Whether a tool belongs to the namespace named by `filter` (a user name, "bin", "sbin" or "docs")
+fn matches_namespace(path: &ToolPath, filter: Option<&str>) -> bool {
+    let filter = match filter {
+        Some(filter) => filter,
+        None => return true,
+    };
+    match path.namespace() {
+        Namespace::User(user) => user == filter,
+        Namespace::Bin => filter == "bin",
+        Namespace::Sbin => filter == "sbin",
+        Namespace::Docs => filter == "docs",
+    }
+}
+
+/// Name of the log file kept by `LogBackend` in the storage directory
+const LOG_FILE_NAME: &str = "tools.log";
+
+/// Present while a group-committed index update has not been written yet
+const INDEX_DIRTY_MARKER: &str = "index.dirty";
+
+/// Don't compact logs smaller than this many records
+const LOG_COMPACTION_MIN_RECORDS: usize = 256;
+
+/// A single mutation in the tool log
+#[derive(Debug, Serialize, Deserialize)]
+#[serde(tag = "op", rename_all = "snake_case")]
+enum LogRecord {
+    Put { tool: PersistedTool },
+    Delete { path: ToolPath },
+}
+
+/// Storage backend that appends every mutation to a single log file.
+///
+/// Each record is one line: a 16-digit hex checksum of the payload, a space and the
+/// JSON payload. Saving or deleting a tool writes only that record. The log is
+/// replayed into memory on open, stopping at the first torn or corrupt record, and
+/// rewritten with only live tools once superseded records outnumber them.
+pub struct LogBackend {
+    log_path: PathBuf,
+    file: fs::File,
+    fsync: FsyncPolicy,
+    tools: HashMap<String, PersistedTool>,
+    /// Records in the log file, live or superseded
+    records: usize,
+}
+
+impl LogBackend {
+    pub async fn open(storage_dir: PathBuf, fsync: FsyncPolicy) -> Result<Self> {
+        let started = Instant::now();
+        fs::create_dir_all(&storage_dir).await?;
+        let log_path = storage_dir.join(LOG_FILE_NAME);
+        
+        let content = match fs::read(&log_path).await {
+            Ok(content) => content,
+            Err(e) if e.kind() == std::io::ErrorKind::NotFound => Vec::new(),
+            Err(e) => return Err(e.into()),
+        };
+        
+        // Replay the log
+        let mut tools = HashMap::new();
+        let mut records = 0;
+        let mut valid_len = 0;
+        for line in content.split_inclusive(|&byte| byte == b'\n') {
+            match decode_record(line) {
+                Some(LogRecord::Put { tool }) => {
+                    tools.insert(tool.tool.path.to_string(), tool);
+                }
+                Some(LogRecord::Delete { path }) => {
+                    tools.remove(&path.to_string());
+                }
+                None => break,
+            }
+            records += 1;
+            valid_len += line.len();
+        }
+        
+        let file = fs::OpenOptions::new()
+            .create(true)
+            .append(true)
+            .open(&log_path)
+            .await?;
+        
+        // Drop a partially written tail so new records start on a clean line
+        if valid_len < content.len() {
+            tracing::warn!(
+                "Discarding {} bytes of torn or corrupt records at the end of {}",
+                content.len() - valid_len, log_path.display()
+            );
+            file.set_len(valid_len as u64).await?;
+        }
+        
+        let mut backend = Self {
+            log_path,
+            file,
+            fsync,
+            tools,
+            records,
+        };
+        if backend.needs_compaction() {
+            backend.compact().await?;
+        }
+        
+        tracing::info!(
+            "Loaded {} tools from {} in {:?}",
+            backend.tools.len(), backend.log_path.display(), started.elapsed()
+        );
+        Ok(backend)
+    }
+    
+    async fn append(&mut self, record: &LogRecord) -> Result<()> {
+        self.file.write_all(&encode_record(record)?).await?;
+        self.file.flush().await?;
+        if self.fsync == FsyncPolicy::Always {
+            self.file.sync_data().await?;
+        }
+        self.records += 1;
+        Ok(())
+    }
+    
+    fn needs_compaction(&self) -> bool {
+        self.records >= LOG_COMPACTION_MIN_RECORDS && self.records > 2 * self.tools.len()
+    }
+    
+    /// Rewrite the log with one record per live tool
+    async fn compact(&mut self) -> Result<()> {
+        let compact_path = self.log_path.with_extension("log.compact");
+        let mut content = Vec::new();
+        for tool in self.tools.values() {
+            content.extend(encode_record(&LogRecord::Put { tool: tool.clone() })?);
+        }
+        
+        let mut file = fs::File::create(&compact_path).await?;
+        file.write_all(&content).await?;
+        file.flush().await?;
+        if self.fsync == FsyncPolicy::Always {
+            file.sync_all().await?;
+        }
+        fs::rename(&compact_path, &self.log_path).await?;
+        if self.fsync == FsyncPolicy::Always {
+            sync_parent_dir(&self.log_path).await?;
+        }
+        
+        self.file = fs::OpenOptions::new().append(true).open(&self.log_path).await?;
+        tracing::debug!(
+            "Compacted {} from {} to {} records",
+            self.log_path.display(), self.records, self.tools.len()
+        );
+        self.records = self.tools.len();
+        Ok(())
+    }
+    
+    async fn save(&mut self, tool: &ToolDefinition) -> Result<()> {
+        let record = LogRecord::Put { tool: PersistedTool::new(tool) };
+        self.append(&record).await?;
+        if let LogRecord::Put { tool } = record {
+            self.tools.insert(tool.tool.path.to_string(), tool);
+        }
+        
+        if self.needs_compaction() {
+            self.compact().await?;
+        }
+        Ok(())
+    }
+    
+    async fn delete(&mut self, path: &ToolPath) -> Result<bool> {
+        if !self.tools.contains_key(&path.to_string()) {
+            return Ok(false);
+        }
+        
+        self.append(&LogRecord::Delete { path: path.clone() }).await?;
+        self.tools.remove(&path.to_string());
+        
+        if self.needs_compaction() {
+            self.compact().await?;
+        }
+        Ok(true)
+    }
+}
+
+impl StorageBackend for LogBackend {
+    fn save_tool<'a>(&'a mut self, tool: &'a ToolDefinition) -> BoxFuture<'a, Result<()>> {
+        Box::pin(self.save(tool))
+    }
+    
+    fn load_tool<'a>(&'a self, path: &'a ToolPath) -> BoxFuture<'a, Result<Option<ToolDefinition>>> {
+        let tool = self.tools.get(&path.to_string()).map(|persisted| persisted.tool.clone());
+        Box::pin(async move { Ok(tool) })
+    }
+    
+    fn list_tools<'a>(&'a self, namespace_filter: Option<&'a str>) -> BoxFuture<'a, Result<Vec<ToolDefinition>>> {
+        let tools = self.tools.values()
+            .filter(|persisted| matches_namespace(&persisted.tool.path, namespace_filter))
+            .map(|persisted| persisted.tool.clone())
+            .collect();
+        Box::pin(async move { Ok(tools) })
+    }
+    
+    fn delete_tool<'a>(&'a mut self, path: &'a ToolPath) -> BoxFuture<'a, Result<bool>> {
+        Box::pin(self.delete(path))
+    }
+}
+
+/// Serialize a log record as a checksummed line
+fn encode_record(record: &LogRecord) -> Result<Vec<u8>> {
+    let payload = serde_json::to_vec(record)?;
+    let mut line = format!("{:016x} ", record_checksum(&payload)).into_bytes();
+    line.extend_from_slice(&payload);
+    line.push(b'\n');
+    Ok(line)
+}
+
+/// Parse a log line, returning None if it is incomplete or fails its checksum
+fn decode_record(line: &[u8]) -> Option<LogRecord> {
+    let line = line.strip_suffix(b"\n")?;
+    if line.len() < 17 || line[16] != b' ' {
+        return None;
+    }
+    let checksum = u64::from_str_radix(std::str::from_utf8(&line[..16]).ok()?, 16).ok()?;
+    let payload = &line[17..];
+    if record_checksum(payload) != checksum {
+        return None;
+    }
+    serde_json::from_slice(payload).ok()
+}
+
+/// FNV-1a hash of a log record payload. Unlike `DefaultHasher` it is stable across
+/// builds, which matters for data written to disk.
+fn record_checksum(bytes: &[u8]) -> u64 {
+    let mut hash: u64 = 0xcbf29ce484222325;
+    for &byte in bytes {
+        hash ^= byte as u64;
+        hash = hash.wrapping_mul(0x100000001b3);
+    }
+    hash
+}
+
 /// Get the appropriate storage directory for the current platform
 fn get_storage_directory() -> Result<PathBuf> {
     let data_dir = dirs::data_local_dir()
@@ -290,8 +817,16 @@ fn get_storage_directory() -> Result<PathBuf> {
     Ok(data_dir.join("tcl-mcp-server").join("tools.storage"))
 }
 
+/// Location of the saved tool discovery results
+pub fn discovery_index_path() -> Result<PathBuf> {
+    let data_dir = dirs::data_local_dir()
+        .ok_or_else(|| anyhow!("Could not determine local data directory"))?;
+    
+    Ok(data_dir.join("tcl-mcp-server").join("discovery-index.json"))
+}
+
 /// Calculate a simple checksum for tool script content
-fn calculate_checksum(content: &str) -> String {
+pub fn calculate_checksum(content: &str) -> String {
     use std::collections::hash_map::DefaultHasher;
     use std::hash::{Hash, Hasher};
     
@@ -371,7 +906,7 @@ mod tests {
         // List tools by namespace
         let alice_tools = persistence.list_tools(Some("alice")).await?;
         assert_eq!(alice_tools.len(), 1);
-        assert_eq!(alice_tools[0].path.namespace, Namespace::User("alice".to_string()));
+        assert_eq!(alice_tools[0].path.namespace(), &Namespace::User("alice".to_string()));
         
         Ok(())
     }
@@ -400,4 +935,146 @@ mod tests {
         
         Ok(())
     }
-}
\ No newline at end of file
+
+    fn create_other_tool() -> ToolDefinition {
+        ToolDefinition {
+            path: ToolPath::user("bob", "math", "calculator", "2.0"),
+            description: "Calculator tool".to_string(),
+            script: "expr $a + $b".to_string(),
+            parameters: vec![],
+        }
+    }
+    
+    #[tokio::test]
+    async fn test_log_backend_survives_reopen_and_torn_tail() -> Result<()> {
+        use std::io::Write;
+        
+        let temp = TempDir::new()?;
+        let dir = temp.path().to_path_buf();
+        let tool = create_test_tool();
+        let other = create_other_tool();
+        let log_options = StorageOptions { backend: StorageBackendKind::Log, ..Default::default() };
+        
+        let mut persistence = FilePersistence::open_in(&log_options, dir.clone()).await?;
+        persistence.save_tool(&tool).await?;
+        persistence.save_tool(&other).await?;
+        assert!(persistence.delete_tool(&other.path).await?);
+        drop(persistence);
+        
+        // Simulate a crash in the middle of appending a record
+        let mut file = std::fs::OpenOptions::new().append(true).open(dir.join(LOG_FILE_NAME))?;
+        file.write_all(b"0123456789abcdef {\"op\":\"put\"")?;
+        drop(file);
+        
+        let mut persistence = FilePersistence::open_in(&log_options, dir.clone()).await?;
+        let tools = persistence.list_tools(None).await?;
+        assert_eq!(tools.len(), 1);
+        assert_eq!(tools[0].path, tool.path);
+        
+        // Records appended after recovery are readable
+        persistence.save_tool(&other).await?;
+        drop(persistence);
+        let persistence = FilePersistence::open_in(&log_options, dir).await?;
+        assert_eq!(persistence.list_tools(None).await?.len(), 2);
+        assert_eq!(persistence.list_tools(Some("bob")).await?.len(), 1);
+        
+        Ok(())
+    }
+    
+    #[tokio::test]
+    async fn test_log_backend_compaction() -> Result<()> {
+        let temp = TempDir::new()?;
+        let mut backend = LogBackend::open(temp.path().to_path_buf(), FsyncPolicy::Always).await?;
+        let tool = create_test_tool();
+        
+        for _ in 0..LOG_COMPACTION_MIN_RECORDS {
+            backend.save(&tool).await?;
+        }
+        assert_eq!(backend.tools.len(), 1);
+        assert!(backend.records < LOG_COMPACTION_MIN_RECORDS);
+        drop(backend);
+        
+        let backend = LogBackend::open(temp.path().to_path_buf(), FsyncPolicy::Always).await?;
+        assert_eq!(backend.tools.len(), 1);
+        assert_eq!(backend.records, 1);
+        
+        Ok(())
+    }
+
+    #[tokio::test]
+    async fn test_list_tools_loads_many_concurrently() -> Result<()> {
+        let (mut persistence, temp) = create_test_persistence().await?;
+        let count = LOAD_CONCURRENCY * 3 + 1;
+        for i in 0..count {
+            let mut tool = create_test_tool();
+            tool.path = ToolPath::user("alice", "bulk", format!("tool_{}", i), "1.0");
+            persistence.save_tool(&tool).await?;
+        }
+        
+        // A corrupt tool file is skipped rather than failing the whole load
+        let broken = ToolPath::user("alice", "bulk", "tool_0", "1.0");
+        std::fs::write(temp.path().join("users").join("alice").join("bulk").join("tool_0_1.0.json"), "{")?;
+        
+        let tools = persistence.list_tools(Some("alice")).await?;
+        assert_eq!(tools.len(), count - 1);
+        assert!(tools.iter().all(|tool| tool.path != broken));
+        
+        Ok(())
+    }
+
+    #[tokio::test]
+    async fn test_group_commit_batches_index_writes() -> Result<()> {
+        let temp = TempDir::new()?;
+        // No fsyncs and a wide window, so a slow disk cannot close the window while
+        // the tools are still being saved
+        let options = StorageOptions {
+            group_commit: Some(Duration::from_secs(2)),
+            fsync: FsyncPolicy::Never,
+            ..Default::default()
+        };
+        let mut persistence = FilePersistence::open_in(&options, temp.path().to_path_buf()).await?;
+        
+        for i in 0..5 {
+            let mut tool = create_test_tool();
+            tool.path = ToolPath::user("alice", "utils", format!("tool_{}", i), "1.0");
+            persistence.save_tool(&tool).await?;
+        }
+        
+        // Tool files are written immediately, the index once the window closes
+        assert!(!temp.path().join("index.json").exists());
+        assert!(temp.path().join(INDEX_DIRTY_MARKER).exists());
+        let deadline = std::time::Instant::now() + Duration::from_secs(10);
+        while temp.path().join(INDEX_DIRTY_MARKER).exists() && std::time::Instant::now() < deadline {
+            tokio::time::sleep(Duration::from_millis(50)).await;
+        }
+        
+        let index: ToolIndex = serde_json::from_str(&std::fs::read_to_string(temp.path().join("index.json"))?)?;
+        assert_eq!(index.tools.len(), 5);
+        assert!(!temp.path().join(INDEX_DIRTY_MARKER).exists());
+        
+        Ok(())
+    }
+    
+    #[tokio::test]
+    async fn test_index_rebuilt_after_crash() -> Result<()> {
+        let (mut persistence, temp) = create_test_persistence().await?;
+        persistence.save_tool(&create_test_tool()).await?;
+        persistence.save_tool(&create_other_tool()).await?;
+        drop(persistence);
+        
+        // A torn index is rebuilt from the tool files instead of starting empty
+        std::fs::write(temp.path().join("index.json"), "{\"tools\": {")?;
+        let persistence = FilePersistence::with_directory(temp.path().to_path_buf()).await?;
+        assert_eq!(persistence.list_tools(None).await?.len(), 2);
+        drop(persistence);
+        
+        // So is an index whose group commit never landed
+        std::fs::write(temp.path().join("index.json"), serde_json::to_string(&ToolIndex::default())?)?;
+        std::fs::write(temp.path().join(INDEX_DIRTY_MARKER), "")?;
+        let persistence = FilePersistence::with_directory(temp.path().to_path_buf()).await?;
+        assert_eq!(persistence.list_tools(None).await?.len(), 2);
+        assert!(!temp.path().join(INDEX_DIRTY_MARKER).exists());
+        
+        Ok(())
+    }
+}
@@ -0,0 +1,199 @@
+use anyhow::Result;
+use serde::{Deserialize, Serialize};
+use std::collections::HashMap;
+use std::rc::Rc;
+use std::sync::Arc;
+use std::sync::atomic::{AtomicU64, Ordering};
+
+use crate::namespace::ToolPath;
+use crate::tcl_runtime::{CompiledScript, TclRuntime};
+
+/// Per-worker cache of compiled tool scripts with LRU eviction.
+///
+/// Entries are keyed by tool path and validated against the script checksum, so a
+/// tool that was replaced is recompiled on its next call. Compiled scripts belong to
+/// the worker thread that created them; only the counters are shared across the pool.
+pub struct ScriptCache {
+    capacity: usize,
+    entries: HashMap<ToolPath, CachedScript>,
+    /// Monotonic use counter for LRU ordering
+    tick: u64,
+    /// Registry generation the entries were last validated against
+    generation: u64,
+    stats: Arc<ScriptCacheStats>,
+}
+
+struct CachedScript {
+    checksum: String,
+    compiled: Rc<CompiledScript>,
+    last_used: u64,
+}
+
+/// Hit/miss counters shared by the script caches of every worker
+#[derive(Debug, Default)]
+pub struct ScriptCacheStats {
+    hits: AtomicU64,
+    misses: AtomicU64,
+    invalidations: AtomicU64,
+    evictions: AtomicU64,
+}
+
+/// Point-in-time view of the script cache counters
+#[derive(Debug, Clone, Default, Serialize, Deserialize)]
+pub struct ScriptCacheStatsSnapshot {
+    pub hits: u64,
+    pub misses: u64,
+    pub invalidations: u64,
+    pub evictions: u64,
+}
+
+impl ScriptCacheStats {
+    pub fn snapshot(&self) -> ScriptCacheStatsSnapshot {
+        ScriptCacheStatsSnapshot {
+            hits: self.hits.load(Ordering::Relaxed),
+            misses: self.misses.load(Ordering::Relaxed),
+            invalidations: self.invalidations.load(Ordering::Relaxed),
+            evictions: self.evictions.load(Ordering::Relaxed),
+        }
+    }
+}
+
+impl ScriptCache {
+    pub fn new(capacity: usize, stats: Arc<ScriptCacheStats>) -> Self {
+        Self {
+            capacity: capacity.max(1),
+            entries: HashMap::new(),
+            tick: 0,
+            generation: 0,
+            stats,
+        }
+    }
+    
+    /// Return the compiled form of a tool script, compiling it on a miss and evicting
+    /// the least recently used entry if full.
+    ///
+    /// `source` is only called on a miss, so callers can avoid copying the script
+    /// text when the cached entry is still valid.
+    pub fn get_or_compile(
+        &mut self,
+        path: &ToolPath,
+        checksum: &str,
+        source: impl FnOnce() -> String,
+        runtime: &mut dyn TclRuntime,
+    ) -> Result<Rc<CompiledScript>> {
+        self.tick += 1;
+        if let Some(entry) = self.entries.get_mut(path) {
+            if entry.checksum == checksum {
+                entry.last_used = self.tick;
+                self.stats.hits.fetch_add(1, Ordering::Relaxed);
+                return Ok(entry.compiled.clone());
+            }
+        }
+        
+        self.stats.misses.fetch_add(1, Ordering::Relaxed);
+        let compiled = Rc::new(runtime.compile(&source())?);
+        
+        if !self.entries.contains_key(path) && self.entries.len() >= self.capacity {
+            let oldest = self.entries.iter()
+                .min_by_key(|(_, entry)| entry.last_used)
+                .map(|(path, _)| path.clone());
+            if let Some(oldest) = oldest {
+                self.entries.remove(&oldest);
+                self.stats.evictions.fetch_add(1, Ordering::Relaxed);
+            }
+        }
+        
+        self.entries.insert(path.clone(), CachedScript {
+            checksum: checksum.to_string(),
+            compiled: compiled.clone(),
+            last_used: self.tick,
+        });
+        Ok(compiled)
+    }
+    
+    /// Drop entries that no longer match the registry.
+    ///
+    /// Cheap when nothing changed: entries are only re-validated when the registry
+    /// generation differs from the one seen last. `current_checksum` returns the
+    /// checksum registered for a path, `Some("")` when the tool exists but its
+    /// checksum is only known at call time, or `None` when it was removed.
+    pub fn sync(&mut self, generation: u64, current_checksum: impl Fn(&ToolPath) -> Option<String>) {
+        if generation == self.generation {
+            return;
+        }
+        
+        let before = self.entries.len();
+        self.entries.retain(|path, entry| match current_checksum(path) {
+            Some(checksum) => checksum.is_empty() || checksum == entry.checksum,
+            None => false,
+        });
+        
+        let removed = (before - self.entries.len()) as u64;
+        if removed > 0 {
+            self.stats.invalidations.fetch_add(removed, Ordering::Relaxed);
+        }
+        self.generation = generation;
+    }
+    
+    pub fn len(&self) -> usize {
+        self.entries.len()
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+    use crate::tcl_runtime::create_runtime;
+    
+    #[test]
+    fn test_cache_hit_and_invalidation() {
+        let stats = Arc::new(ScriptCacheStats::default());
+        let mut cache = ScriptCache::new(16, stats.clone());
+        let mut runtime = create_runtime();
+        let path = ToolPath::user("alice", "math", "answer", "latest");
+        
+        let compiled = cache.get_or_compile(&path, "abc", || "expr {6 * 7}".to_string(), runtime.as_mut()).unwrap();
+        assert_eq!(runtime.eval_compiled(&compiled).unwrap(), "42");
+        
+        // Same checksum: served from the cache without touching the source
+        let compiled = cache.get_or_compile(&path, "abc", || unreachable!(), runtime.as_mut()).unwrap();
+        assert_eq!(runtime.eval_compiled(&compiled).unwrap(), "42");
+        
+        // Changed checksum: recompiled
+        cache.get_or_compile(&path, "def", || "expr {1 + 1}".to_string(), runtime.as_mut()).unwrap();
+        
+        let snapshot = stats.snapshot();
+        assert_eq!(snapshot.hits, 1);
+        assert_eq!(snapshot.misses, 2);
+        
+        // Removed from the registry: dropped on the next generation
+        cache.sync(1, |_| None);
+        assert_eq!(cache.len(), 0);
+        assert_eq!(stats.snapshot().invalidations, 1);
+    }
+    
+    #[test]
+    fn test_cache_evicts_least_recently_used() {
+        let stats = Arc::new(ScriptCacheStats::default());
+        let mut cache = ScriptCache::new(2, stats.clone());
+        let mut runtime = create_runtime();
+        let first = ToolPath::user("alice", "math", "first", "latest");
+        let second = ToolPath::user("alice", "math", "second", "latest");
+        let third = ToolPath::user("alice", "math", "third", "latest");
+        
+        cache.get_or_compile(&first, "1", || "expr {1}".to_string(), runtime.as_mut()).unwrap();
+        cache.get_or_compile(&second, "2", || "expr {2}".to_string(), runtime.as_mut()).unwrap();
+        // Touch the first entry so the second is the least recently used
+        cache.get_or_compile(&first, "1", || unreachable!(), runtime.as_mut()).unwrap();
+        
+        cache.get_or_compile(&third, "3", || "expr {3}".to_string(), runtime.as_mut()).unwrap();
+        assert_eq!(cache.len(), 2);
+        assert_eq!(stats.snapshot().evictions, 1);
+        
+        // The first entry survived, the second has to be compiled again
+        cache.get_or_compile(&first, "1", || unreachable!(), runtime.as_mut()).unwrap();
+        let compiled = cache.get_or_compile(&second, "2", || "expr {2}".to_string(), runtime.as_mut()).unwrap();
+        assert_eq!(runtime.eval_compiled(&compiled).unwrap(), "2");
+        assert_eq!(stats.snapshot().misses, 4);
+    }
+}
@@ -1,38 +1,115 @@
 use anyhow::Result;
+use std::sync::atomic::AtomicBool;
+use std::sync::{Arc, OnceLock};
 use jsonrpc_core::{IoHandler, Params, Value};
 use serde::{Deserialize, Serialize};
 use serde_json::json;
-use tokio::io::{AsyncBufReadExt, AsyncWriteExt, BufReader};
-use tracing::{info, debug};
+use tokio::io::{AsyncBufRead, AsyncBufReadExt, AsyncWrite, AsyncWriteExt, BufReader, BufWriter};
+use tokio::sync::{mpsc, oneshot, OwnedSemaphorePermit, Semaphore};
+use tokio::task::JoinHandle;
+use tracing::{info, debug, error};
 
 use crate::tcl_tools::{TclToolBox, TclExecuteRequest, TclToolAddRequest, TclToolRemoveRequest, TclToolListRequest, TclExecToolRequest};
-use crate::tcl_executor::TclExecutor;
+use crate::tcl_executor::{TclExecutor, ExecutorConfig, Cancellations, ServerBusy, TrackedCall, SERVER_BUSY_CODE};
 use crate::namespace::ToolPath;
 use crate::tcl_runtime::RuntimeConfig;
+use crate::tool_listing::{ToolListCache, system_tool_entry};
+use crate::streaming::{forward_output, script_output_channel};
+use crate::lanes::{Lane, LaneQueue, LaneStats, DEFAULT_LANE_DEPTH};
+
+/// Default number of stdio requests processed concurrently
+pub const DEFAULT_MAX_IN_FLIGHT: usize = 32;
 
 #[derive(Clone)]
 pub struct TclMcpServer {
     tool_box: TclToolBox,
-    handler: IoHandler,
+    handler: Arc<IoHandler>,
+    /// Requests processed concurrently by `run_stdio`
+    max_in_flight: usize,
+    /// Delivers progress notifications once `run_stdio` is serving
+    notifier: Notifier,
+    /// Running `tools/call` requests, for `notifications/cancelled`
+    cancellations: Cancellations,
+    /// Occupancy and waiting times of the stdio request lanes
+    lane_stats: Arc<LaneStats>,
 }
 
-#[derive(Debug, Serialize, Deserialize)]
-struct McpToolInfo {
-    name: String,
-    description: Option<String>,
-    #[serde(rename = "inputSchema")]
-    input_schema: Value,
+tokio::task_local! {
+    /// Cancel flag of the `tools/call` being handled by this task. Every request is
+    /// handled in a task of its own, where `Dispatcher` sets it.
+    static CALL_CANCEL: Option<Arc<AtomicBool>>;
+}
+
+/// Sends server-initiated messages on the stdio transport once it is running
+#[derive(Clone, Default)]
+struct Notifier {
+    /// Held weakly so that the writer still finishes when input ends
+    outgoing: Arc<OnceLock<mpsc::WeakSender<String>>>,
+}
+
+impl Notifier {
+    fn attach(&self, outgoing: &mpsc::Sender<String>) {
+        let _ = self.outgoing.set(outgoing.downgrade());
+    }
+    
+    /// Queue a message from a blocking thread; `false` once nothing will write it
+    fn send(&self, message: String) -> bool {
+        match self.outgoing.get().and_then(|outgoing| outgoing.upgrade()) {
+            Some(outgoing) => outgoing.blocking_send(message).is_ok(),
+            None => false,
+        }
+    }
 }
 
 #[derive(Debug, Serialize, Deserialize)]
-struct McpListToolsResult {
-    tools: Vec<McpToolInfo>,
+struct McpListToolsParams {
+    cursor: Option<String>,
 }
 
 #[derive(Debug, Serialize, Deserialize)]
 struct McpCallToolParams {
     name: String,
     arguments: Value,
+    #[serde(default, rename = "_meta", skip_serializing_if = "Option::is_none")]
+    meta: Option<McpRequestMeta>,
+}
+
+#[derive(Debug, Serialize, Deserialize)]
+struct McpCancelledParams {
+    #[serde(rename = "requestId")]
+    request_id: Value,
+    #[serde(default)]
+    reason: Option<String>,
+}
+
+/// The parts of a JSON-RPC request needed to route it, without its params
+#[derive(Debug, Deserialize)]
+struct RequestHead {
+    #[serde(default)]
+    method: Option<String>,
+    #[serde(default)]
+    id: Option<Value>,
+}
+
+/// The parts of a JSON-RPC request that decide its lane
+#[derive(Debug, Deserialize)]
+struct LaneHead {
+    #[serde(default)]
+    method: Option<String>,
+    #[serde(default)]
+    params: Option<LaneParams>,
+}
+
+#[derive(Debug, Deserialize)]
+struct LaneParams {
+    #[serde(default)]
+    name: Option<String>,
+}
+
+#[derive(Debug, Serialize, Deserialize)]
+struct McpRequestMeta {
+    #[serde(rename = "progressToken")]
+    progress_token: Option<Value>,
 }
 
 #[derive(Debug, Serialize, Deserialize)]
@@ -49,8 +126,17 @@ enum McpContent {
 
 impl TclMcpServer {
     pub fn new(privileged: bool) -> Self {
-        // Spawn the TCL executor with privilege settings
-        let executor = TclExecutor::spawn(privileged);
+        Self::new_with_config(privileged, RuntimeConfig::default(), ExecutorConfig::default())
+            .expect("Failed to spawn TCL executor")
+    }
+    
+    pub fn new_with_runtime(privileged: bool, runtime_config: RuntimeConfig) -> Result<Self, String> {
+        Self::new_with_config(privileged, runtime_config, ExecutorConfig::default())
+    }
+    
+    pub fn new_with_config(privileged: bool, runtime_config: RuntimeConfig, executor_config: ExecutorConfig) -> Result<Self, String> {
+        // Spawn the TCL executor pool with privilege, runtime and pool settings
+        let executor = TclExecutor::spawn_pool(privileged, runtime_config, executor_config)?;
         let tool_box = TclToolBox::new(executor);
         let mut handler = IoHandler::new();
         
@@ -71,782 +157,229 @@ impl TclMcpServer {
         
         let tb = tool_box.clone();
         let is_privileged = privileged;
-        handler.add_sync_method("tools/list", move |_params: Params| {
-            debug!("MCP tools/list called (privileged: {})", is_privileged);
-            let tb = tb.clone();
-            
-            // Don't use async block here since we're in a sync context
-            let mut tools = vec![];
-                
-                // Add system tools with MCP-compatible names
-                let mut system_tools = vec![
-                    (ToolPath::bin("tcl_execute"), "Execute a TCL script and return the result", json!({
-                        "$schema": "https://json-schema.org/draft/2020-12/schema",
-                        "type": "object",
-                        "properties": {
-                            "script": {
-                                "type": "string",
-                                "description": "TCL script to execute"
-                            }
+        // System tools never change, so their entries are built once per server
+        let mut tools = vec![];
+        
+        // In privileged mode, show tool management tools
+        if is_privileged {
+            let system_tools = vec![
+                (ToolPath::bin("tcl_execute"), "Execute TCL scripts", json!({
+                    "type": "object",
+                    "properties": {
+                        "script": {
+                            "type": "string", 
+                            "description": "The TCL script to execute"
                         },
-                        "required": ["script"]
-                    })),
-                    (ToolPath::bin("tcl_tool_list"), "List all available TCL tools", json!({
-                        "$schema": "https://json-schema.org/draft/2020-12/schema",
-                        "type": "object",
-                        "properties": {
-                            "namespace": {
-                                "type": "string",
-                                "description": "Filter tools by namespace (optional)"
-                            },
-                            "filter": {
-                                "type": "string",
-                                "description": "Filter tools by name pattern (optional)"
-                            }
+                        "timeout_ms": {
+                            "type": "integer",
+                            "description": "Stop the script after this many milliseconds (optional)"
                         }
-                    })),
-                    (ToolPath::docs("molt_book"), "Access Molt TCL interpreter documentation and examples", json!({
-                        "$schema": "https://json-schema.org/draft/2020-12/schema",
-                        "type": "object",
-                        "properties": {
-                            "topic": {
-                                "type": "string",
-                                "description": "Documentation topic: 'overview', 'commands', 'examples', 'links', or 'basic_syntax'",
-                                "enum": ["overview", "commands", "examples", "links", "basic_syntax"]
-                            }
+                    },
+                    "required": ["script"]
+                })),
+                (ToolPath::sbin("tcl_tool_add"), "Add custom TCL tool", json!({
+                    "type": "object",
+                    "properties": {
+                        "path": {
+                            "type": "string",
+                            "description": "Tool path (e.g., user/my_tool)"
                         },
-                        "required": ["topic"]
-                    })),
-                    (ToolPath::bin("exec_tool"), "Execute a tool by its path with parameters", json!({
-                        "$schema": "https://json-schema.org/draft/2020-12/schema",
-                        "type": "object",
-                        "properties": {
-                            "tool_path": {
-                                "type": "string",
-                                "description": "Full path to the tool (e.g., '/bin/list_dir')"
-                            },
-                            "params": {
-                                "type": "object",
-                                "description": "Parameters to pass to the tool",
-                                "default": {}
-                            }
+                        "description": {
+                            "type": "string",
+                            "description": "Tool description"
                         },
-                        "required": ["tool_path"]
-                    })),
-                    (ToolPath::bin("discover_tools"), "Discover and index tools from the filesystem", json!({
-                        "$schema": "https://json-schema.org/draft/2020-12/schema",
-                        "type": "object",
-                        "properties": {}
-                    })),
-                ];
-                
-                // Add privileged tools only if in privileged mode
-                if is_privileged {
-                    system_tools.push((ToolPath::sbin("tcl_tool_add"), "Add a new TCL tool to the available tools (PRIVILEGED)", json!({
-                        "$schema": "https://json-schema.org/draft/2020-12/schema",
-                        "type": "object",
-                        "properties": {
-                            "user": {
-                                "type": "string",
-                                "description": "User namespace"
-                            },
-                            "package": {
-                                "type": "string",
-                                "description": "Package name"
-                            },
-                            "name": {
-                                "type": "string",
-                                "description": "Name of the new tool"
-                            },
-                            "version": {
-                                "type": "string",
-                                "description": "Version of the tool (defaults to 'latest')",
-                                "default": "latest"
-                            },
-                            "description": {
-                                "type": "string",
-                                "description": "Description of what the tool does"
-                            },
-                            "script": {
-                                "type": "string",
-                                "description": "TCL script that implements the tool"
-                            },
-                            "parameters": {
-                                "type": "array",
-                                "description": "Parameters that the tool accepts",
-                                "items": {
-                                    "type": "object",
-                                    "properties": {
-                                        "name": { "type": "string" },
-                                        "description": { "type": "string" },
-                                        "required": { "type": "boolean" },
-                                        "type_name": { "type": "string" }
-                                    },
-                                    "required": ["name", "description", "required", "type_name"]
-                                }
-                            }
+                        "script": {
+                            "type": "string",
+                            "description": "TCL script for the tool"
                         },
-                        "required": ["user", "package", "name", "description", "script"]
-                    })));
-                    system_tools.push((ToolPath::sbin("tcl_tool_remove"), "Remove a TCL tool from the available tools (PRIVILEGED)", json!({
-                        "$schema": "https://json-schema.org/draft/2020-12/schema",
-                        "type": "object",
-                        "properties": {
-                            "path": {
-                                "type": "string",
-                                "description": "Full tool path (e.g., '/alice/utils/reverse_string:1.0')"
-                            }
+                        "parameters": {
+                            "type": "string",
+                            "description": "JSON array of parameter definitions"
+                        }
+                    },
+                    "required": ["path", "description", "script"]
+                })),
+                (ToolPath::sbin("tcl_tool_remove"), "Remove custom TCL tool", json!({
+                    "type": "object",
+                    "properties": {
+                        "path": {
+                            "type": "string",
+                            "description": "Tool path to remove (e.g., user/my_tool)"
+                        }
+                    },
+                    "required": ["path"]
+                })),
+                (ToolPath::bin("tcl_tool_list"), "List available tools", json!({
+                    "type": "object",
+                    "properties": {
+                        "namespace": {
+                            "type": "string", 
+                            "description": "Optional namespace filter"
                         },
-                        "required": ["path"]
-                    })));
-                }
-                
-                for (path, description, schema) in system_tools {
-                    tools.push(McpToolInfo {
-                        name: path.to_mcp_name(),
-                        description: Some(format!("{} [{}]", description, path)),
-                        input_schema: schema,
-                    });
-                }
-                
-            // Get custom tools synchronously - this should be fast
-            let custom_tools = match std::thread::spawn(move || {
-                let rt = tokio::runtime::Runtime::new().unwrap();
-                rt.block_on(tb.get_tool_definitions())
-            }).join() {
-                Ok(result) => result,
-                Err(_) => {
-                    return Err(jsonrpc_core::Error::internal_error());
-                }
-            };
-            
-            // Add custom tools to the list
-            if let Ok(tool_defs) = custom_tools {
-                for tool_def in tool_defs {
-                    // Build input schema for custom tool
-                    let mut properties = serde_json::Map::new();
-                    let mut required = Vec::new();
-                    
-                    for param in &tool_def.parameters {
-                        // Validate and normalize JSON Schema type
-                        let json_type = match param.type_name.to_lowercase().as_str() {
-                            "string" | "str" | "text" => "string",
-                            "number" | "float" | "double" | "real" => "number",
-                            "integer" | "int" | "long" => "integer", 
-                            "boolean" | "bool" => "boolean",
-                            "array" | "list" => "array",
-                            "object" | "dict" | "map" => "object",
-                            "null" | "nil" | "none" => "null",
-                            // Default to string for unknown types to maintain compatibility
-                            _ => "string"
-                        };
-                        
-                        properties.insert(
-                            param.name.clone(),
-                            json!({
-                                "type": json_type,
-                                "description": param.description,
-                            }),
-                        );
-                        
-                        if param.required {
-                            required.push(param.name.clone());
+                        "filter": {
+                            "type": "string",
+                            "description": "Optional name filter"
                         }
                     }
-                    
-                    // Build the schema object, only including "required" if it's not empty
-                    let mut schema_obj = serde_json::Map::new();
-                    schema_obj.insert("$schema".to_string(), json!("https://json-schema.org/draft/2020-12/schema"));
-                    schema_obj.insert("type".to_string(), json!("object"));
-                    schema_obj.insert("properties".to_string(), json!(properties));
-                    
-                    // Only add "required" array if there are required parameters
-                    if !required.is_empty() {
-                        schema_obj.insert("required".to_string(), json!(required));
-                    }
-                    
-                    let input_schema = serde_json::Value::Object(schema_obj);
-                    
-                    tools.push(McpToolInfo {
-                        name: tool_def.path.to_mcp_name(),
-                        description: Some(format!("{} [{}]", tool_def.description, tool_def.path)),
-                        input_schema,
-                    });
-                }
-            }
-            
-            Ok(json!(McpListToolsResult { tools }))
-        });
-        
-        let tb = tool_box.clone();
-        let is_privileged_call = privileged;
-        handler.add_sync_method("tools/call", move |params: Params| {
-            debug!("MCP tools/call called with params: {:?}", params);
-            let tb = tb.clone();
-            
-            let params: McpCallToolParams = params.parse()?;
-            info!("Calling tool: {} (privileged: {})", params.name, is_privileged_call);
-            
-            let result = std::thread::spawn(move || {
-                let rt = tokio::runtime::Runtime::new().unwrap();
-                rt.block_on(async move {
-                // Check if it's a system tool by MCP name
-                match params.name.as_str() {
-                    "bin___tcl_execute" => {
-                        let request: TclExecuteRequest = serde_json::from_value(params.arguments)?;
-                        tb.tcl_execute(request).await
-                    }
-                    "sbin___tcl_tool_add" => {
-                        if !is_privileged_call {
-                            return Err(anyhow::anyhow!("Tool management requires --privileged mode"));
+                })),
+                (ToolPath::bin("exec_tool"), "Execute a tool by path", json!({
+                    "type": "object",
+                    "properties": {
+                        "tool_path": {
+                            "type": "string",
+                            "description": "Path to the tool (e.g., bin/tcl_execute)"
+                        },
+                        "params": {
+                            "type": "object",
+                            "description": "Parameters for the tool"
                         }
-                        let request: TclToolAddRequest = serde_json::from_value(params.arguments)?;
-                        tb.tcl_tool_add(request).await
-                    }
-                    "sbin___tcl_tool_remove" => {
-                        if !is_privileged_call {
-                            return Err(anyhow::anyhow!("Tool management requires --privileged mode"));
+                    },
+                    "required": ["tool_path"]
+                })),
+                (ToolPath::bin("discover_tools"), "Discover tools from filesystem", json!({
+                    "type": "object",
+                    "properties": {
+                        "path": {
+                            "type": "string",
+                            "description": "Optional path to search for tools"
                         }
-                        let request: TclToolRemoveRequest = serde_json::from_value(params.arguments)?;
-                        tb.tcl_tool_remove(request).await
-                    }
-                    "bin___tcl_tool_list" => {
-                        let request: TclToolListRequest = serde_json::from_value(params.arguments)?;
-                        tb.tcl_tool_list(request).await
                     }
-                    "bin___exec_tool" => {
-                        let request: TclExecToolRequest = serde_json::from_value(params.arguments)?;
-                        tb.exec_tool(request).await
-                    }
-                    "bin___discover_tools" => {
-                        tb.discover_tools().await
-                    }
-                    "docs___molt_book" => {
-                        // Handle documentation request
-                        let topic = params.arguments.get("topic")
-                            .and_then(|v| v.as_str())
-                            .unwrap_or("overview");
-                        
-                        match topic {
-                            "overview" => Ok(format!(r#"# Molt TCL Interpreter Overview
-
-## What is Molt?
-Molt is a TCL (Tool Command Language) interpreter implemented in Rust. It provides a memory-safe, 
-embeddable scripting language with familiar TCL syntax.
-
-## Key Features
-- Memory-safe implementation in Rust
-- Compatible with core TCL commands
-- Embeddable in Rust applications
-- Thread-safe design
-- Standard TCL control structures and data types
-
-## Documentation Links
-- Molt Book: https://wduquette.github.io/molt/
-- GitHub Repository: https://github.com/wduquette/molt
-- Source Documentation: https://github.com/wduquette/molt/tree/master/molt-book/src
-
-Use 'basic_syntax', 'commands', 'examples', or 'links' for more specific information."#)),
-                            "basic_syntax" => Ok(format!(r#"# TCL Basic Syntax
-
-## Variables
-```tcl
-set name "Alice"
-set age 30
-puts "Hello, $name! You are $age years old."
-```
-
-## Lists
-```tcl
-set fruits [list apple banana cherry]
-set first [lindex $fruits 0]  ;# apple
-set length [llength $fruits]  ;# 3
-```
-
-## Control Structures
-```tcl
-# If statement
-if {{$age >= 18}} {{
-    puts "Adult"
-}} else {{
-    puts "Minor"
-}}
-
-# For loop
-for {{set i 0}} {{$i < 5}} {{incr i}} {{
-    puts "Count: $i"
-}}
-
-# Foreach loop
-foreach fruit $fruits {{
-    puts "Fruit: $fruit"
-}}
-```
-
-## Procedures
-```tcl
-proc greet {{name}} {{
-    return "Hello, $name!"
-}}
-
-set message [greet "World"]
-puts $message
-```"#)),
-                            "commands" => Ok(format!(r#"# Common TCL Commands in Molt
-
-## String Operations
-- `string length $str` - Get string length
-- `string index $str $idx` - Get character at index
-- `string range $str $start $end` - Extract substring
-- `string toupper $str` - Convert to uppercase
-- `string tolower $str` - Convert to lowercase
-
-## List Operations
-- `list $item1 $item2 ...` - Create list
-- `lindex $list $index` - Get list element
-- `llength $list` - Get list length
-- `lappend listVar $item` - Append to list
-- `lrange $list $start $end` - Extract sublist
-
-## Math and Logic
-- `expr $expression` - Evaluate mathematical expression
-- `incr varName ?increment?` - Increment variable
-- `+ - * / %` - Arithmetic operators
-- `== != < > <= >=` - Comparison operators
-- `&& || !` - Logical operators
-
-## Control Flow
-- `if {{condition}} {{...}} else {{...}}` - Conditional
-- `for {{init}} {{condition}} {{update}} {{...}}` - For loop
-- `foreach var $list {{...}}` - Iterate over list
-- `while {{condition}} {{...}}` - While loop
-- `break` / `continue` - Loop control
-
-## I/O and Variables
-- `puts $string` - Print to stdout
-- `set varName $value` - Set variable
-- `unset varName` - Delete variable
-- `global varName` - Access global variable"#)),
-                            "examples" => Ok(format!(r#"# TCL Examples
-
-## Example 1: Calculator
-```tcl
-proc calculate {{op a b}} {{
-    switch $op {{
-        "+" {{ return [expr {{$a + $b}}] }}
-        "-" {{ return [expr {{$a - $b}}] }}
-        "*" {{ return [expr {{$a * $b}}] }}
-        "/" {{ 
-            if {{$b == 0}} {{
-                error "Division by zero"
-            }}
-            return [expr {{$a / $b}}] 
-        }}
-        default {{ error "Unknown operation: $op" }}
-    }}
-}}
-
-puts [calculate + 5 3]    ;# 8
-puts [calculate * 4 7]    ;# 28
-```
-
-## Example 2: List Processing
-```tcl
-set numbers [list 1 2 3 4 5]
-set sum 0
-
-foreach num $numbers {{
-    set sum [expr {{$sum + $num}}]
-}}
-
-puts "Sum: $sum"  ;# Sum: 15
-
-# Find maximum
-set max [lindex $numbers 0]
-foreach num $numbers {{
-    if {{$num > $max}} {{
-        set max $num
-    }}
-}}
-puts "Max: $max"  ;# Max: 5
-```
-
-## Example 3: String Processing
-```tcl
-proc word_count {{text}} {{
-    set words [split $text]
-    return [llength $words]
-}}
-
-proc reverse_string {{str}} {{
-    set result ""
-    set len [string length $str]
-    for {{set i [expr {{$len - 1}}]}} {{$i >= 0}} {{incr i -1}} {{
-        append result [string index $str $i]
-    }}
-    return $result
-}}
-
-puts [word_count "Hello world from TCL"]  ;# 4
-puts [reverse_string "hello"]              ;# olleh
-```"#)),
-                            "links" => Ok(format!(r#"# Molt TCL Documentation Links
-
-## Official Documentation
-- **Molt Book**: https://wduquette.github.io/molt/
-  Complete guide to the Molt TCL interpreter
-  
-- **GitHub Repository**: https://github.com/wduquette/molt
-  Source code, examples, and issue tracking
-  
-- **Book Source**: https://github.com/wduquette/molt/tree/master/molt-book/src
-  Markdown source files for the Molt Book
-
-## Specific Sections
-- **Getting Started**: https://wduquette.github.io/molt/user/getting_started.html
-- **Language Reference**: https://wduquette.github.io/molt/ref/
-- **Embedding Guide**: https://wduquette.github.io/molt/embed/
-- **API Documentation**: https://docs.rs/molt/
-
-## TCL Language Resources
-- **TCL/Tk Official**: https://www.tcl.tk/
-- **TCL Tutorial**: https://www.tcl.tk/man/tcl8.6/tutorial/
-- **TCL Commands**: https://www.tcl.tk/man/tcl8.6/TclCmd/
-
-## Example Code
-- **Molt Examples**: https://github.com/wduquette/molt/tree/master/examples
-- **Test Suite**: https://github.com/wduquette/molt/tree/master/tests
-
-Note: Molt implements a subset of full TCL but covers the core language features.
-For Molt-specific capabilities and limitations, refer to the Molt Book."#)),
-                            _ => Err(anyhow::anyhow!("Unknown documentation topic: {}. Available topics: overview, basic_syntax, commands, examples, links", topic))
+                })),
+                (ToolPath::bin("runtime_info"), "Get runtime information", json!({
+                    "type": "object",
+                    "properties": {},
+                    "required": []
+                })),
+            ];
+
+            for (path, description, schema) in system_tools {
+                tools.push(system_tool_entry(&path, description, schema));
+            }
+        } else {
+            // In non-privileged mode, only show safe tools
+            let system_tools = vec![
+                (ToolPath::bin("tcl_execute"), "Execute safe TCL scripts", json!({
+                    "type": "object",
+                    "properties": {
+                        "script": {
+                            "type": "string", 
+                            "description": "The TCL script to execute (restricted mode)"
+                        },
+                        "timeout_ms": {
+                            "type": "integer",
+                            "description": "Stop the script after this many milliseconds (optional)"
+                        }
+                    },
+                    "required": ["script"]
+                })),
+                (ToolPath::bin("tcl_tool_list"), "List available tools", json!({
+                    "type": "object",
+                    "properties": {
+                        "namespace": {
+                            "type": "string", 
+                            "description": "Optional namespace filter"
+                        },
+                        "filter": {
+                            "type": "string",
+                            "description": "Optional name filter"
                         }
                     }
-                    mcp_name => {
-                        // Try to execute as a custom tool
-                        tb.execute_custom_tool(mcp_name, params.arguments).await
-                    }
-                }
-                })
-            }).join();
-            
-            match result {
-                Ok(Ok(text)) => Ok(json!(McpCallToolResult {
-                    content: vec![McpContent::Text { text }],
                 })),
-                Ok(Err(e)) => Err(jsonrpc_core::Error {
-                    code: jsonrpc_core::ErrorCode::InternalError,
-                    message: e.to_string(),
-                    data: None,
-                }),
-                Err(_) => Err(jsonrpc_core::Error {
-                    code: jsonrpc_core::ErrorCode::InternalError,
-                    message: "Thread panic".to_string(),
-                    data: None,
-                }),
+                (ToolPath::bin("runtime_info"), "Get runtime information", json!({
+                    "type": "object",
+                    "properties": {},
+                    "required": []
+                })),
+            ];
+
+            for (path, description, schema) in system_tools {
+                tools.push(system_tool_entry(&path, description, schema));
             }
-        });
-        
-        Self { tool_box, handler }
-    }
-    
-    pub fn new_with_runtime(privileged: bool, runtime_config: RuntimeConfig) -> Result<Self, String> {
-        // Spawn the TCL executor with privilege and runtime settings
-        let executor = TclExecutor::spawn_with_runtime(privileged, runtime_config)?;
-        let tool_box = TclToolBox::new(executor);
-        let mut handler = IoHandler::new();
-        
-        // Register MCP methods
-        handler.add_sync_method("initialize", move |_params: Params| {
-            info!("MCP initialize called");
-            Ok(json!({
-                "protocolVersion": "2024-11-05",
-                "capabilities": {
-                    "tools": {}
-                },
-                "serverInfo": {
-                    "name": "tcl-mcp-server",
-                    "version": "1.0.0"
-                }
-            }))
-        });
+        }
+        let listing = Arc::new(ToolListCache::new(tools));
         
-        let tb = tool_box.clone();
-        let is_privileged = privileged;
-        handler.add_sync_method("tools/list", move |_params: Params| {
+        handler.add_method("tools/list", move |params: Params| {
             debug!("MCP tools/list called (privileged: {})", is_privileged);
             let tb = tb.clone();
+            let listing = listing.clone();
             
-            // Don't use async block here since we're in a sync context
-            let mut tools = vec![];
-            
-            // In privileged mode, show tool management tools
-            if is_privileged {
-                let system_tools = vec![
-                    (ToolPath::bin("tcl_execute"), "Execute TCL scripts", json!({
-                        "type": "object",
-                        "properties": {
-                            "script": {
-                                "type": "string", 
-                                "description": "The TCL script to execute"
-                            }
-                        },
-                        "required": ["script"]
-                    })),
-                    (ToolPath::sbin("tcl_tool_add"), "Add custom TCL tool", json!({
-                        "type": "object",
-                        "properties": {
-                            "path": {
-                                "type": "string",
-                                "description": "Tool path (e.g., user/my_tool)"
-                            },
-                            "description": {
-                                "type": "string",
-                                "description": "Tool description"
-                            },
-                            "script": {
-                                "type": "string",
-                                "description": "TCL script for the tool"
-                            },
-                            "parameters": {
-                                "type": "string",
-                                "description": "JSON array of parameter definitions"
-                            }
-                        },
-                        "required": ["path", "description", "script"]
-                    })),
-                    (ToolPath::sbin("tcl_tool_remove"), "Remove custom TCL tool", json!({
-                        "type": "object",
-                        "properties": {
-                            "path": {
-                                "type": "string",
-                                "description": "Tool path to remove (e.g., user/my_tool)"
-                            }
-                        },
-                        "required": ["path"]
-                    })),
-                    (ToolPath::bin("tcl_tool_list"), "List available tools", json!({
-                        "type": "object",
-                        "properties": {
-                            "namespace": {
-                                "type": "string", 
-                                "description": "Optional namespace filter"
-                            },
-                            "filter": {
-                                "type": "string",
-                                "description": "Optional name filter"
-                            }
-                        }
-                    })),
-                    (ToolPath::bin("exec_tool"), "Execute a tool by path", json!({
-                        "type": "object",
-                        "properties": {
-                            "tool_path": {
-                                "type": "string",
-                                "description": "Path to the tool (e.g., bin/tcl_execute)"
-                            },
-                            "params": {
-                                "type": "object",
-                                "description": "Parameters for the tool"
-                            }
-                        },
-                        "required": ["tool_path"]
-                    })),
-                    (ToolPath::bin("discover_tools"), "Discover tools from filesystem", json!({
-                        "type": "object",
-                        "properties": {
-                            "path": {
-                                "type": "string",
-                                "description": "Optional path to search for tools"
-                            }
-                        }
-                    })),
-                    (ToolPath::bin("runtime_info"), "Get runtime information", json!({
-                        "type": "object",
-                        "properties": {},
-                        "required": []
-                    })),
-                ];
-                
-                for (path, description, schema) in system_tools {
-                    tools.push(McpToolInfo {
-                        name: path.to_mcp_name(),
-                        description: Some(format!("{} [{}]", description, path)),
-                        input_schema: schema,
-                    });
-                }
-            } else {
-                // In non-privileged mode, only show safe tools
-                let system_tools = vec![
-                    (ToolPath::bin("tcl_execute"), "Execute safe TCL scripts", json!({
-                        "type": "object",
-                        "properties": {
-                            "script": {
-                                "type": "string", 
-                                "description": "The TCL script to execute (restricted mode)"
-                            }
-                        },
-                        "required": ["script"]
-                    })),
-                    (ToolPath::bin("tcl_tool_list"), "List available tools", json!({
-                        "type": "object",
-                        "properties": {
-                            "namespace": {
-                                "type": "string", 
-                                "description": "Optional namespace filter"
-                            },
-                            "filter": {
-                                "type": "string",
-                                "description": "Optional name filter"
-                            }
-                        }
-                    })),
-                    (ToolPath::bin("runtime_info"), "Get runtime information", json!({
-                        "type": "object",
-                        "properties": {},
-                        "required": []
-                    })),
-                ];
+            async move {
+                let cursor = list_cursor(params)?;
                 
-                for (path, description, schema) in system_tools {
-                    tools.push(McpToolInfo {
-                        name: path.to_mcp_name(),
-                        description: Some(format!("{} [{}]", description, path)),
-                        input_schema: schema,
-                    });
+                // The first page is only rebuilt after the registry changes; later pages are
+                // read straight from the sorted tool index
+                match tb.list_tools_page(cursor).await {
+                    Ok(page) => Ok(listing.render(&page).value.clone()),
+                    Err(_) => Ok(listing.system_only()),
                 }
             }
-                
-            // Get custom tools synchronously - this should be fast
-            let custom_tools = match std::thread::spawn(move || {
-                let rt = tokio::runtime::Runtime::new().unwrap();
-                rt.block_on(tb.get_tool_definitions())
-            }).join() {
-                Ok(result) => result,
-                Err(_) => {
-                    return Err(jsonrpc_core::Error::internal_error());
-                }
-            };
-            
-            // Add custom tools to the list
-            if let Ok(tool_defs) = custom_tools {
-                for tool_def in tool_defs {
-                    // Build input schema for custom tool
-                    let mut properties = serde_json::Map::new();
-                    let mut required = Vec::new();
-                    
-                    for param in &tool_def.parameters {
-                        // Validate and normalize JSON Schema type
-                        let json_type = match param.type_name.to_lowercase().as_str() {
-                            "string" | "str" | "text" => "string",
-                            "number" | "float" | "double" | "real" => "number",
-                            "integer" | "int" | "long" => "integer", 
-                            "boolean" | "bool" => "boolean",
-                            "array" | "list" => "array",
-                            "object" | "dict" | "map" => "object",
-                            "null" | "nil" | "none" => "null",
-                            // Default to string for unknown types to maintain compatibility
-                            _ => "string"
-                        };
-                        
-                        properties.insert(
-                            param.name.clone(),
-                            json!({
-                                "type": json_type,
-                                "description": param.description,
-                            }),
-                        );
-                        
-                        if param.required {
-                            required.push(param.name.clone());
-                        }
-                    }
-                    
-                    tools.push(McpToolInfo {
-                        name: tool_def.path.to_mcp_name(),
-                        description: Some(format!("{} [{}]", tool_def.description, tool_def.path)),
-                        input_schema: json!({
-                            "type": "object",
-                            "properties": properties,
-                            "required": required
-                        }),
-                    });
-                }
-            }
-            
-            Ok(json!(McpListToolsResult { tools }))
         });
         
         let tb2 = tool_box.clone();
-        handler.add_sync_method("tools/call", move |params: Params| {
+        let notifier = Notifier::default();
+        let call_notifier = notifier.clone();
+        handler.add_method("tools/call", move |params: Params| {
             debug!("MCP tools/call called");
-            let tb = tb2.clone();
-            
-            let call_params: McpCallToolParams = params.parse()?;
+            let tb = with_call_cancel(tb2.clone());
+            let call_notifier = call_notifier.clone();
             
-            // Parse tool path from MCP name
-            let tool_path = match ToolPath::from_mcp_name(&call_params.name) {
-                Ok(path) => path,
-                Err(_) => {
-                    return Err(jsonrpc_core::Error::invalid_params("Invalid tool name"));
+            async move {
+                let mut call_params: McpCallToolParams = params.parse()?;
+                
+                // Special handling for runtime_info tool
+                if call_params.name == "bin___runtime_info" {
+                    // This is a synchronous operation that provides runtime information
+                    let info = json!({
+                        "runtime": "selected at startup",
+                        "available_runtimes": crate::tcl_runtime::get_available_runtimes()
+                            .iter()
+                            .map(|r| r.as_str())
+                            .collect::<Vec<_>>(),
+                        "privileged": is_privileged
+                    });
+                    
+                    return Ok(json!(McpCallToolResult {
+                        content: vec![McpContent::Text { 
+                            text: serde_json::to_string_pretty(&info).unwrap_or_else(|_| "Runtime info unavailable".to_string())
+                        }]
+                    }));
                 }
-            };
-            
-            // Special handling for runtime_info tool
-            if tool_path.to_mcp_name() == "runtime_info" {
-                // This is a synchronous operation that provides runtime information
-                let info = json!({
-                    "runtime": "selected at startup",
-                    "available_runtimes": crate::tcl_runtime::get_available_runtimes()
-                        .iter()
-                        .map(|r| r.as_str())
-                        .collect::<Vec<_>>(),
-                    "privileged": is_privileged
-                });
                 
-                return Ok(json!(McpCallToolResult {
-                    content: vec![McpContent::Text { 
-                        text: serde_json::to_string_pretty(&info).unwrap_or_else(|_| "Runtime info unavailable".to_string())
-                    }]
-                }));
-            }
-            
-            // Execute tool synchronously in a blocking manner
-            let result = std::thread::spawn(move || {
-                let rt = tokio::runtime::Runtime::new().unwrap();
-                rt.block_on(async {
+                let (tb, progress) = stream_progress(&tb, call_params.meta.take(), &call_notifier);
+                
+                let result = async move {
                     // Handle different tool types
-                    match tool_path.to_mcp_name().as_str() {
-                        "tcl_execute" => {
+                    match call_params.name.as_str() {
+                        "bin___tcl_execute" => {
                             let req: TclExecuteRequest = serde_json::from_value(call_params.arguments)?;
                             tb.tcl_execute(req).await
                         }
-                        "tcl_tool_add" => {
+                        "sbin___tcl_tool_add" => {
                             if !is_privileged {
                                 return Err(anyhow::anyhow!("Tool management requires privileged mode"));
                             }
                             let req: TclToolAddRequest = serde_json::from_value(call_params.arguments)?;
                             tb.tcl_tool_add(req).await
                         }
-                        "tcl_tool_remove" => {
+                        "sbin___tcl_tool_remove" => {
                             if !is_privileged {
                                 return Err(anyhow::anyhow!("Tool management requires privileged mode"));
                             }
                             let req: TclToolRemoveRequest = serde_json::from_value(call_params.arguments)?;
                             tb.tcl_tool_remove(req).await
                         }
-                        "tcl_tool_list" => {
+                        "bin___tcl_tool_list" => {
                             let req: TclToolListRequest = serde_json::from_value(call_params.arguments)?;
                             tb.tcl_tool_list(req).await
                         }
-                        "exec_tool" => {
+                        "bin___exec_tool" => {
                             if !is_privileged {
                                 return Err(anyhow::anyhow!("Tool execution requires privileged mode"));
                             }
                             let req: TclExecToolRequest = serde_json::from_value(call_params.arguments)?;
                             tb.exec_tool(req).await
                         }
-                        "discover_tools" => {
+                        "bin___discover_tools" => {
                             if !is_privileged {
                                 return Err(anyhow::anyhow!("Tool discovery requires privileged mode"));
                             }
@@ -854,30 +387,72 @@ For Molt-specific capabilities and limitations, refer to the Molt Book."#)),
                         }
                         _ => {
                             // Try to execute as custom tool
-                            tb.execute_custom_tool(&tool_path.to_mcp_name(), call_params.arguments).await
+                            tb.execute_custom_tool(call_params.name, call_params.arguments).await
                         }
                     }
-                })
-            }).join();
-            
-            match result {
-                Ok(Ok(output)) => {
-                    Ok(json!(McpCallToolResult {
-                        content: vec![McpContent::Text { text: output }]
-                    }))
+                }.await;
+                
+                // All of the call's progress notifications are queued ahead of its response
+                if let Some(progress) = progress {
+                    let _ = progress.await;
                 }
-                Ok(Err(e)) => {
-                    let mut error = jsonrpc_core::Error::internal_error();
-                    error.message = format!("Tool execution failed: {}", e);
-                    Err(error)
+                
+                match result {
+                    Ok(output) => {
+                        Ok(json!(McpCallToolResult {
+                            content: vec![McpContent::Text { text: output }]
+                        }))
+                    }
+                    Err(e) => {
+                        if let Some(busy) = busy_error(&e) {
+                            return Err(busy);
+                        }
+                        let mut error = jsonrpc_core::Error::internal_error();
+                        error.message = format!("Tool execution failed: {}", e);
+                        Err(error)
+                    }
+                }
+            }
+        });
+        
+        let cancellations = Cancellations::default();
+        let cancel_calls = cancellations.clone();
+        handler.add_notification("notifications/cancelled", move |params: Params| {
+            match params.parse::<McpCancelledParams>() {
+                Ok(params) => {
+                    if cancel_calls.cancel(&params.request_id) {
+                        info!("Cancelling request {} ({})", params.request_id, params.reason.as_deref().unwrap_or("no reason given"));
+                    }
                 }
-                Err(_) => {
-                    Err(jsonrpc_core::Error::internal_error())
+                Err(e) => debug!("Ignoring malformed cancellation: {}", e),
+            }
+        });
+        
+        let tb = tool_box.clone();
+        let lane_stats = Arc::new(LaneStats::new(DEFAULT_LANE_DEPTH));
+        let lanes = lane_stats.clone();
+        handler.add_method("tcl/stats", move |_params: Params| {
+            debug!("TCL stats query called");
+            let tb = tb.clone();
+            let lanes = lanes.clone();
+            
+            async move {
+                match tb.get_stats().await {
+                    Ok(stats) => {
+                        let mut stats = json!(stats);
+                        stats["lanes"] = json!(lanes.snapshot());
+                        Ok(stats)
+                    }
+                    Err(e) => Err(jsonrpc_core::Error {
+                        code: jsonrpc_core::ErrorCode::InternalError,
+                        message: e.to_string(),
+                        data: None,
+                    }),
                 }
             }
         });
         
-        Ok(Self { tool_box, handler })
+        Ok(Self { tool_box, handler: Arc::new(handler), max_in_flight: DEFAULT_MAX_IN_FLIGHT, notifier, cancellations, lane_stats })
     }
     
     /// Initialize persistence for tool storage
@@ -894,39 +469,499 @@ For Molt-specific capabilities and limitations, refer to the Molt Book."#)),
         }
     }
     
+    /// Limit how many stdio requests are processed at once (minimum 1)
+    pub fn with_max_in_flight(mut self, max_in_flight: usize) -> Self {
+        self.max_in_flight = max_in_flight.max(1);
+        self
+    }
+    
     pub async fn run_stdio(self) -> Result<()> {
-        info!("Starting TCL MCP server on stdio");
-        
-        let stdin = tokio::io::stdin();
-        let mut stdout = tokio::io::stdout();
-        let mut reader = BufReader::new(stdin);
-        let mut line = String::new();
-        
-        loop {
-            line.clear();
-            let n = reader.read_line(&mut line).await?;
-            if n == 0 {
-                break; // EOF
+        info!("Starting TCL MCP server on stdio ({} requests in flight)", self.max_in_flight);
+        
+        let reader = BufReader::new(tokio::io::stdin());
+        let dispatcher = Dispatcher::new(self.handler, self.cancellations, self.lane_stats);
+        serve_lines(dispatcher, self.notifier, reader, tokio::io::stdout(), self.max_in_flight).await
+    }
+}
+
+/// Serve newline-delimited JSON-RPC requests, up to `max_in_flight` at a time.
+///
+/// Requests wait in a lane by kind and are started by weighted round robin, so
+/// handshakes and listings overtake a backlog of script calls. Responses are written
+/// as soon as each request completes, so they may be out of order; clients match
+/// them by id. A single writer owns the output.
+async fn serve_lines<R, W>(dispatcher: Dispatcher, notifier: Notifier, mut reader: R, output: W, max_in_flight: usize) -> Result<()>
+where
+    R: AsyncBufRead + Unpin,
+    W: AsyncWrite + Unpin + Send + 'static,
+{
+    let (responses, outgoing) = mpsc::channel::<String>(max_in_flight);
+    notifier.attach(&responses);
+    let writer = tokio::spawn(write_responses(output, outgoing));
+    let lanes = Arc::new(LaneQueue::new(DEFAULT_LANE_DEPTH, dispatcher.lane_stats.clone()));
+    let scheduler = tokio::spawn(schedule_requests(dispatcher.clone(), lanes.clone(), max_in_flight));
+    let mut line = String::new();
+    
+    loop {
+        line.clear();
+        let n = reader.read_line(&mut line).await?;
+        if n == 0 {
+            break; // EOF
+        }
+        
+        let trimmed = line.trim();
+        if trimmed.is_empty() {
+            continue;
+        }
+        
+        debug!("Received request: {}", trimmed);
+        
+        // Cancellations skip the lanes and the in-flight limit, which the calls they
+        // stop may be holding
+        if is_cancellation(trimmed) {
+            dispatcher.handler.handle_request(trimmed).await;
+            continue;
+        }
+        
+        // A batch is split so that its entries, tools/call included, run in parallel;
+        // malformed and empty batches are left to the handler to reject
+        let batch = if trimmed.starts_with('[') {
+            serde_json::from_str::<Vec<Value>>(trimmed).ok().filter(|batch| !batch.is_empty())
+        } else {
+            None
+        };
+        
+        if let Some(batch) = batch {
+            let mut entries = Vec::with_capacity(batch.len());
+            for entry in batch {
+                entries.push(queue_request(&lanes, entry.to_string()).await?);
             }
             
-            let trimmed = line.trim();
-            if trimmed.is_empty() {
-                continue;
+            // Answer with one array in request order, leaving out notifications
+            let responses = responses.clone();
+            tokio::spawn(async move {
+                let mut replies = Vec::with_capacity(entries.len());
+                for entry in entries {
+                    if let Ok(Some(reply)) = entry.await {
+                        replies.push(reply);
+                    }
+                }
+                if !replies.is_empty() {
+                    let response = format!("[{}]", replies.join(","));
+                    debug!("Sending batch response: {}", response);
+                    let _ = responses.send(response).await;
+                }
+            });
+            continue;
+        }
+        
+        // Stop reading while the request's lane is full, leaving further requests in the pipe
+        let reply = queue_request(&lanes, trimmed.to_string()).await?;
+        let responses = responses.clone();
+        tokio::spawn(async move {
+            if let Ok(Some(response)) = reply.await {
+                debug!("Sending response: {}", response);
+                let _ = responses.send(response).await;
             }
+        });
+    }
+    
+    // Requests still waiting in their lanes are started before the scheduler stops,
+    // and the writer finishes once every one of them has sent its response
+    lanes.close();
+    scheduler.await??;
+    drop(responses);
+    writer.await??;
+    Ok(())
+}
+
+/// A request waiting in its lane, with where its response goes
+struct Pending {
+    request: String,
+    reply: oneshot::Sender<Option<String>>,
+}
+
+/// Queue `request` in its lane, returning where its response will arrive
+async fn queue_request(lanes: &LaneQueue<Pending>, request: String) -> Result<oneshot::Receiver<Option<String>>> {
+    let (reply, response) = oneshot::channel();
+    lanes.push(request_lane(&request), Pending { request, reply }).await?;
+    Ok(response)
+}
+
+/// Start queued requests as in-flight permits free up, until the lanes are closed
+/// and empty
+async fn schedule_requests(dispatcher: Dispatcher, lanes: Arc<LaneQueue<Pending>>, max_in_flight: usize) -> Result<()> {
+    let in_flight = Arc::new(Semaphore::new(max_in_flight));
+    
+    loop {
+        // The permit comes first so that requests wait in their lanes, where the
+        // weighting applies, rather than in a single line for permits
+        let permit = in_flight.clone().acquire_owned().await?;
+        let (lane, pending) = match lanes.pop().await {
+            Some(next) => next,
+            None => return Ok(()),
+        };
+        
+        debug!("Starting request from the {} lane", lane);
+        let request = dispatcher.spawn(pending.request, permit);
+        tokio::spawn(async move {
+            match request.await {
+                Ok(response) => {
+                    let _ = pending.reply.send(response);
+                }
+                Err(e) => error!("Request failed: {}", e),
+            }
+        });
+    }
+}
+
+/// The lane a request waits in. The handshake, `ping`, `tcl/stats` and tool management
+/// count as control; listings, runtime info and documentation as metadata; other tool
+/// calls as execution. Unknown methods and unparseable lines are answered with an error
+/// straight away, so they wait as metadata rather than outranking listings. A batch may
+/// contain script calls, so it waits as execution.
+fn request_lane(request: &str) -> Lane {
+    let head = match serde_json::from_str::<LaneHead>(request) {
+        Ok(head) => head,
+        Err(_) if request.trim_start().starts_with('[') => return Lane::Execution,
+        Err(_) => return Lane::Metadata,
+    };
+    
+    match head.method.as_deref() {
+        Some("initialize" | "notifications/initialized" | "ping" | "tcl/stats") => Lane::Control,
+        Some("tools/list") => Lane::Metadata,
+        Some("tools/call") => {
+            let name = head.params.and_then(|params| params.name).unwrap_or_default();
+            if name.starts_with("sbin___") {
+                Lane::Control
+            } else if matches!(name.as_str(), "bin___tcl_tool_list" | "bin___discover_tools" | "bin___runtime_info")
+                || name.starts_with("docs___")
+            {
+                Lane::Metadata
+            } else {
+                Lane::Execution
+            }
+        }
+        _ => Lane::Metadata,
+    }
+}
+
+/// Runs stdio requests as tasks on the server's runtime
+#[derive(Clone)]
+struct Dispatcher {
+    handler: Arc<IoHandler>,
+    cancellations: Cancellations,
+    lane_stats: Arc<LaneStats>,
+}
+
+impl Dispatcher {
+    fn new(handler: Arc<IoHandler>, cancellations: Cancellations, lane_stats: Arc<LaneStats>) -> Self {
+        Self { handler, cancellations, lane_stats }
+    }
+    
+    /// Handle one request, holding its in-flight permit until the handler returns.
+    ///
+    /// Method handlers are async and only wait on the executor, so a request costs a
+    /// task rather than a thread. A `tools/call` is registered under its id for as
+    /// long as it runs, so that it can be cancelled.
+    fn spawn(&self, request: String, permit: OwnedSemaphorePermit) -> JoinHandle<Option<String>> {
+        let dispatcher = self.clone();
+        tokio::spawn(async move {
+            let tracked = tool_call_id(&request).map(|id| dispatcher.cancellations.track(&id));
+            let cancel = tracked.as_ref().map(TrackedCall::cancel_flag);
             
-            debug!("Received request: {}", trimmed);
-            
-            // Process the request
-            let response = self.handler.handle_request(trimmed).await;
+            // The handler invokes the method as soon as it is called, so that call has to
+            // happen inside the scope too
+            let response = CALL_CANCEL.scope(cancel, async {
+                dispatcher.handler.handle_request(&request).await
+            }).await;
             
-            if let Some(response) = response {
-                debug!("Sending response: {}", response);
-                stdout.write_all(response.as_bytes()).await?;
-                stdout.write_all(b"\n").await?;
-                stdout.flush().await?;
-            }
+            drop(tracked);
+            drop(permit);
+            response
+        })
+    }
+}
+
+/// The request id of a `tools/call`, if that is what `request` is
+fn tool_call_id(request: &str) -> Option<Value> {
+    match serde_json::from_str::<RequestHead>(request) {
+        Ok(head) if head.method.as_deref() == Some("tools/call") => head.id,
+        _ => None,
+    }
+}
+
+/// Whether `request` is a `notifications/cancelled` message
+fn is_cancellation(request: &str) -> bool {
+    // Only messages that mention the method are parsed
+    request.contains("notifications/cancelled")
+        && serde_json::from_str::<RequestHead>(request)
+            .map_or(false, |head| head.method.as_deref() == Some("notifications/cancelled"))
+}
+
+/// Make the tool box stop its scripts when the current `tools/call` is cancelled
+fn with_call_cancel(tool_box: TclToolBox) -> TclToolBox {
+    match CALL_CANCEL.try_with(|cancel| cancel.clone()).ok().flatten() {
+        Some(cancel) => tool_box.with_cancel(cancel),
+        None => tool_box,
+    }
+}
+
+/// Write responses as they arrive, flushing once per burst rather than once per line
+async fn write_responses<W: AsyncWrite + Unpin>(output: W, mut outgoing: mpsc::Receiver<String>) -> Result<()> {
+    let mut output = BufWriter::new(output);
+    
+    while let Some(response) = outgoing.recv().await {
+        output.write_all(response.as_bytes()).await?;
+        output.write_all(b"\n").await?;
+        
+        while let Ok(response) = outgoing.try_recv() {
+            output.write_all(response.as_bytes()).await?;
+            output.write_all(b"\n").await?;
+        }
+        output.flush().await?;
+    }
+    
+    Ok(())
+}
+
+/// Stream the script output of a `tools/call` as progress notifications when the
+/// client asked for progress. Returns the tool box to make the call with and the
+/// blocking task forwarding the output, which ends when the call does.
+fn stream_progress(tool_box: &TclToolBox, meta: Option<McpRequestMeta>, notifier: &Notifier) -> (TclToolBox, Option<JoinHandle<()>>) {
+    match meta.and_then(|meta| meta.progress_token) {
+        Some(token) => {
+            let (output, chunks) = script_output_channel();
+            let notifier = notifier.clone();
+            let forwarder = tokio::task::spawn_blocking(move || {
+                forward_output(chunks, &token, |notification| notifier.send(notification))
+            });
+            (tool_box.with_output(output), Some(forwarder))
         }
+        None => (tool_box.clone(), None),
+    }
+}
+
+/// The JSON-RPC "server busy" error for a request the executor queue turned away,
+/// telling the client how long to back off for
+fn busy_error(error: &anyhow::Error) -> Option<jsonrpc_core::Error> {
+    error.downcast_ref::<ServerBusy>().map(|busy| jsonrpc_core::Error {
+        code: jsonrpc_core::ErrorCode::ServerError(i64::from(SERVER_BUSY_CODE)),
+        message: busy.to_string(),
+        data: Some(json!({ "retryAfterMs": busy.retry_after.as_millis() as u64 })),
+    })
+}
+
+/// The pagination cursor of a `tools/list` request, if any
+fn list_cursor(params: Params) -> Result<Option<String>, jsonrpc_core::Error> {
+    match params {
+        Params::None => Ok(None),
+        params => Ok(params.parse::<McpListToolsParams>()?.cursor),
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+    use std::time::Duration;
+    
+    #[tokio::test(flavor = "multi_thread")]
+    async fn test_stdio_requests_run_concurrently() {
+        let mut handler = IoHandler::new();
+        handler.add_method("slow", |_params: Params| async {
+            tokio::time::sleep(Duration::from_millis(300)).await;
+            Ok(json!("slow"))
+        });
+        handler.add_sync_method("fast", |_params: Params| Ok(json!("fast")));
+        
+        let input = concat!(
+            r#"{"jsonrpc":"2.0","method":"slow","id":1}"#, "\n",
+            r#"{"jsonrpc":"2.0","method":"fast","id":2}"#, "\n",
+        );
+        let (output, mut received) = tokio::io::duplex(4096);
+        serve_lines(Dispatcher::new(Arc::new(handler), Cancellations::default(), Arc::new(LaneStats::new(DEFAULT_LANE_DEPTH))), Notifier::default(), input.as_bytes(), output, 4).await.unwrap();
+        
+        let mut written = String::new();
+        tokio::io::AsyncReadExt::read_to_string(&mut received, &mut written).await.unwrap();
+        let ids: Vec<Value> = written.lines()
+            .map(|line| serde_json::from_str::<Value>(line).unwrap()["id"].clone())
+            .collect();
+        
+        // The fast request is answered while the slow one is still running
+        assert_eq!(ids, vec![json!(2), json!(1)]);
+    }
+    
+    #[tokio::test(flavor = "multi_thread")]
+    async fn test_stdio_batch_runs_in_parallel_and_keeps_order() {
+        let mut handler = IoHandler::new();
+        handler.add_method("slow", |_params: Params| async {
+            tokio::time::sleep(Duration::from_millis(300)).await;
+            Ok(json!("slow"))
+        });
+        handler.add_notification("note", |_params: Params| {});
+        
+        let input = concat!(
+            r#"[{"jsonrpc":"2.0","method":"slow","id":1},"#,
+            r#"{"jsonrpc":"2.0","method":"note"},"#,
+            r#"{"jsonrpc":"2.0","method":"slow","id":2},"#,
+            r#"{"jsonrpc":"2.0","method":"missing","id":3}]"#, "\n",
+        );
+        let (output, mut received) = tokio::io::duplex(4096);
+        let started = std::time::Instant::now();
+        serve_lines(Dispatcher::new(Arc::new(handler), Cancellations::default(), Arc::new(LaneStats::new(DEFAULT_LANE_DEPTH))), Notifier::default(), input.as_bytes(), output, 4).await.unwrap();
+        
+        // Both slow entries ran at the same time
+        assert!(started.elapsed() < Duration::from_millis(550));
+        
+        let mut written = String::new();
+        tokio::io::AsyncReadExt::read_to_string(&mut received, &mut written).await.unwrap();
+        let replies: Vec<Value> = serde_json::from_str(written.trim()).unwrap();
+        let ids: Vec<Value> = replies.iter().map(|reply| reply["id"].clone()).collect();
+        
+        // One array in request order, without an entry for the notification
+        assert_eq!(ids, vec![json!(1), json!(2), json!(3)]);
+        assert_eq!(replies[2]["error"]["code"], json!(-32601));
+    }
+    
+    #[tokio::test(flavor = "multi_thread")]
+    async fn test_control_requests_overtake_queued_calls() {
+        let mut handler = IoHandler::new();
+        handler.add_method("tools/call", |_params: Params| async {
+            tokio::time::sleep(Duration::from_millis(100)).await;
+            Ok(json!("ran"))
+        });
+        handler.add_sync_method("ping", |_params: Params| Ok(json!("pong")));
+        
+        let call = |id: u32| format!(r#"{{"jsonrpc":"2.0","method":"tools/call","id":{},"params":{{"name":"bin___tcl_execute"}}}}"#, id);
+        let input = format!("{}\n{}\n{}\n{}\n", call(1), call(2), call(3), r#"{"jsonrpc":"2.0","method":"ping","id":4}"#);
+        let (output, mut received) = tokio::io::duplex(4096);
+        let lane_stats = Arc::new(LaneStats::new(DEFAULT_LANE_DEPTH));
+        let dispatcher = Dispatcher::new(Arc::new(handler), Cancellations::default(), lane_stats.clone());
+        serve_lines(dispatcher, Notifier::default(), input.as_bytes(), output, 1).await.unwrap();
+        
+        let mut written = String::new();
+        tokio::io::AsyncReadExt::read_to_string(&mut received, &mut written).await.unwrap();
+        let ids: Vec<Value> = written.lines()
+            .map(|line| serde_json::from_str::<Value>(line).unwrap()["id"].clone())
+            .collect();
+        
+        // The ping waits for the running call only, not for the calls queued before it
+        assert_eq!(ids, vec![json!(1), json!(4), json!(2), json!(3)]);
+        
+        let stats = lane_stats.snapshot();
+        assert_eq!(stats.control.dequeued, 1);
+        assert_eq!(stats.execution.dequeued, 3);
+    }
+    
+    #[test]
+    fn test_request_lanes() {
+        let lane = |method: &str, name: &str| {
+            request_lane(&json!({ "jsonrpc": "2.0", "method": method, "id": 1, "params": { "name": name } }).to_string())
+        };
+        assert_eq!(lane("initialize", ""), Lane::Control);
+        assert_eq!(lane("tcl/stats", ""), Lane::Control);
+        assert_eq!(lane("tools/list", ""), Lane::Metadata);
+        assert_eq!(lane("tools/call", "sbin___tcl_tool_add"), Lane::Control);
+        assert_eq!(lane("tools/call", "docs___molt_book"), Lane::Metadata);
+        assert_eq!(lane("tools/call", "bin___runtime_info"), Lane::Metadata);
+        assert_eq!(lane("tools/call", "user__team__deploy__latest"), Lane::Execution);
+        assert_eq!(lane("resources/list", ""), Lane::Metadata);
+        assert_eq!(request_lane("not json"), Lane::Metadata);
+        assert_eq!(request_lane(&json!([{ "jsonrpc": "2.0", "method": "tools/call", "id": 1 }]).to_string()), Lane::Execution);
+    }
+    
+    #[tokio::test(flavor = "multi_thread")]
+    async fn test_tool_output_streams_as_progress() {
+        let server = TclMcpServer::new_with_config(true, RuntimeConfig::default(), ExecutorConfig::default()).unwrap();
+        let input = concat!(
+            r#"{"jsonrpc":"2.0","method":"tools/call","id":1,"params":{"name":"bin___tcl_execute","#,
+            r#""arguments":{"script":"puts hello; expr {1 + 1}"},"_meta":{"progressToken":"run-1"}}}"#, "\n",
+        );
+        let (output, mut received) = tokio::io::duplex(4096);
+        let dispatcher = Dispatcher::new(server.handler, server.cancellations, server.lane_stats);
+        serve_lines(dispatcher, server.notifier, input.as_bytes(), output, 4).await.unwrap();
+        
+        let mut written = String::new();
+        tokio::io::AsyncReadExt::read_to_string(&mut received, &mut written).await.unwrap();
+        let messages: Vec<Value> = written.lines().map(|line| serde_json::from_str(line).unwrap()).collect();
+        
+        // The output arrives as a notification ahead of the result
+        assert_eq!(messages.len(), 2);
+        assert_eq!(messages[0]["method"], json!("notifications/progress"));
+        assert_eq!(messages[0]["params"]["progressToken"], json!("run-1"));
+        assert_eq!(messages[0]["params"]["message"], json!("hello\n"));
+        assert_eq!(messages[1]["id"], json!(1));
+        assert_eq!(messages[1]["result"]["content"][0]["text"], json!("2"));
+    }
+    
+    #[tokio::test(flavor = "multi_thread")]
+    async fn test_tool_call_can_be_cancelled() {
+        // The timeout only keeps a broken cancellation from hanging the test
+        let config = ExecutorConfig { call_timeout: Some(Duration::from_secs(10)), ..Default::default() };
+        let server = TclMcpServer::new_with_config(true, RuntimeConfig::default(), config).unwrap();
+        let dispatcher = Dispatcher::new(server.handler, server.cancellations, server.lane_stats);
+        
+        let (mut input, reader) = tokio::io::duplex(4096);
+        let (output, mut received) = tokio::io::duplex(4096);
+        let serving = tokio::spawn(serve_lines(dispatcher, server.notifier, BufReader::new(reader), output, 4));
+        
+        let started = std::time::Instant::now();
+        input.write_all(concat!(
+            r#"{"jsonrpc":"2.0","method":"tools/call","id":"run","params":{"name":"bin___tcl_execute","#,
+            r#""arguments":{"script":"while 1 {}"}}}"#, "\n",
+        ).as_bytes()).await.unwrap();
+        tokio::time::sleep(Duration::from_millis(200)).await;
+        input.write_all(concat!(
+            r#"{"jsonrpc":"2.0","method":"notifications/cancelled","params":{"requestId":"run","reason":"test"}}"#, "\n",
+        ).as_bytes()).await.unwrap();
+        drop(input);
+        
+        serving.await.unwrap().unwrap();
+        assert!(started.elapsed() < Duration::from_secs(5));
         
-        Ok(())
+        let mut written = String::new();
+        tokio::io::AsyncReadExt::read_to_string(&mut received, &mut written).await.unwrap();
+        let response: Value = serde_json::from_str(written.trim()).unwrap();
+        assert_eq!(response["id"], json!("run"));
+        assert!(response["error"]["message"].as_str().unwrap().contains("cancelled"));
     }
-}
\ No newline at end of file
+    
+    /// Per-request dispatch overhead of a thread and runtime per call, as handlers used
+    /// to work, against an async handler. Run with
+    /// `cargo test --release bench_dispatch_overhead -- --ignored --nocapture`
+    #[tokio::test(flavor = "multi_thread")]
+    #[ignore]
+    async fn bench_dispatch_overhead() {
+        const CALLS: u32 = 200;
+        let request = r#"{"jsonrpc":"2.0","method":"noop","id":1}"#;
+        
+        let mut handler = IoHandler::new();
+        handler.add_sync_method("noop", |_params: Params| {
+            std::thread::spawn(|| {
+                let rt = tokio::runtime::Runtime::new().unwrap();
+                rt.block_on(async { json!("ok") })
+            }).join().map_err(|_| jsonrpc_core::Error::internal_error())
+        });
+        let before = time_dispatch(Arc::new(handler), request, CALLS).await;
+        
+        let mut handler = IoHandler::new();
+        handler.add_method("noop", |_params: Params| async { Ok(json!("ok")) });
+        let after = time_dispatch(Arc::new(handler), request, CALLS).await;
+        
+        println!("Per call: thread + runtime {:?}, async handler {:?}", before, after);
+        assert!(after < before);
+    }
+    
+    /// Mean time to dispatch `request` and get its response, one call at a time
+    async fn time_dispatch(handler: Arc<IoHandler>, request: &str, calls: u32) -> Duration {
+        let dispatcher = Dispatcher::new(handler, Cancellations::default(), Arc::new(LaneStats::new(DEFAULT_LANE_DEPTH)));
+        let permits = Arc::new(Semaphore::new(1));
+        
+        let started = std::time::Instant::now();
+        for _ in 0..calls {
+            let permit = permits.clone().acquire_owned().await.unwrap();
+            assert!(dispatcher.spawn(request.to_string(), permit).await.unwrap().is_some());
+        }
+        started.elapsed() / calls
+    }
+}
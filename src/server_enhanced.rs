@@ -155,7 +155,7 @@ impl EnhancedTclMcpServer {
         let is_privileged = privileged;
         let runtime_for_tools = create_runtime();
         let caps_for_tools = runtime_for_tools.get_capabilities(privileged);
-        handler.add_sync_method("tools/list", move |_params: Params| {
+        handler.add_method("tools/list", move |_params: Params| {
             debug!("Enhanced MCP tools/list called (privileged: {})", is_privileged);
             let tb = tb.clone();
             let caps = caps_for_tools.clone();
@@ -263,67 +263,61 @@ impl EnhancedTclMcpServer {
                 });
             }
             
-            // Get custom tools (same as before but with metadata)
-            let custom_tools = match std::thread::spawn(move || {
-                let rt = tokio::runtime::Runtime::new().unwrap();
-                rt.block_on(tb.get_tool_definitions())
-            }).join() {
-                Ok(result) => result,
-                Err(_) => return Err(jsonrpc_core::Error::internal_error()),
-            };
-            
-            if let Ok(tool_defs) = custom_tools {
-                for tool_def in tool_defs {
-                    // Build input schema for custom tool
-                    let mut properties = serde_json::Map::new();
-                    let mut required = Vec::new();
-                    
-                    for param in &tool_def.parameters {
-                        let json_type = match param.type_name.to_lowercase().as_str() {
-                            "string" | "str" | "text" => "string",
-                            "number" | "float" | "double" | "real" => "number",
-                            "integer" | "int" | "long" => "integer", 
-                            "boolean" | "bool" => "boolean",
-                            "array" | "list" => "array",
-                            "object" | "dict" | "map" => "object",
-                            "null" | "nil" | "none" => "null",
-                            _ => "string"
-                        };
+            async move {
+                // Get custom tools (same as before but with metadata)
+                if let Ok(tool_defs) = tb.get_tool_definitions().await {
+                    for tool_def in tool_defs {
+                        // Build input schema for custom tool
+                        let mut properties = serde_json::Map::new();
+                        let mut required = Vec::new();
+                        
+                        for param in &tool_def.parameters {
+                            let json_type = match param.type_name.to_lowercase().as_str() {
+                                "string" | "str" | "text" => "string",
+                                "number" | "float" | "double" | "real" => "number",
+                                "integer" | "int" | "long" => "integer", 
+                                "boolean" | "bool" => "boolean",
+                                "array" | "list" => "array",
+                                "object" | "dict" | "map" => "object",
+                                "null" | "nil" | "none" => "null",
+                                _ => "string"
+                            };
+                            
+                            properties.insert(
+                                param.name.clone(),
+                                json!({
+                                    "type": json_type,
+                                    "description": param.description,
+                                }),
+                            );
+                            
+                            if param.required {
+                                required.push(param.name.clone());
+                            }
+                        }
                         
-                        properties.insert(
-                            param.name.clone(),
-                            json!({
-                                "type": json_type,
-                                "description": param.description,
-                            }),
-                        );
+                        let mut schema_obj = serde_json::Map::new();
+                        schema_obj.insert("$schema".to_string(), json!("https://json-schema.org/draft/2020-12/schema"));
+                        schema_obj.insert("type".to_string(), json!("object"));
+                        schema_obj.insert("properties".to_string(), json!(properties));
                         
-                        if param.required {
-                            required.push(param.name.clone());
+                        if !required.is_empty() {
+                            schema_obj.insert("required".to_string(), json!(required));
                         }
+                        
+                        let input_schema = serde_json::Value::Object(schema_obj);
+                        
+                        tools.push(McpToolInfo {
+                            name: tool_def.path.to_mcp_name(),
+                            description: Some(format!("{} [{}]", tool_def.description, tool_def.path)),
+                            input_schema,
+                            metadata: Some(tool_metadata.clone()),
+                        });
                     }
-                    
-                    let mut schema_obj = serde_json::Map::new();
-                    schema_obj.insert("$schema".to_string(), json!("https://json-schema.org/draft/2020-12/schema"));
-                    schema_obj.insert("type".to_string(), json!("object"));
-                    schema_obj.insert("properties".to_string(), json!(properties));
-                    
-                    if !required.is_empty() {
-                        schema_obj.insert("required".to_string(), json!(required));
-                    }
-                    
-                    let input_schema = serde_json::Value::Object(schema_obj);
-                    
-                    tools.push(McpToolInfo {
-                        name: tool_def.path.to_mcp_name(),
-                        description: Some(format!("{} [{}]", tool_def.description, tool_def.path)),
-                        input_schema,
-                        metadata: Some(tool_metadata.clone()),
-                    });
                 }
+                
+                Ok(json!(McpListToolsResult { tools }))
             }
-            
-            Ok(json!(McpListToolsResult { tools }))
         });
         
         // Register new tcl/capabilities method
@@ -361,16 +355,15 @@ impl EnhancedTclMcpServer {
         // Register existing tools/call method (unchanged)
         let tb = tool_box.clone();
         let is_privileged_call = privileged;
-        handler.add_sync_method("tools/call", move |params: Params| {
+        handler.add_method("tools/call", move |params: Params| {
             debug!("MCP tools/call called with params: {:?}", params);
             let tb = tb.clone();
             
-            let params: McpCallToolParams = params.parse()?;
-            info!("Calling tool: {} (privileged: {})", params.name, is_privileged_call);
-            
-            let result = std::thread::spawn(move || {
-                let rt = tokio::runtime::Runtime::new().unwrap();
-                rt.block_on(async move {
+            async move {
+                let params: McpCallToolParams = params.parse()?;
+                info!("Calling tool: {} (privileged: {})", params.name, is_privileged_call);
+                
+                let result = async move {
                     // Handle system tools and custom tools same as before
                     match params.name.as_str() {
                         "bin___tcl_execute" => {
@@ -447,23 +440,18 @@ For full capability details, use the `tcl/capabilities` MCP method.
                             tb.execute_custom_tool(mcp_name, params.arguments).await
                         }
                     }
-                })
-            }).join();
-            
-            match result {
-                Ok(Ok(text)) => Ok(json!(McpCallToolResult {
-                    content: vec![McpContent::Text { text }],
-                })),
-                Ok(Err(e)) => Err(jsonrpc_core::Error {
-                    code: jsonrpc_core::ErrorCode::InternalError,
-                    message: e.to_string(),
-                    data: None,
-                }),
-                Err(_) => Err(jsonrpc_core::Error {
-                    code: jsonrpc_core::ErrorCode::InternalError,
-                    message: "Thread panic".to_string(),
-                    data: None,
-                }),
+                }.await;
+                
+                match result {
+                    Ok(text) => Ok(json!(McpCallToolResult {
+                        content: vec![McpContent::Text { text }],
+                    })),
+                    Err(e) => Err(jsonrpc_core::Error {
+                        code: jsonrpc_core::ErrorCode::InternalError,
+                        message: e.to_string(),
+                        data: None,
+                    }),
+                }
             }
         });
         
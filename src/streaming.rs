@@ -0,0 +1,163 @@
+//! Incremental delivery of script output to MCP clients.
+//!
+//! While a script runs, its worker pushes `puts` output into a bounded channel.
+//! The transport drains the channel into `notifications/progress` messages, so
+//! output reaches the client as it is produced instead of after the script ends.
+
+use serde_json::{json, Value};
+use std::sync::mpsc::{sync_channel, Receiver, SyncSender, TrySendError};
+use std::thread;
+use std::time::{Duration, Instant};
+
+use crate::tcl_runtime::ExecutionLimits;
+
+/// Output chunks buffered between a running script and its client. A script that
+/// writes faster than the client reads waits in `puts` instead of buffering more,
+/// within the limits set by `OutputWriter`.
+pub const SCRIPT_OUTPUT_CAPACITY: usize = 64;
+
+/// Longest a script waits in `puts` for a client that has stopped reading. After
+/// that the stream counts as stalled and further output is dropped when it does not fit.
+pub const OUTPUT_STALL_TIMEOUT: Duration = Duration::from_secs(5);
+
+/// How often a script waiting for room in its output stream re-checks its limits
+const OUTPUT_RETRY_INTERVAL: Duration = Duration::from_millis(10);
+
+/// Output chunks waiting together are merged into messages of up to this many bytes
+pub const PROGRESS_MESSAGE_BYTES: usize = 8 * 1024;
+
+/// Sending half of a script output stream, handed to the worker running the script
+pub type ScriptOutput = SyncSender<String>;
+
+/// Create a bounded script output stream
+pub fn script_output_channel() -> (ScriptOutput, Receiver<String>) {
+    sync_channel(SCRIPT_OUTPUT_CAPACITY)
+}
+
+/// Writes a script's `puts` output to its stream without letting a client that stopped
+/// reading hold the script past its limits
+pub struct OutputWriter {
+    output: ScriptOutput,
+    limits: ExecutionLimits,
+    /// Output has been dropped since the client stopped reading
+    stalled: bool,
+    dropped: usize,
+}
+
+impl OutputWriter {
+    pub fn new(output: ScriptOutput, limits: ExecutionLimits) -> Self {
+        Self { output, limits, stalled: false, dropped: 0 }
+    }
+    
+    /// Send `text`, waiting while the stream is full. The text is dropped once the
+    /// client has gone away, the call's deadline passes or it is cancelled, or the
+    /// stream has been full for `OUTPUT_STALL_TIMEOUT`.
+    pub fn write(&mut self, mut text: String) {
+        let started = Instant::now();
+        loop {
+            match self.output.try_send(text) {
+                Ok(()) => {
+                    self.stalled = false;
+                    return;
+                }
+                // A client that went away stops reading; the script still runs to the end
+                Err(TrySendError::Disconnected(_)) => return,
+                Err(TrySendError::Full(unsent)) => text = unsent,
+            }
+            
+            // Steps are counted by the runtime, so only the deadline and cancel flag apply
+            if self.stalled || self.limits.check(0).is_some() || started.elapsed() >= OUTPUT_STALL_TIMEOUT {
+                self.stalled = true;
+                self.dropped += text.len();
+                tracing::debug!("Client is not reading script output, dropped {} bytes so far", self.dropped);
+                return;
+            }
+            thread::sleep(OUTPUT_RETRY_INTERVAL);
+        }
+    }
+}
+
+/// A `notifications/progress` message carrying script output. `progress` is the
+/// number of output bytes sent so far, so it increases with every message.
+pub fn progress_notification(token: &Value, progress: usize, message: &str) -> String {
+    json!({
+        "jsonrpc": "2.0",
+        "method": "notifications/progress",
+        "params": {
+            "progressToken": token,
+            "progress": progress,
+            "message": message,
+        }
+    }).to_string()
+}
+
+/// Turn script output into progress notifications until the script finishes.
+///
+/// Each notification is passed to `send`; returning `false` stops forwarding,
+/// after which the script's output is discarded. Blocks, so run it on its own thread.
+pub fn forward_output(chunks: Receiver<String>, token: &Value, mut send: impl FnMut(String) -> bool) {
+    let mut progress = 0;
+
+    while let Ok(mut message) = chunks.recv() {
+        // Merge whatever else is already waiting, up to the message size
+        while message.len() < PROGRESS_MESSAGE_BYTES {
+            match chunks.try_recv() {
+                Ok(chunk) => message.push_str(&chunk),
+                Err(_) => break,
+            }
+        }
+
+        progress += message.len();
+        if !send(progress_notification(token, progress, &message)) {
+            break;
+        }
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    #[test]
+    fn test_writer_does_not_wait_past_cancellation() {
+        use std::sync::atomic::AtomicBool;
+        use std::sync::Arc;
+        
+        let (output, chunks) = script_output_channel();
+        let cancel = Arc::new(AtomicBool::new(true));
+        let mut writer = OutputWriter::new(output, ExecutionLimits { cancel: Some(cancel), ..Default::default() });
+        
+        // Nothing reads the stream, so once it is full the writer gives up at once
+        let started = Instant::now();
+        for n in 0..SCRIPT_OUTPUT_CAPACITY + 10 {
+            writer.write(format!("line {}\n", n));
+        }
+        assert!(started.elapsed() < OUTPUT_STALL_TIMEOUT);
+        assert!(writer.stalled);
+        
+        // Room in the stream ends the stall
+        assert_eq!(chunks.recv().unwrap(), "line 0\n");
+        writer.write("more\n".to_string());
+        assert!(!writer.stalled);
+    }
+    
+    #[test]
+    fn test_forward_output_merges_waiting_chunks() {
+        let (output, chunks) = script_output_channel();
+        output.send("one\n".to_string()).unwrap();
+        output.send("two\n".to_string()).unwrap();
+        drop(output);
+
+        let mut sent = Vec::new();
+        forward_output(chunks, &json!("call-1"), |notification| {
+            sent.push(serde_json::from_str::<Value>(&notification).unwrap());
+            true
+        });
+
+        assert_eq!(sent.len(), 1);
+        assert_eq!(sent[0]["method"], "notifications/progress");
+        assert_eq!(sent[0]["params"]["progressToken"], "call-1");
+        assert_eq!(sent[0]["params"]["progress"], 8);
+        assert_eq!(sent[0]["params"]["message"], "one\ntwo\n");
+    }
+}
@@ -1,19 +1,65 @@
 use anyhow::{Result, anyhow};
-use tokio::sync::{mpsc, oneshot};
+use tokio::sync::{mpsc, oneshot, RwLock};
 use std::collections::HashMap;
+use std::fmt;
+use std::sync::atomic::{AtomicBool, AtomicU64, AtomicUsize, Ordering};
+use std::sync::{Arc, Mutex as StdMutex, OnceLock, RwLock as StdRwLock, Weak};
 use std::thread;
+use std::time::{Duration, Instant};
 
 use crate::tcl_tools::{ToolDefinition, ParameterDefinition};
 use crate::namespace::{ToolPath, Namespace};
-use crate::persistence::FilePersistence;
-use crate::tool_discovery::{ToolDiscovery, DiscoveredTool};
-use crate::tcl_runtime::{TclRuntime, create_runtime, RuntimeConfig};
+use crate::persistence::{FilePersistence, StorageOptions};
+use crate::tool_discovery::{
+    ToolDiscovery, DiscoveredTool, DiscoveryDelta, ScriptStore, ToolWatcher, WatchBatch,
+    DEFAULT_SCRIPT_STORE_CAPACITY, WATCH_POLL_INTERVAL,
+};
+use crate::tcl_runtime::{TclRuntime, RuntimeSnapshot, create_runtime, RuntimeConfig, ExecutionLimits};
+use crate::persistence::{calculate_checksum, discovery_index_path};
+use crate::script_cache::{ScriptCache, ScriptCacheStats, ScriptCacheStatsSnapshot};
+use crate::tool_listing::{ToolCatalog, ToolPage, DEFAULT_LIST_PAGE_SIZE};
+use crate::streaming::{OutputWriter, ScriptOutput};
+use crate::tenants::{PushError, Tenant, TenantLimits, TenantQueue, TenantStatsSnapshot, DEFAULT_TENANT_QUEUE_DEPTH};
+use serde::{Deserialize, Serialize};
 
 pub enum TclCommand {
     Execute {
         script: String,
+        call: CallOptions,
         response: oneshot::Sender<Result<String>>,
     },
+    /// Run a user or discovered tool, already resolved from its MCP name
+    CallTool {
+        path: ToolPath,
+        params: serde_json::Value,
+        call: CallOptions,
+        response: oneshot::Sender<Result<String>>,
+    },
+    ExecTool {
+        tool_path: String,
+        params: serde_json::Value,
+        call: CallOptions,
+        response: oneshot::Sender<Result<String>>,
+    },
+}
+
+impl TclCommand {
+    /// The tenant whose share of the workers the command runs on: the user
+    /// namespace of the tool it calls, or the shared system tenant
+    pub fn tenant(&self) -> Tenant {
+        match self {
+            TclCommand::CallTool { path, .. } => Tenant::of(path),
+            TclCommand::ExecTool { tool_path, .. } => ToolPath::parse(tool_path)
+                .map(|path| Tenant::of(&path))
+                .unwrap_or(Tenant::System),
+            TclCommand::Execute { .. } => Tenant::System,
+        }
+    }
+}
+
+/// Changes to the tool registry. They are handled by the registry service, off the
+/// interpreter threads, because most of them wait on storage or the filesystem.
+pub enum RegistryCommand {
     AddTool {
         path: ToolPath,
         description: String,
@@ -25,64 +71,739 @@ pub enum TclCommand {
         path: ToolPath,
         response: oneshot::Sender<Result<String>>,
     },
-    ListTools {
-        namespace: Option<String>,
-        filter: Option<String>,
-        response: oneshot::Sender<Result<Vec<String>>>,
-    },
-    ExecuteCustomTool {
-        path: ToolPath,
-        params: serde_json::Value,
-        response: oneshot::Sender<Result<String>>,
-    },
-    GetToolDefinitions {
-        response: oneshot::Sender<Vec<ToolDefinition>>,
-    },
     InitializePersistence {
         response: oneshot::Sender<Result<String>>,
     },
-    ExecTool {
-        tool_path: String,
-        params: serde_json::Value,
-        response: oneshot::Sender<Result<String>>,
-    },
     DiscoverTools {
         response: oneshot::Sender<Result<String>>,
     },
 }
 
-pub struct TclExecutor {
-    runtime: Box<dyn TclRuntime>,
-    custom_tools: HashMap<ToolPath, ToolDefinition>,
-    discovered_tools: HashMap<ToolPath, DiscoveredTool>,
-    tool_discovery: ToolDiscovery,
-    persistence: Option<FilePersistence>,
+/// Commands the executor queue holds before new ones are turned away
+pub const DEFAULT_QUEUE_DEPTH: usize = 100;
+
+/// A command waiting in the executor queue
+struct QueuedCommand {
+    command: TclCommand,
+    queued_at: Instant,
 }
 
-impl TclExecutor {
-    pub fn new(privileged: bool) -> Self {
-        let runtime = create_runtime();
+/// The executor queue as seen by its clients. Closes the queue when the last
+/// client goes away, which stops the workers once it has drained.
+struct CommandSender(Arc<TenantQueue<QueuedCommand>>);
+
+impl Drop for CommandSender {
+    fn drop(&mut self) {
+        self.0.close();
+    }
+}
+
+/// Sending side of the executor queue, shared by every client of the pool
+#[derive(Clone)]
+pub struct CommandQueue {
+    sender: Arc<CommandSender>,
+    stats: Arc<ExecutorStats>,
+    registry: PublishedRegistry,
+    /// Queue of the registry service
+    updates: mpsc::Sender<RegistryCommand>,
+}
+
+/// JSON-RPC error code of the "server busy" error sent for commands turned away
+pub const SERVER_BUSY_CODE: i32 = -32000;
+
+/// The executor queue was full, so a command was turned away
+#[derive(Debug, Clone, Copy, PartialEq, Eq)]
+pub struct ServerBusy {
+    /// Commands already waiting in the queue that turned the command away
+    pub queued: usize,
+    /// How long the client should wait before trying again
+    pub retry_after: Duration,
+}
+
+impl fmt::Display for ServerBusy {
+    fn fmt(&self, f: &mut fmt::Formatter<'_>) -> fmt::Result {
+        write!(f, "Server busy: {} commands already queued, retry after {}s", self.queued, self.retry_after.as_secs())
+    }
+}
+
+impl std::error::Error for ServerBusy {}
+
+impl CommandQueue {
+    /// Queue a command on its tenant's queue, failing at once with `ServerBusy` when
+    /// that queue or the executor queue as a whole is full
+    pub fn try_send(&self, command: TclCommand) -> Result<()> {
+        let tenant = command.tenant();
+        let queued = QueuedCommand { command, queued_at: Instant::now() };
+        // Counted before sending, so a worker never takes off more than was put on
+        self.stats.queue.record_queued();
+        let result = self.sender.0.try_push(tenant, queued);
+        if result.is_err() {
+            self.stats.queue.record_not_queued();
+        }
         
-        // In non-privileged mode, we could disable certain commands here
-        // For now, we'll just store the flag and use it during execution
-        if !privileged {
-            // TODO: Consider filtering dangerous commands like 'exec', 'file', etc.
-            // For now, we rely on the runtime's default safety features
+        match result {
+            Ok(()) => Ok(()),
+            Err(PushError::Full { queued }) => {
+                self.stats.queue.record_rejected();
+                Err(ServerBusy {
+                    queued,
+                    retry_after: self.stats.queue.retry_after(),
+                }.into())
+            }
+            Err(PushError::Closed) => Err(anyhow!("Failed to send command to executor")),
+        }
+    }
+    
+    /// Queue a command, waiting for room when its tenant's queue or the executor queue
+    /// is full
+    pub async fn send(&self, command: TclCommand) -> Result<()> {
+        let tenant = command.tenant();
+        let queued = QueuedCommand { command, queued_at: Instant::now() };
+        self.stats.queue.record_queued();
+        let result = self.sender.0.push(tenant, queued).await;
+        if result.is_err() {
+            self.stats.queue.record_not_queued();
+        }
+        result.map_err(|_| anyhow!("Failed to send command to executor"))
+    }
+    
+    /// Pool counters, read without going through the queue
+    pub fn stats(&self) -> ExecutorStatsSnapshot {
+        let mut stats = self.stats.snapshot();
+        stats.tenants = self.sender.0.snapshot();
+        stats
+    }
+    
+    /// The tool registry as last published, read without going through the queue
+    pub fn registry(&self) -> Arc<RegistrySnapshot> {
+        self.registry.load()
+    }
+    
+    /// Queue a registry change for the registry service, failing at once with
+    /// `ServerBusy` when its queue is full
+    pub fn update_registry(&self, command: RegistryCommand) -> Result<()> {
+        match self.updates.try_send(command) {
+            Ok(()) => Ok(()),
+            Err(mpsc::error::TrySendError::Full(_)) => Err(ServerBusy {
+                queued: self.updates.max_capacity(),
+                retry_after: Duration::from_secs(1),
+            }.into()),
+            Err(mpsc::error::TrySendError::Closed(_)) => Err(anyhow!("Failed to send command to registry service")),
+        }
+    }
+}
+
+/// How a script call is run, chosen by the caller
+#[derive(Debug, Clone, Default)]
+pub struct CallOptions {
+    /// Receives the script's output as it runs
+    pub output: Option<ScriptOutput>,
+    /// Stops the script once set
+    pub cancel: Option<Arc<AtomicBool>>,
+    /// Time limit for this call; the executor's own limit still applies
+    pub timeout: Option<Duration>,
+}
+
+/// Calls in progress that a client can cancel, keyed by JSON-RPC request id
+#[derive(Debug, Clone, Default)]
+pub struct Cancellations {
+    calls: Arc<StdMutex<HashMap<String, Arc<AtomicBool>>>>,
+}
+
+/// A call registered with `Cancellations`, unregistered when dropped
+pub struct TrackedCall {
+    calls: Arc<StdMutex<HashMap<String, Arc<AtomicBool>>>>,
+    key: String,
+    cancel: Arc<AtomicBool>,
+}
+
+impl Cancellations {
+    /// Register the call made by request `id`
+    pub fn track(&self, id: &serde_json::Value) -> TrackedCall {
+        let key = id.to_string();
+        let cancel = Arc::new(AtomicBool::new(false));
+        self.calls.lock().unwrap().insert(key.clone(), cancel.clone());
+        TrackedCall { calls: self.calls.clone(), key, cancel }
+    }
+    
+    /// Cancel the call made by request `id`; `false` if it is no longer running
+    pub fn cancel(&self, id: &serde_json::Value) -> bool {
+        match self.calls.lock().unwrap().get(&id.to_string()) {
+            Some(cancel) => {
+                cancel.store(true, Ordering::Relaxed);
+                true
+            }
+            None => false,
         }
+    }
+}
+
+impl TrackedCall {
+    /// The flag that stops the call's script
+    pub fn cancel_flag(&self) -> Arc<AtomicBool> {
+        self.cancel.clone()
+    }
+}
+
+impl Drop for TrackedCall {
+    fn drop(&mut self) {
+        let mut calls = self.calls.lock().unwrap();
+        // A later request may have reused the id
+        if calls.get(&self.key).map_or(false, |cancel| Arc::ptr_eq(cancel, &self.cancel)) {
+            calls.remove(&self.key);
+        }
+    }
+}
+
+/// Configuration for the pool of TCL interpreter workers
+#[derive(Debug, Clone)]
+pub struct ExecutorConfig {
+    /// Number of interpreter worker threads (0 = one per available CPU core)
+    pub workers: usize,
+    /// Restore each interpreter to its warm baseline after every call
+    pub isolate_calls: bool,
+    /// Maximum number of discovered tool scripts kept in memory, and of compiled
+    /// scripts cached by each worker
+    pub discovered_cache_size: usize,
+    /// Keep discovered tools in sync with the tools directory as files change
+    pub watch_tools: bool,
+    /// Storage backend and write policy for user tools
+    pub storage: StorageOptions,
+    /// User and discovered tools per `tools/list` page (0 = no pagination)
+    pub list_page_size: usize,
+    /// Longest a single script call may run
+    pub call_timeout: Option<Duration>,
+    /// Most loop iterations and proc calls a single script call may run
+    pub max_steps: Option<u64>,
+    /// Commands the queue holds across all tenants before new ones are turned away
+    pub queue_depth: usize,
+    /// Commands any one tenant may have queued, out of `queue_depth`
+    pub tenant_queue_depth: usize,
+    /// Caps on the commands each user namespace may have running at once
+    pub tenant_limits: TenantLimits,
+}
+
+impl Default for ExecutorConfig {
+    fn default() -> Self {
+        Self {
+            workers: 1,
+            isolate_calls: false,
+            discovered_cache_size: DEFAULT_SCRIPT_STORE_CAPACITY,
+            watch_tools: false,
+            storage: StorageOptions::default(),
+            list_page_size: DEFAULT_LIST_PAGE_SIZE,
+            call_timeout: None,
+            max_steps: None,
+            queue_depth: DEFAULT_QUEUE_DEPTH,
+            tenant_queue_depth: DEFAULT_TENANT_QUEUE_DEPTH,
+            tenant_limits: TenantLimits::default(),
+        }
+    }
+}
+
+/// Command line options for the executor pool, shared by the stdio and HTTP servers
+#[derive(Debug, Clone, Default, clap::Args)]
+pub struct ExecutorArgs {
+    /// Number of TCL interpreter workers
+    #[arg(
+        long,
+        value_name = "N",
+        help = "Number of TCL interpreter workers (0 = one per CPU core). Can also be set via TCL_MCP_WORKERS environment variable"
+    )]
+    pub workers: Option<usize>,
+    
+    /// Reset interpreter state after every call
+    #[arg(
+        long,
+        help = "Restore each interpreter to a clean baseline after every call. Can also be set via TCL_MCP_ISOLATE_CALLS=1"
+    )]
+    pub isolate_calls: bool,
+    
+    /// Maximum number of discovered tool scripts kept in memory
+    #[arg(
+        long,
+        value_name = "N",
+        help = "Maximum number of discovered tool scripts kept in memory, and of compiled scripts cached by each worker (LRU). Can also be set via TCL_MCP_DISCOVERED_CACHE_SIZE environment variable"
+    )]
+    pub discovered_cache_size: Option<usize>,
+    
+    /// Watch the tools directory and apply changes incrementally
+    #[arg(
+        long,
+        help = "Discover tools at startup and apply added, changed and removed tool files as they happen. Can also be set via TCL_MCP_WATCH_TOOLS=1"
+    )]
+    pub watch_tools: bool,
+    
+    /// Storage backend for user tools
+    #[arg(
+        long,
+        value_name = "BACKEND",
+        help = "Storage backend for user tools (json|log). Can also be set via TCL_MCP_STORAGE environment variable"
+    )]
+    pub storage: Option<String>,
+    
+    /// When storage writes are flushed to disk
+    #[arg(
+        long,
+        value_name = "POLICY",
+        help = "When storage writes are fsync'ed (always|never). Can also be set via TCL_MCP_FSYNC environment variable"
+    )]
+    pub fsync: Option<String>,
+    
+    /// Group commit window for index updates
+    #[arg(
+        long,
+        value_name = "MS",
+        help = "Batch index updates arriving within this many milliseconds into one write (0 = off). Can also be set via TCL_MCP_GROUP_COMMIT_MS environment variable"
+    )]
+    pub group_commit_ms: Option<u64>,
+    
+    /// Number of tools per tools/list page
+    #[arg(
+        long,
+        value_name = "N",
+        help = "User and discovered tools returned per tools/list page (0 = all in one page). Can also be set via TCL_MCP_LIST_PAGE_SIZE environment variable"
+    )]
+    pub list_page_size: Option<usize>,
+    
+    /// Time limit for each script call
+    #[arg(
+        long,
+        value_name = "MS",
+        help = "Stop scripts that run longer than this many milliseconds and recycle their interpreter (0 = no limit). Can also be set via TCL_MCP_CALL_TIMEOUT_MS environment variable"
+    )]
+    pub call_timeout_ms: Option<u64>,
+    
+    /// Loop iteration and proc call budget for each script call
+    #[arg(
+        long,
+        value_name = "N",
+        help = "Stop scripts after this many loop iterations and proc calls and recycle their interpreter (0 = no limit). Can also be set via TCL_MCP_MAX_STEPS environment variable"
+    )]
+    pub max_steps: Option<u64>,
+    
+    /// Executor queue depth
+    #[arg(
+        long,
+        value_name = "N",
+        help = "Commands queued for the interpreter workers before new requests are rejected as busy (default 100). Can also be set via TCL_MCP_QUEUE_DEPTH environment variable"
+    )]
+    pub queue_depth: Option<usize>,
+    
+    /// Executor queue depth per user namespace
+    #[arg(
+        long,
+        value_name = "N",
+        help = "Commands one user namespace may have queued, out of --queue-depth, before its requests are rejected as busy (default 25). Can also be set via TCL_MCP_TENANT_QUEUE_DEPTH environment variable"
+    )]
+    pub tenant_queue_depth: Option<usize>,
+    
+    /// Running commands allowed per user namespace
+    #[arg(
+        long,
+        value_name = "N",
+        help = "Most commands each user namespace may have running at once (0 = no limit). Can also be set via TCL_MCP_TENANT_MAX_IN_FLIGHT environment variable"
+    )]
+    pub tenant_max_in_flight: Option<usize>,
+    
+    /// Running commands allowed for particular user namespaces
+    #[arg(
+        long,
+        value_name = "USER=N,...",
+        help = "Per-namespace limits on running commands, overriding --tenant-max-in-flight (0 = no limit). Can also be set via TCL_MCP_TENANT_LIMITS environment variable"
+    )]
+    pub tenant_limits: Option<String>,
+}
+
+impl ExecutorConfig {
+    /// Create executor config from CLI args and environment variables (CLI overrides environment)
+    pub fn from_args_and_env(args: &ExecutorArgs, env: impl Fn(&str) -> Option<String>) -> Result<Self> {
+        let mut config = ExecutorConfig::default();
         
-        tracing::info!("Initialized TCL runtime: {}", runtime.name());
+        // Check environment variables first
+        if let Some(workers) = env("TCL_MCP_WORKERS") {
+            config.workers = workers.trim().parse()
+                .map_err(|_| anyhow!("Invalid TCL_MCP_WORKERS '{}'. Expected a non-negative integer", workers))?;
+        }
+        if let Some(isolate) = env("TCL_MCP_ISOLATE_CALLS") {
+            config.isolate_calls = parse_env_flag("TCL_MCP_ISOLATE_CALLS", &isolate)?;
+        }
+        if let Some(size) = env("TCL_MCP_DISCOVERED_CACHE_SIZE") {
+            config.discovered_cache_size = size.trim().parse()
+                .map_err(|_| anyhow!("Invalid TCL_MCP_DISCOVERED_CACHE_SIZE '{}'. Expected a non-negative integer", size))?;
+        }
+        if let Some(watch) = env("TCL_MCP_WATCH_TOOLS") {
+            config.watch_tools = parse_env_flag("TCL_MCP_WATCH_TOOLS", &watch)?;
+        }
+        if let Some(storage) = env("TCL_MCP_STORAGE") {
+            config.storage.backend = storage.parse()?;
+        }
+        if let Some(fsync) = env("TCL_MCP_FSYNC") {
+            config.storage.fsync = fsync.parse()?;
+        }
+        if let Some(window) = env("TCL_MCP_GROUP_COMMIT_MS") {
+            let window: u64 = window.trim().parse()
+                .map_err(|_| anyhow!("Invalid TCL_MCP_GROUP_COMMIT_MS '{}'. Expected a non-negative integer", window))?;
+            config.storage.group_commit = group_commit_window(window);
+        }
+        if let Some(size) = env("TCL_MCP_LIST_PAGE_SIZE") {
+            config.list_page_size = size.trim().parse()
+                .map_err(|_| anyhow!("Invalid TCL_MCP_LIST_PAGE_SIZE '{}'. Expected a non-negative integer", size))?;
+        }
+        
+        if let Some(timeout) = env("TCL_MCP_CALL_TIMEOUT_MS") {
+            let timeout: u64 = timeout.trim().parse()
+                .map_err(|_| anyhow!("Invalid TCL_MCP_CALL_TIMEOUT_MS '{}'. Expected a non-negative integer", timeout))?;
+            config.call_timeout = optional_duration(timeout);
+        }
+        if let Some(steps) = env("TCL_MCP_MAX_STEPS") {
+            let steps: u64 = steps.trim().parse()
+                .map_err(|_| anyhow!("Invalid TCL_MCP_MAX_STEPS '{}'. Expected a non-negative integer", steps))?;
+            config.max_steps = optional_limit(steps);
+        }
         
+        if let Some(depth) = env("TCL_MCP_QUEUE_DEPTH") {
+            config.queue_depth = depth.trim().parse().ok().filter(|depth| *depth > 0)
+                .ok_or_else(|| anyhow!("Invalid TCL_MCP_QUEUE_DEPTH '{}'. Expected a positive integer", depth))?;
+        }
+        if let Some(depth) = env("TCL_MCP_TENANT_QUEUE_DEPTH") {
+            config.tenant_queue_depth = depth.trim().parse().ok().filter(|depth| *depth > 0)
+                .ok_or_else(|| anyhow!("Invalid TCL_MCP_TENANT_QUEUE_DEPTH '{}'. Expected a positive integer", depth))?;
+        }
+        if let Some(limit) = env("TCL_MCP_TENANT_MAX_IN_FLIGHT") {
+            let limit: usize = limit.trim().parse()
+                .map_err(|_| anyhow!("Invalid TCL_MCP_TENANT_MAX_IN_FLIGHT '{}'. Expected a non-negative integer", limit))?;
+            config.tenant_limits.max_in_flight = Some(limit).filter(|limit| *limit > 0);
+        }
+        if let Some(limits) = env("TCL_MCP_TENANT_LIMITS") {
+            config.tenant_limits.overrides = TenantLimits::parse_overrides(&limits)?;
+        }
+        
+        // CLI arguments override environment
+        if let Some(workers) = args.workers {
+            config.workers = workers;
+        }
+        if args.isolate_calls {
+            config.isolate_calls = true;
+        }
+        if let Some(size) = args.discovered_cache_size {
+            config.discovered_cache_size = size;
+        }
+        if args.watch_tools {
+            config.watch_tools = true;
+        }
+        if let Some(ref storage) = args.storage {
+            config.storage.backend = storage.parse()?;
+        }
+        if let Some(ref fsync) = args.fsync {
+            config.storage.fsync = fsync.parse()?;
+        }
+        if let Some(window) = args.group_commit_ms {
+            config.storage.group_commit = group_commit_window(window);
+        }
+        if let Some(size) = args.list_page_size {
+            config.list_page_size = size;
+        }
+        if let Some(timeout) = args.call_timeout_ms {
+            config.call_timeout = optional_duration(timeout);
+        }
+        if let Some(steps) = args.max_steps {
+            config.max_steps = optional_limit(steps);
+        }
+        if let Some(depth) = args.queue_depth {
+            if depth == 0 {
+                return Err(anyhow!("Invalid queue depth '0'. Expected a positive integer"));
+            }
+            config.queue_depth = depth;
+        }
+        if let Some(depth) = args.tenant_queue_depth {
+            if depth == 0 {
+                return Err(anyhow!("Invalid tenant queue depth '0'. Expected a positive integer"));
+            }
+            config.tenant_queue_depth = depth;
+        }
+        if let Some(limit) = args.tenant_max_in_flight {
+            config.tenant_limits.max_in_flight = Some(limit).filter(|limit| *limit > 0);
+        }
+        if let Some(ref limits) = args.tenant_limits {
+            config.tenant_limits.overrides = TenantLimits::parse_overrides(limits)?;
+        }
+        
+        Ok(config)
+    }
+    
+    /// Resolve the number of worker threads to start
+    pub fn worker_count(&self) -> usize {
+        if self.workers == 0 {
+            thread::available_parallelism().map(|n| n.get()).unwrap_or(1)
+        } else {
+            self.workers
+        }
+    }
+}
+
+/// Group commit window from a millisecond count, 0 meaning disabled
+fn group_commit_window(millis: u64) -> Option<Duration> {
+    optional_duration(millis)
+}
+
+/// A duration from a millisecond count, 0 meaning none
+fn optional_duration(millis: u64) -> Option<Duration> {
+    if millis == 0 {
+        None
+    } else {
+        Some(Duration::from_millis(millis))
+    }
+}
+
+/// A limit from a count, 0 meaning unlimited
+fn optional_limit(limit: u64) -> Option<u64> {
+    if limit == 0 {
+        None
+    } else {
+        Some(limit)
+    }
+}
+
+/// Parse a boolean environment flag ("1"/"true"/"yes"/"on" or "0"/"false"/"no"/"off")
+fn parse_env_flag(name: &str, value: &str) -> Result<bool> {
+    match value.trim().to_lowercase().as_str() {
+        "1" | "true" | "yes" | "on" => Ok(true),
+        "0" | "false" | "no" | "off" | "" => Ok(false),
+        _ => Err(anyhow!("Invalid {} '{}'. Expected a boolean", name, value)),
+    }
+}
+
+/// Counters shared by every worker in the pool
+#[derive(Debug, Default)]
+pub struct ExecutorStats {
+    workers: usize,
+    script_cache: Arc<ScriptCacheStats>,
+    queue: QueueStats,
+}
+
+/// Queue occupancy and waiting times
+#[derive(Debug, Default)]
+pub struct QueueStats {
+    capacity: usize,
+    /// Commands waiting right now
+    queued: AtomicUsize,
+    /// Commands turned away because the queue was full
+    rejected: AtomicU64,
+    /// Commands taken off the queue by a worker
+    dequeued: AtomicU64,
+    wait_micros_total: AtomicU64,
+    wait_micros_max: AtomicU64,
+}
+
+/// Point-in-time view of the executor pool counters
+#[derive(Debug, Clone, Default, Serialize, Deserialize)]
+pub struct ExecutorStatsSnapshot {
+    pub workers: usize,
+    pub script_cache: ScriptCacheStatsSnapshot,
+    pub queue: QueueStatsSnapshot,
+    /// Tenants with commands waiting or running
+    #[serde(default)]
+    pub tenants: Vec<TenantStatsSnapshot>,
+}
+
+/// Point-in-time view of the executor queue counters
+#[derive(Debug, Clone, Default, Serialize, Deserialize)]
+pub struct QueueStatsSnapshot {
+    pub capacity: usize,
+    pub queued: usize,
+    pub rejected: u64,
+    pub dequeued: u64,
+    pub mean_wait_micros: u64,
+    pub max_wait_micros: u64,
+}
+
+impl ExecutorStats {
+    pub fn snapshot(&self) -> ExecutorStatsSnapshot {
+        ExecutorStatsSnapshot {
+            workers: self.workers,
+            script_cache: self.script_cache.snapshot(),
+            queue: self.queue.snapshot(),
+            tenants: Vec::new(),
+        }
+    }
+}
+
+impl QueueStats {
+    pub fn new(capacity: usize) -> Self {
+        Self { capacity, ..Default::default() }
+    }
+    
+    /// Record a command put on the queue. Call it before the command becomes visible
+    /// to workers, so that `queued` never drops below zero.
+    pub fn record_queued(&self) {
+        self.queued.fetch_add(1, Ordering::Relaxed);
+    }
+    
+    /// Undo `record_queued` for a command that could not be queued after all
+    pub fn record_not_queued(&self) {
+        self.queued.fetch_sub(1, Ordering::Relaxed);
+    }
+    
+    /// Record a command turned away because the queue was full
+    pub fn record_rejected(&self) {
+        self.rejected.fetch_add(1, Ordering::Relaxed);
+    }
+    
+    /// Record a command taken off the queue after waiting `wait`
+    pub fn record_wait(&self, wait: Duration) {
+        let micros = wait.as_micros().min(u64::MAX as u128) as u64;
+        self.queued.fetch_sub(1, Ordering::Relaxed);
+        self.dequeued.fetch_add(1, Ordering::Relaxed);
+        self.wait_micros_total.fetch_add(micros, Ordering::Relaxed);
+        self.wait_micros_max.fetch_max(micros, Ordering::Relaxed);
+    }
+    
+    fn mean_wait_micros(&self) -> u64 {
+        match self.dequeued.load(Ordering::Relaxed) {
+            0 => 0,
+            dequeued => self.wait_micros_total.load(Ordering::Relaxed) / dequeued,
+        }
+    }
+    
+    /// Suggested client back-off: the mean queue wait, rounded up to whole seconds
+    fn retry_after(&self) -> Duration {
+        let seconds = (self.mean_wait_micros() + 999_999) / 1_000_000;
+        Duration::from_secs(seconds.max(1))
+    }
+    
+    pub fn snapshot(&self) -> QueueStatsSnapshot {
+        QueueStatsSnapshot {
+            capacity: self.capacity,
+            queued: self.queued.load(Ordering::Relaxed),
+            rejected: self.rejected.load(Ordering::Relaxed),
+            dequeued: self.dequeued.load(Ordering::Relaxed),
+            mean_wait_micros: self.mean_wait_micros(),
+            max_wait_micros: self.wait_micros_max.load(Ordering::Relaxed),
+        }
+    }
+}
+
+/// Built-in tools listed by `tcl_tool_list`, as (namespace, path) in path order
+const SYSTEM_TOOL_PATHS: [(&str, &str); 7] = [
+    ("bin", "/bin/discover_tools"),
+    ("bin", "/bin/exec_tool"),
+    ("bin", "/bin/tcl_execute"),
+    ("bin", "/bin/tcl_tool_list"),
+    ("docs", "/docs/molt_book"),
+    ("sbin", "/sbin/tcl_tool_add"),
+    ("sbin", "/sbin/tcl_tool_remove"),
+];
+
+/// Tool registry state shared by every worker in the pool.
+///
+/// Only changes go through the registry itself; they are serialized by its lock and
+/// published as a `RegistrySnapshot` that every reader uses instead. The tool maps
+/// are shared with the published snapshot and copied on the next change.
+struct ToolRegistry {
+    custom_tools: Arc<HashMap<ToolPath, ToolDefinition>>,
+    discovered_tools: Arc<HashMap<ToolPath, DiscoveredTool>>,
+    /// Script checksums of custom tools, used to validate compiled-script cache entries
+    script_checksums: Arc<HashMap<ToolPath, String>>,
+    /// Bumped on every add, remove or discovery so workers can revalidate their caches
+    generation: u64,
+    /// In-memory bodies of discovered tools
+    scripts: Arc<ScriptStore>,
+    tool_discovery: ToolDiscovery,
+    persistence: Option<FilePersistence>,
+    /// Options used when persistence is initialized
+    storage: StorageOptions,
+    /// `tools/list` entries of custom and discovered tools, sorted by path
+    catalog: Arc<ToolCatalog>,
+    /// Tools per `tools/list` page
+    list_page_size: usize,
+    /// Where readers find the registry
+    published: PublishedRegistry,
+}
+
+/// The tool registry as of one generation. Published after every change and never
+/// modified, so readers neither take the registry lock nor queue behind scripts.
+pub struct RegistrySnapshot {
+    generation: u64,
+    custom_tools: Arc<HashMap<ToolPath, ToolDefinition>>,
+    discovered_tools: Arc<HashMap<ToolPath, DiscoveredTool>>,
+    script_checksums: Arc<HashMap<ToolPath, String>>,
+    scripts: Arc<ScriptStore>,
+    catalog: Arc<ToolCatalog>,
+    list_page_size: usize,
+    /// First `tools/list` page, taken on first request
+    first_page: OnceLock<Arc<ToolPage>>,
+}
+
+/// The latest `RegistrySnapshot`. Readers only hold the lock to clone the `Arc`.
+#[derive(Clone)]
+struct PublishedRegistry(Arc<StdRwLock<Arc<RegistrySnapshot>>>);
+
+impl PublishedRegistry {
+    fn new(snapshot: RegistrySnapshot) -> Self {
+        Self(Arc::new(StdRwLock::new(Arc::new(snapshot))))
+    }
+    
+    fn load(&self) -> Arc<RegistrySnapshot> {
+        self.0.read().unwrap().clone()
+    }
+    
+    fn store(&self, snapshot: Arc<RegistrySnapshot>) {
+        *self.0.write().unwrap() = snapshot;
+    }
+}
+
+/// State shared by every worker in the pool
+#[derive(Clone)]
+struct PoolShared {
+    registry: Arc<RwLock<ToolRegistry>>,
+    published: PublishedRegistry,
+    stats: Arc<ExecutorStats>,
+}
+
+impl PoolShared {
+    fn new(workers: usize, config: &ExecutorConfig) -> Self {
+        let registry = ToolRegistry::new(config);
         Self {
-            runtime,
-            custom_tools: HashMap::new(),
-            discovered_tools: HashMap::new(),
-            tool_discovery: ToolDiscovery::new(),
-            persistence: None,
+            published: registry.published.clone(),
+            registry: Arc::new(RwLock::new(registry)),
+            stats: Arc::new(ExecutorStats {
+                workers,
+                queue: QueueStats::new(config.queue_depth),
+                ..Default::default()
+            }),
         }
     }
+}
+
+pub struct TclExecutor {
+    runtime: Box<dyn TclRuntime>,
+    /// Baseline restored after each call when call isolation is enabled
+    baseline: Option<RuntimeSnapshot>,
+    script_cache: ScriptCache,
+    /// The tool registry, as the registry service last published it
+    published: PublishedRegistry,
+    stats: Arc<ExecutorStats>,
+    /// Longest a single script call may run
+    call_timeout: Option<Duration>,
+    /// Most loop iterations and proc calls a single script call may run
+    max_steps: Option<u64>,
+}
+
+impl TclExecutor {
+    pub fn new(privileged: bool) -> Self {
+        Self::new_with_runtime(privileged, RuntimeConfig::default())
+            .expect("Failed to create TCL executor")
+    }
+    
+    pub fn new_with_runtime(privileged: bool, runtime_config: RuntimeConfig) -> Result<Self, String> {
+        let config = ExecutorConfig::default();
+        let shared = PoolShared::new(1, &config);
+        Self::with_shared(privileged, runtime_config, &config, shared)
+    }
     
-    pub fn new_with_runtime(privileged: bool, _runtime_config: RuntimeConfig) -> Result<Self, String> {
-        let runtime = create_runtime();
+    fn with_shared(privileged: bool, _runtime_config: RuntimeConfig, config: &ExecutorConfig, shared: PoolShared) -> Result<Self, String> {
+        let mut runtime = create_runtime();
         
         // In non-privileged mode, we could disable certain commands here
         // For now, we'll just store the flag and use it during execution
@@ -93,149 +814,453 @@ impl TclExecutor {
         
         tracing::info!("Initialized TCL runtime: {}", runtime.name());
         
+        let baseline = if config.isolate_calls {
+            Some(RuntimeSnapshot::capture(runtime.as_mut()))
+        } else {
+            None
+        };
+        
         Ok(Self {
             runtime,
-            custom_tools: HashMap::new(),
-            discovered_tools: HashMap::new(),
-            tool_discovery: ToolDiscovery::new(),
-            persistence: None,
+            baseline,
+            script_cache: ScriptCache::new(config.discovered_cache_size, shared.stats.script_cache.clone()),
+            published: shared.published,
+            stats: shared.stats,
+            call_timeout: config.call_timeout,
+            max_steps: config.max_steps,
         })
     }
     
-    pub fn spawn(privileged: bool) -> mpsc::Sender<TclCommand> {
-        let (tx, mut rx) = mpsc::channel::<TclCommand>(100);
+    pub fn spawn(privileged: bool) -> CommandQueue {
+        Self::spawn_pool(privileged, RuntimeConfig::default(), ExecutorConfig::default())
+            .expect("Failed to spawn TCL executor")
+    }
+    
+    pub fn spawn_with_runtime(privileged: bool, runtime_config: RuntimeConfig) -> Result<CommandQueue, String> {
+        Self::spawn_pool(privileged, runtime_config, ExecutorConfig::default())
+    }
+    
+    /// Spawn a pool of interpreter workers sharing one command queue and tool registry.
+    ///
+    /// Each worker owns its own TCL runtime on a dedicated thread, so a slow script
+    /// only occupies the worker running it. The queue keeps the commands of each user
+    /// namespace apart and hands free workers to them in turn.
+    pub fn spawn_pool(privileged: bool, runtime_config: RuntimeConfig, config: ExecutorConfig) -> Result<CommandQueue, String> {
+        let queue = Arc::new(TenantQueue::new(config.queue_depth, config.tenant_queue_depth, config.tenant_limits.clone()));
+        let worker_count = config.worker_count();
+        let shared = PoolShared::new(worker_count, &config);
         
-        // Spawn a dedicated thread for the TCL interpreter
-        thread::spawn(move || {
-            let mut executor = TclExecutor::new(privileged);
+        for worker_id in 0..worker_count {
+            let config = config.clone();
+            let queue = queue.clone();
+            let shared = shared.clone();
+            let runtime_config = runtime_config.clone();
             
-            // Create a single-threaded runtime for this thread
-            let runtime = tokio::runtime::Builder::new_current_thread()
-                .enable_all()
-                .build()
-                .expect("Failed to create Tokio runtime");
-                
-            runtime.block_on(async move {
-                while let Some(cmd) = rx.recv().await {
-                    match cmd {
-                        TclCommand::Execute { script, response } => {
-                            let result = executor.execute_script(&script);
-                            let _ = response.send(result);
-                        }
-                        TclCommand::AddTool { path, description, script, parameters, response } => {
-                            let result = executor.add_tool(path, description, script, parameters).await;
-                            let _ = response.send(result);
-                        }
-                        TclCommand::RemoveTool { path, response } => {
-                            let result = executor.remove_tool(&path).await;
-                            let _ = response.send(result);
-                        }
-                        TclCommand::ListTools { namespace, filter, response } => {
-                            let tools = executor.list_tools(namespace, filter);
-                            let _ = response.send(Ok(tools));
-                        }
-                        TclCommand::ExecuteCustomTool { path, params, response } => {
-                            let result = executor.execute_custom_tool(&path, params);
-                            let _ = response.send(result);
-                        }
-                        TclCommand::GetToolDefinitions { response } => {
-                            let tools = executor.get_tool_definitions();
-                            let _ = response.send(tools);
-                        }
-                        TclCommand::InitializePersistence { response } => {
-                            let result = executor.initialize_persistence().await;
-                            let _ = response.send(result);
-                        }
-                        TclCommand::ExecTool { tool_path, params, response } => {
-                            let result = executor.exec_tool(&tool_path, params).await;
-                            let _ = response.send(result);
+            // Spawn a dedicated thread for each TCL interpreter
+            thread::Builder::new()
+                .name(format!("tcl-worker-{}", worker_id))
+                .spawn(move || {
+                    let mut executor = match TclExecutor::with_shared(privileged, runtime_config, &config, shared) {
+                        Ok(executor) => executor,
+                        Err(e) => {
+                            tracing::error!("Failed to create TCL executor: {}", e);
+                            return;
                         }
-                        TclCommand::DiscoverTools { response } => {
-                            let result = executor.discover_tools().await;
-                            let _ = response.send(result);
+                    };
+                    
+                    // Create a single-threaded runtime for this thread
+                    let runtime = tokio::runtime::Builder::new_current_thread()
+                        .enable_all()
+                        .build()
+                        .expect("Failed to create Tokio runtime");
+                    
+                    runtime.block_on(async move {
+                        // Runs until the queue is closed and drained
+                        while let Some((ticket, queued)) = queue.pop().await {
+                            let wait = queued.queued_at.elapsed();
+                            tracing::debug!("Command for {} waited {:?} in the executor queue", ticket.tenant(), wait);
+                            executor.stats.queue.record_wait(wait);
+                            
+                            let started = Instant::now();
+                            executor.handle_command(queued.command).await;
+                            queue.finish(ticket, started.elapsed());
                         }
-                    }
-                }
-            });
-        });
+                    });
+                })
+                .map_err(|e| format!("Failed to spawn TCL worker thread: {}", e))?;
+        }
         
-        tx
+        let (updates, update_rx) = mpsc::channel::<RegistryCommand>(config.queue_depth.max(1));
+        if config.watch_tools {
+            spawn_tool_watcher(Arc::downgrade(&shared.registry))?;
+        }
+        spawn_registry_service(shared.registry, update_rx)?;
+        
+        tracing::info!("Started {} TCL interpreter worker(s)", worker_count);
+        
+        Ok(CommandQueue { sender: Arc::new(CommandSender(queue)), stats: shared.stats, registry: shared.published, updates })
+    }
+    
+    async fn handle_command(&mut self, cmd: TclCommand) {
+        match cmd {
+            TclCommand::Execute { script, call, response } => {
+                self.begin_call(call);
+                let result = self.execute_script(&script);
+                self.finish_call();
+                let _ = response.send(result);
+            }
+            TclCommand::CallTool { path, params, call, response } => {
+                self.begin_call(call);
+                let result = self.execute_registered_tool(&path, params).await;
+                self.finish_call();
+                let _ = response.send(result);
+            }
+            TclCommand::ExecTool { tool_path, params, call, response } => {
+                self.begin_call(call);
+                let result = self.exec_tool(&tool_path, params).await;
+                self.finish_call();
+                let _ = response.send(result);
+            }
+        }
+    }
+    
+    fn execute_script(&mut self, script: &str) -> Result<String> {
+        self.runtime.eval(script)
     }
     
-    pub fn spawn_with_runtime(privileged: bool, runtime_config: RuntimeConfig) -> Result<mpsc::Sender<TclCommand>, String> {
-        let (tx, mut rx) = mpsc::channel::<TclCommand>(100);
+    /// Prepare the interpreter for a script call: stream its `puts` output if the
+    /// caller asked for it, and apply the call's deadline, step budget and cancel flag
+    fn begin_call(&mut self, call: CallOptions) {
+        // A caller can shorten the executor's time limit but not extend it
+        let timeout = match (call.timeout, self.call_timeout) {
+            (Some(call), Some(limit)) => Some(call.min(limit)),
+            (call, limit) => call.or(limit),
+        };
+        let limits = ExecutionLimits {
+            deadline: timeout.map(|timeout| Instant::now() + timeout),
+            max_steps: self.max_steps,
+            cancel: call.cancel,
+        };
         
-        // Spawn a dedicated thread for the TCL interpreter
-        let tx_clone = tx.clone();
-        thread::spawn(move || {
-            let mut executor = match TclExecutor::new_with_runtime(privileged, runtime_config) {
-                Ok(executor) => executor,
-                Err(e) => {
-                    tracing::error!("Failed to create TCL executor: {}", e);
-                    return;
+        if let Some(output) = call.output {
+            let mut writer = OutputWriter::new(output, limits.clone());
+            self.runtime.set_output(Some(Box::new(move |text| writer.write(text))));
+        }
+        self.runtime.set_limits(limits);
+    }
+    
+    /// Detach the call's output stream, ending it, and restore the baseline. An
+    /// interpreter whose script was stopped part way is replaced, since the script
+    /// may have left it in any state.
+    fn finish_call(&mut self) {
+        self.runtime.set_output(None);
+        
+        match self.runtime.interrupted() {
+            Some(interrupt) => {
+                tracing::warn!("{}, recycling interpreter", interrupt);
+                self.recreate_runtime();
+            }
+            None => self.reset_runtime(),
+        }
+    }
+    
+    /// Restore the interpreter to its baseline after a call (call isolation only).
+    ///
+    /// Only the changes made by the call are undone; the interpreter is recreated
+    /// only when the call altered it in a way that cannot be rolled back.
+    fn reset_runtime(&mut self) {
+        let restored = match &self.baseline {
+            Some(baseline) => baseline.restore(self.runtime.as_mut()),
+            None => return,
+        };
+        
+        match restored {
+            Ok(true) => {}
+            Ok(false) => {
+                tracing::debug!("Interpreter state could not be rolled back, recreating runtime");
+                self.recreate_runtime();
+            }
+            Err(e) => {
+                tracing::warn!("Failed to reset interpreter state, recreating runtime: {}", e);
+                self.recreate_runtime();
+            }
+        }
+    }
+    
+    fn recreate_runtime(&mut self) {
+        self.runtime = create_runtime();
+        if self.baseline.is_some() {
+            self.baseline = Some(RuntimeSnapshot::capture(self.runtime.as_mut()));
+        }
+    }
+    
+    /// Set tool parameters as TCL variables
+    fn bind_params(&mut self, parameters: &[ParameterDefinition], params: &serde_json::Value) -> Result<()> {
+        if let Some(params_obj) = params.as_object() {
+            for param_def in parameters {
+                if let Some(value) = params_obj.get(&param_def.name) {
+                    let tcl_value = match value {
+                        serde_json::Value::String(s) => s.to_string(),
+                        _ => value.to_string(),
+                    };
+                    self.runtime.set_var(&param_def.name, &tcl_value)?;
+                } else if param_def.required {
+                    return Err(anyhow!("Missing required parameter: {}", param_def.name));
                 }
-            };
+            }
+        }
+        Ok(())
+    }
+    
+    async fn execute_custom_tool(&mut self, path: &ToolPath, params: serde_json::Value) -> Result<String> {
+        let (parameters, compiled) = {
+            let registry = self.published.load();
+            self.script_cache.sync(registry.generation, |path| registry.current_checksum(path));
             
-            // Create a single-threaded runtime for this thread
-            let runtime = tokio::runtime::Builder::new_current_thread()
-                .enable_all()
-                .build()
-                .expect("Failed to create Tokio runtime");
-                
-            runtime.block_on(async move {
-                while let Some(cmd) = rx.recv().await {
-                    match cmd {
-                        TclCommand::Execute { script, response } => {
-                            let result = executor.execute_script(&script);
-                            let _ = response.send(result);
-                        }
-                        TclCommand::AddTool { path, description, script, parameters, response } => {
-                            let result = executor.add_tool(path, description, script, parameters).await;
-                            let _ = response.send(result);
-                        }
-                        TclCommand::RemoveTool { path, response } => {
-                            let result = executor.remove_tool(&path).await;
-                            let _ = response.send(result);
-                        }
-                        TclCommand::ListTools { namespace, filter, response } => {
-                            let tools = executor.list_tools(namespace, filter);
-                            let _ = response.send(Ok(tools));
-                        }
-                        TclCommand::ExecuteCustomTool { path, params, response } => {
-                            let result = executor.execute_custom_tool(&path, params);
-                            let _ = response.send(result);
-                        }
-                        TclCommand::GetToolDefinitions { response } => {
-                            let tools = executor.get_tool_definitions();
-                            let _ = response.send(tools);
-                        }
-                        TclCommand::InitializePersistence { response } => {
-                            let result = executor.initialize_persistence().await;
-                            let _ = response.send(result);
-                        }
-                        TclCommand::ExecTool { tool_path, params, response } => {
-                            let result = executor.exec_tool(&tool_path, params).await;
-                            let _ = response.send(result);
-                        }
-                        TclCommand::DiscoverTools { response } => {
-                            let result = executor.discover_tools().await;
-                            let _ = response.send(result);
-                        }
-                    }
+            let tool = registry.custom_tools.get(path)
+                .ok_or_else(|| anyhow!("Tool '{}' not found", path))?;
+            let checksum = registry.script_checksums.get(path).map(String::as_str).unwrap_or_default();
+            
+            // Only copy the script source when it has to be compiled
+            let compiled = self.script_cache.get_or_compile(path, checksum, || tool.script.clone(), self.runtime.as_mut())?;
+            (tool.parameters.clone(), compiled)
+        };
+        
+        self.bind_params(&parameters, &params)?;
+        
+        // Execute the tool script
+        self.runtime.eval_compiled(&compiled)
+    }
+    
+    /// Execute a tool from the filesystem or custom tools
+    async fn exec_tool(&mut self, tool_path: &str, params: serde_json::Value) -> Result<String> {
+        // Parse the tool path
+        let path = ToolPath::parse(tool_path)?;
+        
+        // Custom and discovered tools take precedence over built-in ones
+        if self.published.load().contains(&path) {
+            return self.execute_registered_tool(&path, params).await;
+        }
+        
+        // Check if it's a built-in system tool
+        match tool_path {
+            "/bin/tcl_execute" => {
+                if let Some(script) = params.get("script").and_then(|s| s.as_str()) {
+                    self.execute_script(script)
+                } else {
+                    Err(anyhow!("Missing required parameter: script"))
                 }
-            });
-        });
+            }
+            "/bin/tcl_tool_list" => {
+                let namespace = params.get("namespace").and_then(|s| s.as_str()).map(String::from);
+                let filter = params.get("filter").and_then(|s| s.as_str()).map(String::from);
+                let tools = self.published.load().list_tools(namespace, filter);
+                Ok(tools.join("\n"))
+            }
+            _ => Err(anyhow!("Tool '{}' not found", tool_path))
+        }
+    }
+    
+    /// Execute a custom tool, or failing that a discovered tool
+    async fn execute_registered_tool(&mut self, path: &ToolPath, params: serde_json::Value) -> Result<String> {
+        // Take what we need from the published registry
+        let (is_custom, discovered_tool, scripts) = {
+            let registry = self.published.load();
+            self.script_cache.sync(registry.generation, |path| registry.current_checksum(path));
+            (
+                registry.custom_tools.contains_key(path),
+                registry.discovered_tools.get(path).cloned(),
+                registry.scripts.clone(),
+            )
+        };
+        
+        // Check custom tools first (added via tcl_tool_add)
+        if is_custom {
+            return self.execute_custom_tool(path, params).await;
+        }
+        
+        // Check if it's a discovered tool
+        if let Some(discovered_tool) = discovered_tool {
+            // Tool bodies are served from memory; the file is only re-read when it changed
+            let script = scripts.load(&discovered_tool.file_path).await?;
+            let compiled = self.script_cache.get_or_compile(path, &script.checksum, || script.source.to_string(), self.runtime.as_mut())?;
+            
+            self.bind_params(&discovered_tool.parameters, &params)?;
+            
+            // Execute the tool script
+            return self.runtime.eval_compiled(&compiled);
+        }
+        
+        Err(anyhow!("Tool '{}' not found", path))
+    }
+}
+
+impl RegistrySnapshot {
+    fn empty(scripts: Arc<ScriptStore>, list_page_size: usize) -> Self {
+        Self {
+            generation: 0,
+            custom_tools: Arc::default(),
+            discovered_tools: Arc::default(),
+            script_checksums: Arc::default(),
+            scripts,
+            catalog: Arc::default(),
+            list_page_size,
+            first_page: OnceLock::new(),
+        }
+    }
+    
+    /// Bumped on every change to the registry
+    pub fn generation(&self) -> u64 {
+        self.generation
+    }
+    
+    /// The user or discovered tool an MCP tool name refers to
+    pub fn resolve(&self, mcp_name: &str) -> Option<&ToolPath> {
+        self.catalog.resolve(mcp_name)
+    }
+    
+    /// Whether `path` is a user or discovered tool
+    pub fn contains(&self, path: &ToolPath) -> bool {
+        self.catalog.contains(path)
+    }
+    
+    /// Checksum a cached script for `path` must match: `Some("")` for discovered
+    /// tools (validated at call time), `None` if the tool no longer exists
+    fn current_checksum(&self, path: &ToolPath) -> Option<String> {
+        if let Some(checksum) = self.script_checksums.get(path) {
+            Some(checksum.clone())
+        } else if self.discovered_tools.contains_key(path) {
+            Some(String::new())
+        } else {
+            None
+        }
+    }
+    
+    pub fn list_tools(&self, namespace: Option<String>, filter: Option<String>) -> Vec<String> {
+        // System tools, in the sorted order of SYSTEM_TOOL_PATHS
+        let system = SYSTEM_TOOL_PATHS.iter()
+            .filter(|(ns_key, path_str)| {
+                namespace.as_deref().map_or(true, |ns| ns == *ns_key)
+                    && filter.as_ref().map(|f| path_str.contains(f.as_str())).unwrap_or(true)
+            })
+            .map(|(_, path_str)| *path_str);
+        
+        // Custom and discovered tools through the catalog's namespace and trigram indexes,
+        // also sorted
+        let matches = self.catalog.search(namespace.as_deref(), filter.as_deref());
+        
+        // Both runs are sorted, so this is a single merge pass
+        let mut tools = Vec::with_capacity(SYSTEM_TOOL_PATHS.len() + matches.len());
+        let mut system = system.peekable();
+        let mut matches = matches.into_iter().peekable();
+        loop {
+            let next = match (system.peek(), matches.peek()) {
+                (Some(a), Some(b)) if a <= b => system.next(),
+                (Some(_), Some(_)) => matches.next(),
+                (Some(_), None) => system.next(),
+                (None, _) => matches.next(),
+            };
+            match next {
+                Some(path) => tools.push(path.to_string()),
+                None => break,
+            }
+        }
+        tools
+    }
+    
+    pub fn get_tool_definitions(&self) -> Vec<ToolDefinition> {
+        let mut tools = Vec::new();
+        
+        // Add custom tools
+        tools.extend(self.custom_tools.values().cloned());
+        
+        // Convert discovered tools to ToolDefinition format
+        for discovered in self.discovered_tools.values() {
+            let tool_def = ToolDefinition {
+                path: discovered.path.clone(),
+                description: discovered.description.clone(),
+                script: format!("# Tool loaded from: {}", discovered.file_path.display()),
+                parameters: discovered.parameters.clone(),
+            };
+            tools.push(tool_def);
+        }
         
-        Ok(tx_clone)
+        tools
     }
     
-    fn execute_script(&mut self, script: &str) -> Result<String> {
-        self.runtime.eval(script)
+    /// A `tools/list` page of user and discovered tools. The first page is built once
+    /// per snapshot; later pages cost one index range lookup.
+    pub fn tool_page(&self, cursor: Option<&str>) -> Arc<ToolPage> {
+        if cursor.is_some() {
+            return Arc::new(self.catalog.page(self.generation, cursor, self.list_page_size));
+        }
+        
+        self.first_page
+            .get_or_init(|| Arc::new(self.catalog.page(self.generation, None, self.list_page_size)))
+            .clone()
+    }
+}
+
+impl ToolRegistry {
+    fn new(config: &ExecutorConfig) -> Self {
+        let scripts = Arc::new(ScriptStore::new(config.discovered_cache_size));
+        let mut tool_discovery = ToolDiscovery::new().with_script_store(scripts.clone());
+        if let Ok(index_path) = discovery_index_path() {
+            tool_discovery = tool_discovery.with_index_path(index_path);
+        }
+        let published = PublishedRegistry::new(RegistrySnapshot::empty(scripts.clone(), config.list_page_size));
+        Self {
+            custom_tools: Arc::default(),
+            discovered_tools: Arc::default(),
+            script_checksums: Arc::default(),
+            generation: 0,
+            scripts,
+            tool_discovery,
+            persistence: None,
+            storage: config.storage.clone(),
+            catalog: Arc::default(),
+            list_page_size: config.list_page_size,
+            published,
+        }
+    }
+    
+    /// Register a user tool and remember its script checksum
+    fn insert_custom_tool(&mut self, tool: ToolDefinition) {
+        Arc::make_mut(&mut self.script_checksums).insert(tool.path.clone(), calculate_checksum(&tool.script));
+        Arc::make_mut(&mut self.catalog).insert(&tool.path, &tool.description, &tool.parameters);
+        Arc::make_mut(&mut self.custom_tools).insert(tool.path.clone(), tool);
+        self.generation += 1;
+    }
+    
+    /// The registry's current state, sharing its tool maps
+    fn snapshot(&self) -> RegistrySnapshot {
+        RegistrySnapshot {
+            generation: self.generation,
+            custom_tools: self.custom_tools.clone(),
+            discovered_tools: self.discovered_tools.clone(),
+            script_checksums: self.script_checksums.clone(),
+            scripts: self.scripts.clone(),
+            catalog: self.catalog.clone(),
+            list_page_size: self.list_page_size,
+            first_page: OnceLock::new(),
+        }
+    }
+    
+    /// Make the registry's current state visible to readers, unless it already is
+    fn publish(&self) -> Arc<RegistrySnapshot> {
+        let current = self.published.load();
+        if current.generation == self.generation {
+            return current;
+        }
+        
+        let snapshot = Arc::new(self.snapshot());
+        self.published.store(snapshot.clone());
+        snapshot
     }
     
     async fn add_tool(&mut self, path: ToolPath, description: String, script: String, parameters: Vec<ParameterDefinition>) -> Result<String> {
         // Only allow adding tools to user namespace
-        if !matches!(path.namespace, Namespace::User(_)) {
+        if !matches!(path.namespace(), Namespace::User(_)) {
             return Err(anyhow!("Can only add tools to user namespace, not {}", path));
         }
         
@@ -245,14 +1270,14 @@ impl TclExecutor {
         
         // Initialize persistence if not already initialized
         if self.persistence.is_none() {
-            match FilePersistence::new().await {
+            match FilePersistence::open(&self.storage).await {
                 Ok(persistence) => {
                     // Load existing tools from storage
                     match persistence.list_tools(None).await {
                         Ok(stored_tools) => {
                             for tool in stored_tools {
-                                if matches!(tool.path.namespace, Namespace::User(_)) {
-                                    self.custom_tools.insert(tool.path.clone(), tool);
+                                if matches!(tool.path.namespace(), Namespace::User(_)) {
+                                    self.insert_custom_tool(tool);
                                 }
                             }
                             tracing::info!("Initialized persistence and loaded {} existing tools", self.custom_tools.len());
@@ -290,7 +1315,7 @@ impl TclExecutor {
         };
         
         // Add to in-memory cache
-        self.custom_tools.insert(path.clone(), tool_def);
+        self.insert_custom_tool(tool_def);
         
         if persisted {
             Ok(format!("Tool '{}' added successfully and persisted", path))
@@ -305,8 +1330,15 @@ impl TclExecutor {
             return Err(anyhow!("Cannot remove system tool '{}'", path));
         }
         
-        // Remove from in-memory cache first
-        let removed_from_memory = self.custom_tools.remove(path).is_some();
+        // Remove from in-memory cache first; an unknown path leaves the published
+        // registry, and the tool list pages cached with it, untouched
+        let removed_from_memory = self.custom_tools.contains_key(path);
+        if removed_from_memory {
+            Arc::make_mut(&mut self.custom_tools).remove(path);
+            Arc::make_mut(&mut self.script_checksums).remove(path);
+            self.refresh_catalog_entry(path);
+            self.generation += 1;
+        }
         
         // Remove from persistent storage
         let removed_from_storage = self.remove_tool_from_storage(path).await?;
@@ -318,124 +1350,17 @@ impl TclExecutor {
         }
     }
     
-    fn list_tools(&self, namespace: Option<String>, filter: Option<String>) -> Vec<String> {
-        let mut tools = Vec::new();
-        
-        // Add system tools
-        let system_tools = vec![
-            ToolPath::bin("tcl_execute"),
-            ToolPath::sbin("tcl_tool_add"),
-            ToolPath::sbin("tcl_tool_remove"),
-            ToolPath::bin("tcl_tool_list"),
-            ToolPath::bin("exec_tool"),
-            ToolPath::bin("discover_tools"),
-            ToolPath::docs("molt_book"),
-        ];
-        
-        for tool in system_tools {
-            if let Some(ref ns) = namespace {
-                let matches = match (&tool.namespace, ns.as_str()) {
-                    (Namespace::Bin, "bin") => true,
-                    (Namespace::Sbin, "sbin") => true,
-                    (Namespace::User(user_ns), filter_ns) if user_ns == filter_ns => true,
-                    _ => false,
-                };
-                if !matches {
-                    continue;
-                }
-            }
-            
-            let path_str = tool.to_string();
-            if filter.as_ref().map(|f| path_str.contains(f)).unwrap_or(true) {
-                tools.push(path_str);
-            }
-        }
-        
-        // Add custom tools
-        for path in self.custom_tools.keys() {
-            if let Some(ref ns) = namespace {
-                let matches = match (&path.namespace, ns.as_str()) {
-                    (Namespace::User(user_ns), filter_ns) if user_ns == filter_ns => true,
-                    _ => false,
-                };
-                if !matches {
-                    continue;
-                }
-            }
-            
-            let path_str = path.to_string();
-            if filter.as_ref().map(|f| path_str.contains(f)).unwrap_or(true) {
-                tools.push(path_str);
-            }
-        }
-        
-        // Add discovered tools
-        for path in self.discovered_tools.keys() {
-            if let Some(ref ns) = namespace {
-                let matches = match (&path.namespace, ns.as_str()) {
-                    (Namespace::Bin, "bin") => true,
-                    (Namespace::Sbin, "sbin") => true,
-                    (Namespace::Docs, "docs") => true,
-                    (Namespace::User(user_ns), filter_ns) if user_ns == filter_ns => true,
-                    _ => false,
-                };
-                if !matches {
-                    continue;
-                }
-            }
-            
-            let path_str = path.to_string();
-            if filter.as_ref().map(|f| path_str.contains(f)).unwrap_or(true) {
-                tools.push(path_str);
-            }
-        }
-        
-        tools.sort();
-        tools
-    }
-    
-    fn execute_custom_tool(&mut self, path: &ToolPath, params: serde_json::Value) -> Result<String> {
-        let tool = self.custom_tools.get(path)
-            .ok_or_else(|| anyhow!("Tool '{}' not found", path))?
-            .clone();
-        
-        // Set parameters as TCL variables
-        if let Some(params_obj) = params.as_object() {
-            for param_def in &tool.parameters {
-                if let Some(value) = params_obj.get(&param_def.name) {
-                    let tcl_value = match value {
-                        serde_json::Value::String(s) => s.to_string(),
-                        _ => value.to_string(),
-                    };
-                    self.runtime.set_var(&param_def.name, &tcl_value)?;
-                } else if param_def.required {
-                    return Err(anyhow!("Missing required parameter: {}", param_def.name));
-                }
-            }
-        }
-        
-        // Execute the tool script
-        self.execute_script(&tool.script)
-    }
-    
-    fn get_tool_definitions(&self) -> Vec<ToolDefinition> {
-        let mut tools = Vec::new();
-        
-        // Add custom tools
-        tools.extend(self.custom_tools.values().cloned());
-        
-        // Convert discovered tools to ToolDefinition format
-        for discovered in self.discovered_tools.values() {
-            let tool_def = ToolDefinition {
-                path: discovered.path.clone(),
-                description: discovered.description.clone(),
-                script: format!("# Tool loaded from: {}", discovered.file_path.display()),
-                parameters: discovered.parameters.clone(),
-            };
-            tools.push(tool_def);
+    /// Point the catalog entry for `path` at whichever tool now owns it: the custom
+    /// tool if there is one, otherwise the discovered tool
+    fn refresh_catalog_entry(&mut self, path: &ToolPath) {
+        let catalog = Arc::make_mut(&mut self.catalog);
+        if let Some(tool) = self.custom_tools.get(path) {
+            catalog.insert(path, &tool.description, &tool.parameters);
+        } else if let Some(tool) = self.discovered_tools.get(path) {
+            catalog.insert(path, &tool.description, &tool.parameters);
+        } else {
+            catalog.remove(path);
         }
-        
-        tools
     }
     
     /// Initialize persistence and load existing tools
@@ -444,23 +1369,53 @@ impl TclExecutor {
             return Ok("Persistence already initialized".to_string());
         }
         
-        let persistence = FilePersistence::new().await?;
+        let started = Instant::now();
+        let persistence = FilePersistence::open(&self.storage).await?;
         
         // Load existing tools from storage
         let stored_tools = persistence.list_tools(None).await?;
         let loaded_count = stored_tools.len();
+        let load_time = started.elapsed();
         
         // Add stored tools to in-memory cache
         for tool in stored_tools {
             // Only load user tools, system tools are hardcoded
-            if matches!(tool.path.namespace, Namespace::User(_)) {
-                self.custom_tools.insert(tool.path.clone(), tool);
+            if matches!(tool.path.namespace(), Namespace::User(_)) {
+                self.insert_custom_tool(tool);
             }
         }
         
         self.persistence = Some(persistence);
         
-        Ok(format!("Persistence initialized. Loaded {} tools from storage.", loaded_count))
+        // Reuse the previous run's discovery results instead of walking the tools directory
+        let indexed_count = match self.restore_discovered_tools().await {
+            Ok(count) => count,
+            Err(e) => {
+                tracing::warn!("Failed to load discovery index: {}", e);
+                0
+            }
+        };
+        
+        if indexed_count > 0 {
+            Ok(format!(
+                "Persistence initialized. Loaded {} tools from storage in {:.1?} and {} discovered tools from the index.",
+                loaded_count, load_time, indexed_count
+            ))
+        } else {
+            Ok(format!("Persistence initialized. Loaded {} tools from storage in {:.1?}.", loaded_count, load_time))
+        }
+    }
+    
+    /// Load discovered tools from the discovery index, unless discovery already ran
+    async fn restore_discovered_tools(&mut self) -> Result<usize> {
+        if self.tool_discovery.has_scanned() {
+            return Ok(0);
+        }
+        
+        let delta = self.tool_discovery.load_index().await?;
+        let count = delta.updated.len();
+        self.apply_discovery_delta(delta);
+        Ok(count)
     }
     
     
@@ -472,79 +1427,496 @@ impl TclExecutor {
         Ok(false)
     }
     
-    /// Execute a tool from the filesystem or custom tools
-    async fn exec_tool(&mut self, tool_path: &str, params: serde_json::Value) -> Result<String> {
-        // Parse the tool path
-        let path = ToolPath::parse(tool_path)?;
+    /// Discover and index tools from the filesystem
+    async fn discover_tools(&mut self) -> Result<String> {
+        if let Err(e) = self.restore_discovered_tools().await {
+            tracing::warn!("Failed to load discovery index: {}", e);
+        }
         
-        // Check custom tools first (added via tcl_tool_add)
-        if self.custom_tools.contains_key(&path) {
-            return self.execute_custom_tool(&path, params);
+        // After the first scan only files whose fingerprint changed are re-read
+        if self.tool_discovery.has_scanned() {
+            let delta = self.tool_discovery.refresh().await?;
+            let (updated, removed) = (delta.updated.len(), delta.removed.len());
+            self.apply_discovery_delta(delta);
+            return Ok(format!(
+                "Discovered {} tools from filesystem ({} added or changed, {} removed)",
+                self.discovered_tools.len(), updated, removed
+            ));
         }
         
-        // Check if it's a discovered tool
-        if let Some(discovered_tool) = self.discovered_tools.get(&path) {
-            // Read and execute the tool file
-            let script_content = tokio::fs::read_to_string(&discovered_tool.file_path).await?;
+        // Discover tools from the filesystem
+        let discovered = self.tool_discovery.discover_tools().await?;
+        let count = discovered.len();
+        
+        // Add discovered tools to our cache
+        for tool in discovered {
+            let path = tool.path.clone();
+            Arc::make_mut(&mut self.discovered_tools).insert(path.clone(), tool);
+            self.refresh_catalog_entry(&path);
+        }
+        self.generation += 1;
+        
+        // Register discovered tools as available for execution
+        // Note: We don't add them as TCL commands directly since that would require
+        // complex callback handling. Instead, they can be executed via exec_tool.
+        
+        Ok(format!("Discovered {} tools from filesystem", count))
+    }
+    
+    /// Apply an incremental discovery result to the registry
+    fn apply_discovery_delta(&mut self, delta: DiscoveryDelta) {
+        if delta.is_empty() {
+            return;
+        }
+        
+        for path in &delta.removed {
+            Arc::make_mut(&mut self.discovered_tools).remove(path);
+            self.refresh_catalog_entry(path);
+        }
+        for tool in delta.updated {
+            let path = tool.path.clone();
+            Arc::make_mut(&mut self.discovered_tools).insert(path.clone(), tool);
+            self.refresh_catalog_entry(&path);
+        }
+        self.generation += 1;
+    }
+}
+
+/// Apply registry changes on a thread of their own, so that storage and filesystem
+/// work never holds up an interpreter.
+///
+/// Each change is published before its caller hears back, so a client that changed
+/// the registry reads its own writes. Runs until every `CommandQueue` is dropped.
+fn spawn_registry_service(registry: Arc<RwLock<ToolRegistry>>, mut commands: mpsc::Receiver<RegistryCommand>) -> Result<(), String> {
+    thread::Builder::new()
+        .name("tcl-registry".to_string())
+        .spawn(move || {
+            let runtime = tokio::runtime::Builder::new_current_thread()
+                .enable_all()
+                .build()
+                .expect("Failed to create Tokio runtime");
             
-            // Set parameters as TCL variables
-            if let Some(params_obj) = params.as_object() {
-                for param_def in &discovered_tool.parameters {
-                    if let Some(value) = params_obj.get(&param_def.name) {
-                        let tcl_value = match value {
-                            serde_json::Value::String(s) => s.to_string(),
-                            _ => value.to_string(),
-                        };
-                        self.runtime.set_var(&param_def.name, &tcl_value)?;
-                    } else if param_def.required {
-                        return Err(anyhow!("Missing required parameter: {}", param_def.name));
+            runtime.block_on(async move {
+                while let Some(command) = commands.recv().await {
+                    let mut registry = registry.write().await;
+                    match command {
+                        RegistryCommand::AddTool { path, description, script, parameters, response } => {
+                            let result = registry.add_tool(path, description, script, parameters).await;
+                            registry.publish();
+                            let _ = response.send(result);
+                        }
+                        RegistryCommand::RemoveTool { path, response } => {
+                            let result = registry.remove_tool(&path).await;
+                            registry.publish();
+                            let _ = response.send(result);
+                        }
+                        RegistryCommand::InitializePersistence { response } => {
+                            let result = registry.initialize_persistence().await;
+                            registry.publish();
+                            let _ = response.send(result);
+                        }
+                        RegistryCommand::DiscoverTools { response } => {
+                            let result = registry.discover_tools().await;
+                            registry.publish();
+                            let _ = response.send(result);
+                        }
                     }
                 }
-            }
+            });
+        })
+        .map(|_| ())
+        .map_err(|e| format!("Failed to spawn registry service thread: {}", e))
+}
+
+/// Keep the registry's discovered tools in sync with the tools directory.
+///
+/// Runs on its own thread so filesystem events never wait behind TCL work; each
+/// batch of events only re-reads the files it names.
+fn spawn_tool_watcher(registry: Weak<RwLock<ToolRegistry>>) -> Result<(), String> {
+    thread::Builder::new()
+        .name("tcl-tool-watcher".to_string())
+        .spawn(move || {
+            let runtime = tokio::runtime::Builder::new_current_thread()
+                .enable_all()
+                .build()
+                .expect("Failed to create Tokio runtime");
             
-            // Execute the tool script
-            return self.execute_script(&script_content);
+            runtime.block_on(async move {
+                let tools_dir = {
+                    let registry = match registry.upgrade() {
+                        Some(registry) => registry,
+                        None => return,
+                    };
+                    let mut registry = registry.write().await;
+                    match registry.discover_tools().await {
+                        Ok(message) => tracing::info!("{}", message),
+                        Err(e) => tracing::warn!("Initial tool discovery failed: {}", e),
+                    }
+                    registry.publish();
+                    registry.tool_discovery.tools_dir().to_path_buf()
+                };
+                
+                let mut watcher = ToolWatcher::new(&tools_dir, WATCH_POLL_INTERVAL);
+                while let Some(batch) = watcher.next_batch().await {
+                    // Stop once the pool has shut down
+                    let registry = match registry.upgrade() {
+                        Some(registry) => registry,
+                        None => break,
+                    };
+                    let mut registry = registry.write().await;
+                    
+                    let result = match batch {
+                        WatchBatch::Paths(paths) => registry.tool_discovery.apply_changes(&paths).await,
+                        WatchBatch::Rescan => registry.tool_discovery.refresh().await,
+                    };
+                    match result {
+                        Ok(delta) if !delta.is_empty() => {
+                            tracing::info!(
+                                "Tool changes applied: {} added or changed, {} removed",
+                                delta.updated.len(), delta.removed.len()
+                            );
+                            registry.apply_discovery_delta(delta);
+                            registry.publish();
+                        }
+                        Ok(_) => {}
+                        Err(e) => tracing::warn!("Failed to apply tool changes: {}", e),
+                    }
+                }
+            });
+        })
+        .map(|_| ())
+        .map_err(|e| format!("Failed to spawn tool watcher thread: {}", e))
+}
+#[cfg(test)]
+mod tests {
+    use super::*;
+    
+    fn env_from(vars: &[(&str, &str)]) -> impl Fn(&str) -> Option<String> {
+        let vars: HashMap<String, String> = vars.iter().map(|(k, v)| (k.to_string(), v.to_string())).collect();
+        move |name| vars.get(name).cloned()
+    }
+    
+    #[test]
+    fn test_executor_config_from_args_and_env() {
+        // CLI takes precedence over environment
+        let args = ExecutorArgs { workers: Some(4), ..Default::default() };
+        let config = ExecutorConfig::from_args_and_env(&args, env_from(&[("TCL_MCP_WORKERS", "2")])).unwrap();
+        assert_eq!(config.workers, 4);
+        
+        // Environment used when no CLI
+        let config = ExecutorConfig::from_args_and_env(&ExecutorArgs::default(), env_from(&[
+            ("TCL_MCP_WORKERS", "2"),
+            ("TCL_MCP_ISOLATE_CALLS", "true"),
+            ("TCL_MCP_WATCH_TOOLS", "1"),
+        ])).unwrap();
+        assert_eq!(config.workers, 2);
+        assert!(config.isolate_calls);
+        assert!(config.watch_tools);
+        
+        // Default used when neither specified
+        let config = ExecutorConfig::from_args_and_env(&ExecutorArgs::default(), env_from(&[])).unwrap();
+        assert_eq!(config.workers, 1);
+        assert!(!config.isolate_calls);
+        assert!(!config.watch_tools);
+        
+        assert!(ExecutorConfig::from_args_and_env(&ExecutorArgs::default(), env_from(&[("TCL_MCP_WORKERS", "many")])).is_err());
+        
+        let config = ExecutorConfig::from_args_and_env(&ExecutorArgs::default(), env_from(&[("TCL_MCP_QUEUE_DEPTH", "8")])).unwrap();
+        assert_eq!(config.queue_depth, 8);
+        assert!(ExecutorConfig::from_args_and_env(&ExecutorArgs::default(), env_from(&[("TCL_MCP_QUEUE_DEPTH", "0")])).is_err());
+        
+        let env = env_from(&[("TCL_MCP_TENANT_MAX_IN_FLIGHT", "2"), ("TCL_MCP_TENANT_LIMITS", "alice=4")]);
+        let args = ExecutorArgs { tenant_limits: Some("bob=1".to_string()), tenant_queue_depth: Some(10), ..Default::default() };
+        let config = ExecutorConfig::from_args_and_env(&args, env).unwrap();
+        assert_eq!(config.tenant_queue_depth, 10);
+        assert_eq!(config.tenant_limits.max_in_flight, Some(2));
+        assert_eq!(config.tenant_limits.overrides.get("alice"), None);
+        assert_eq!(config.tenant_limits.overrides.get("bob"), Some(&1));
+        assert!(ExecutorConfig::from_args_and_env(&ExecutorArgs::default(), env_from(&[("TCL_MCP_TENANT_LIMITS", "alice")])).is_err());
+    }
+    
+    #[test]
+    fn test_tool_pages_track_registry_changes() {
+        let config = ExecutorConfig { list_page_size: 2, ..Default::default() };
+        let mut registry = ToolRegistry::new(&config);
+        for name in ["a", "b", "c"] {
+            registry.insert_custom_tool(ToolDefinition {
+                path: ToolPath::user("alice", "utils", name, "1.0"),
+                description: format!("Custom {}", name),
+                script: "return 1".to_string(),
+                parameters: vec![],
+            });
         }
         
-        // Check if it's a custom tool
-        if let Some(_custom_tool) = self.custom_tools.get(&path) {
-            return self.execute_custom_tool(&path, params);
+        // A discovered tool with the same path as a custom tool is listed once
+        let shadowed = DiscoveredTool {
+            path: ToolPath::user("alice", "utils", "a", "1.0"),
+            description: "Discovered a".to_string(),
+            file_path: "a.tcl".into(),
+            parameters: vec![],
+        };
+        registry.apply_discovery_delta(DiscoveryDelta { updated: vec![shadowed], removed: vec![] });
+        
+        let snapshot = registry.publish();
+        let first = snapshot.tool_page(None);
+        assert_eq!(first.tools.len(), 2);
+        assert!(first.tools[0]["description"].as_str().unwrap().starts_with("Custom a"));
+        assert!(Arc::ptr_eq(&first, &snapshot.tool_page(None)));
+        
+        let second = snapshot.tool_page(first.next_cursor.as_deref());
+        assert_eq!(second.tools.len(), 1);
+        assert!(second.next_cursor.is_none());
+        
+        // Removing the custom tool uncovers the discovered one
+        Arc::make_mut(&mut registry.custom_tools).remove(&ToolPath::user("alice", "utils", "a", "1.0"));
+        registry.refresh_catalog_entry(&ToolPath::user("alice", "utils", "a", "1.0"));
+        registry.generation += 1;
+        let first = registry.publish().tool_page(None);
+        assert!(first.tools[0]["description"].as_str().unwrap().starts_with("Discovered a"));
+        
+        // Snapshots already handed out are left as they were
+        assert!(snapshot.tool_page(None).tools[0]["description"].as_str().unwrap().starts_with("Custom a"));
+        assert!(snapshot.generation() < registry.published.load().generation());
+    }
+    
+    #[test]
+    fn test_list_tools_merges_system_and_catalog_tools() {
+        let mut registry = ToolRegistry::new(&ExecutorConfig::default());
+        for (user, name) in [("zed", "last"), ("alice", "first"), ("carol", "middle")] {
+            registry.insert_custom_tool(ToolDefinition {
+                path: ToolPath::user(user, "utils", name, "1.0"),
+                description: format!("Custom {}", name),
+                script: "return 1".to_string(),
+                parameters: vec![],
+            });
         }
+        let snapshot = registry.publish();
         
-        // Check if it's a built-in system tool
-        match tool_path {
-            "/bin/tcl_execute" => {
-                if let Some(script) = params.get("script").and_then(|s| s.as_str()) {
-                    self.execute_script(script)
-                } else {
-                    Err(anyhow!("Missing required parameter: script"))
-                }
-            }
-            "/bin/tcl_tool_list" => {
-                let namespace = params.get("namespace").and_then(|s| s.as_str()).map(String::from);
-                let filter = params.get("filter").and_then(|s| s.as_str()).map(String::from);
-                let tools = self.list_tools(namespace, filter);
-                Ok(tools.join("\n"))
-            }
-            _ => Err(anyhow!("Tool '{}' not found", tool_path))
+        let tools = snapshot.list_tools(None, None);
+        let mut sorted = tools.clone();
+        sorted.sort();
+        assert_eq!(tools, sorted);
+        assert_eq!(tools.len(), SYSTEM_TOOL_PATHS.len() + 3);
+        
+        let filtered = snapshot.list_tools(None, Some("i".to_string()));
+        assert!(filtered.windows(2).all(|pair| pair[0] < pair[1]));
+        assert!(filtered.contains(&"/bin/tcl_execute".to_string()));
+        assert!(filtered.iter().any(|path| path.contains("first")));
+    }
+    
+    #[tokio::test]
+    async fn test_removing_unknown_tool_keeps_published_registry() {
+        let mut registry = ToolRegistry::new(&ExecutorConfig::default());
+        let path = ToolPath::user("alice", "utils", "a", "1.0");
+        registry.insert_custom_tool(ToolDefinition {
+            path: path.clone(),
+            description: "Custom a".to_string(),
+            script: "return 1".to_string(),
+            parameters: vec![],
+        });
+        let snapshot = registry.publish();
+        let page = snapshot.tool_page(None);
+        
+        assert!(registry.remove_tool(&ToolPath::user("alice", "utils", "missing", "1.0")).await.is_err());
+        assert!(Arc::ptr_eq(&snapshot, &registry.publish()));
+        assert!(Arc::ptr_eq(&page, &registry.publish().tool_page(None)));
+        
+        registry.remove_tool(&path).await.unwrap();
+        let published = registry.publish();
+        assert!(snapshot.generation() < published.generation());
+        assert!(published.tool_page(None).tools.is_empty());
+    }
+    
+    #[test]
+    fn test_worker_count_auto() {
+        let config = ExecutorConfig { workers: 0, ..Default::default() };
+        assert!(config.worker_count() >= 1);
+        
+        let config = ExecutorConfig { workers: 3, ..Default::default() };
+        assert_eq!(config.worker_count(), 3);
+    }
+    
+    #[tokio::test]
+    async fn test_pool_executes_scripts() {
+        let executor = TclExecutor::spawn_pool(true, RuntimeConfig::default(), ExecutorConfig { workers: 2, ..Default::default() }).unwrap();
+        
+        for _ in 0..4 {
+            let (tx, rx) = oneshot::channel();
+            executor.send(TclCommand::Execute { script: "expr {6 * 7}".to_string(), call: CallOptions::default(), response: tx }).await.unwrap();
+            assert_eq!(rx.await.unwrap().unwrap(), "42");
         }
     }
     
-    /// Discover and index tools from the filesystem
-    async fn discover_tools(&mut self) -> Result<String> {
-        // Discover tools from the filesystem
-        let discovered = self.tool_discovery.discover_tools().await?;
-        let count = discovered.len();
+    #[tokio::test]
+    async fn test_isolated_calls_do_not_leak_state() {
+        let config = ExecutorConfig { isolate_calls: true, ..Default::default() };
+        let executor = TclExecutor::spawn_pool(true, RuntimeConfig::default(), config).unwrap();
         
-        // Add discovered tools to our cache
-        for tool in discovered {
-            self.discovered_tools.insert(tool.path.clone(), tool);
+        let (tx, rx) = oneshot::channel();
+        executor.send(TclCommand::Execute { script: "set leaked 1; proc helper {} { return 1 }".to_string(), call: CallOptions::default(), response: tx }).await.unwrap();
+        rx.await.unwrap().unwrap();
+        
+        let (tx, rx) = oneshot::channel();
+        executor.send(TclCommand::Execute { script: "info exists leaked".to_string(), call: CallOptions::default(), response: tx }).await.unwrap();
+        assert_eq!(rx.await.unwrap().unwrap(), "0");
+        
+        let (tx, rx) = oneshot::channel();
+        executor.send(TclCommand::Execute { script: "helper".to_string(), call: CallOptions::default(), response: tx }).await.unwrap();
+        assert!(rx.await.unwrap().is_err());
+    }
+    
+    #[tokio::test]
+    async fn test_script_output_is_streamed() {
+        let executor = TclExecutor::spawn_pool(true, RuntimeConfig::default(), ExecutorConfig::default()).unwrap();
+        let (output, chunks) = crate::streaming::script_output_channel();
+        
+        let (tx, rx) = oneshot::channel();
+        let script = "puts first; puts second; expr {1 + 1}".to_string();
+        let call = CallOptions { output: Some(output), ..Default::default() };
+        executor.send(TclCommand::Execute { script, call, response: tx }).await.unwrap();
+        assert_eq!(rx.await.unwrap().unwrap(), "2");
+        
+        // The stream ends with the call, so this does not block
+        let written: Vec<String> = chunks.iter().collect();
+        assert_eq!(written, vec!["first\n".to_string(), "second\n".to_string()]);
+    }
+    
+    #[tokio::test]
+    async fn test_runaway_scripts_are_stopped_and_recycled() {
+        let config = ExecutorConfig { max_steps: Some(1000), ..Default::default() };
+        let executor = TclExecutor::spawn_pool(true, RuntimeConfig::default(), config).unwrap();
+        
+        let (tx, rx) = oneshot::channel();
+        let script = "set kept 1; while 1 {}".to_string();
+        executor.send(TclCommand::Execute { script, call: CallOptions::default(), response: tx }).await.unwrap();
+        assert!(rx.await.unwrap().unwrap_err().to_string().contains("step budget"));
+        
+        // The interrupted interpreter was replaced
+        let (tx, rx) = oneshot::channel();
+        executor.send(TclCommand::Execute { script: "info exists kept".to_string(), call: CallOptions::default(), response: tx }).await.unwrap();
+        assert_eq!(rx.await.unwrap().unwrap(), "0");
+        
+        let cancellations = Cancellations::default();
+        let tracked = cancellations.track(&serde_json::json!(7));
+        assert!(cancellations.cancel(&serde_json::json!(7)));
+        
+        let (tx, rx) = oneshot::channel();
+        let call = CallOptions { cancel: Some(tracked.cancel_flag()), ..Default::default() };
+        executor.send(TclCommand::Execute { script: "while 1 {}".to_string(), call, response: tx }).await.unwrap();
+        assert!(rx.await.unwrap().unwrap_err().to_string().contains("cancelled"));
+        
+        drop(tracked);
+        assert!(!cancellations.cancel(&serde_json::json!(7)));
+    }
+    
+    #[tokio::test]
+    async fn test_full_queue_turns_commands_away() {
+        let config = ExecutorConfig { queue_depth: 1, ..Default::default() };
+        let executor = TclExecutor::spawn_pool(true, RuntimeConfig::default(), config).unwrap();
+        let cancellations = Cancellations::default();
+        let tracked = cancellations.track(&serde_json::json!(1));
+        
+        // Keep the only worker busy until cancelled
+        let (busy_tx, busy_rx) = oneshot::channel();
+        let call = CallOptions { cancel: Some(tracked.cancel_flag()), ..Default::default() };
+        executor.try_send(TclCommand::Execute { script: "while 1 {}".to_string(), call, response: busy_tx }).unwrap();
+        while executor.stats().queue.dequeued == 0 {
+            tokio::time::sleep(Duration::from_millis(5)).await;
         }
         
-        // Register discovered tools as available for execution
-        // Note: We don't add them as TCL commands directly since that would require
-        // complex callback handling. Instead, they can be executed via exec_tool.
+        let (queued_tx, queued_rx) = oneshot::channel();
+        executor.try_send(TclCommand::Execute { script: "expr {1 + 1}".to_string(), call: CallOptions::default(), response: queued_tx }).unwrap();
         
-        Ok(format!("Discovered {} tools from filesystem", count))
+        let (tx, _rx) = oneshot::channel();
+        let error = executor.try_send(TclCommand::Execute { script: "expr {1 + 1}".to_string(), call: CallOptions::default(), response: tx }).unwrap_err();
+        let busy = error.downcast_ref::<ServerBusy>().unwrap();
+        assert_eq!(busy.queued, 1);
+        assert!(busy.retry_after >= Duration::from_secs(1));
+        
+        let stats = executor.stats().queue;
+        assert_eq!(stats.capacity, 1);
+        assert_eq!(stats.queued, 1);
+        assert_eq!(stats.rejected, 1);
+        
+        // Registry reads do not queue
+        assert!(executor.registry().list_tools(None, None).contains(&"/bin/tcl_execute".to_string()));
+        
+        // Once the worker is free the queued command still runs
+        assert!(cancellations.cancel(&serde_json::json!(1)));
+        assert!(busy_rx.await.unwrap().is_err());
+        assert_eq!(queued_rx.await.unwrap().unwrap(), "2");
+        assert_eq!(executor.stats().queue.queued, 0);
+    }
+    
+    #[tokio::test]
+    async fn test_registry_changes_do_not_wait_for_workers() {
+        let executor = TclExecutor::spawn_pool(true, RuntimeConfig::default(), ExecutorConfig::default()).unwrap();
+        let cancellations = Cancellations::default();
+        let tracked = cancellations.track(&serde_json::json!(1));
+        
+        // Keep the only worker busy until cancelled
+        let (busy_tx, busy_rx) = oneshot::channel();
+        let call = CallOptions { cancel: Some(tracked.cancel_flag()), ..Default::default() };
+        executor.try_send(TclCommand::Execute { script: "while 1 {}".to_string(), call, response: busy_tx }).unwrap();
+        
+        // The registry service answers while the script is still running
+        let (tx, rx) = oneshot::channel();
+        let path = ToolPath::user("alice", "utils", "missing", "1.0");
+        executor.update_registry(RegistryCommand::RemoveTool { path, response: tx }).unwrap();
+        let result = tokio::time::timeout(Duration::from_secs(5), rx).await.unwrap().unwrap();
+        assert!(result.unwrap_err().to_string().contains("not found"));
+        
+        assert!(cancellations.cancel(&serde_json::json!(1)));
+        assert!(busy_rx.await.unwrap().is_err());
+    }
+    
+    #[tokio::test]
+    async fn test_flooding_tenant_does_not_turn_others_away() {
+        let config = ExecutorConfig { queue_depth: 3, tenant_queue_depth: 1, ..Default::default() };
+        let executor = TclExecutor::spawn_pool(true, RuntimeConfig::default(), config).unwrap();
+        
+        // Keep the only worker busy until cancelled
+        let cancellations = Cancellations::default();
+        let tracked = cancellations.track(&serde_json::json!(1));
+        let (busy_tx, busy_rx) = oneshot::channel();
+        let call = CallOptions { cancel: Some(tracked.cancel_flag()), ..Default::default() };
+        executor.try_send(TclCommand::Execute { script: "while 1 {}".to_string(), call, response: busy_tx }).unwrap();
+        while executor.stats().queue.dequeued == 0 {
+            tokio::time::sleep(Duration::from_millis(5)).await;
+        }
+        
+        // Queued by the namespace of the path; the tools need not exist
+        let call_tool = |user: &str| {
+            let (tx, rx) = oneshot::channel();
+            let tool_path = format!("/{}/utils/answer:1.0", user);
+            let result = executor.try_send(TclCommand::ExecTool { tool_path, params: serde_json::json!({}), call: CallOptions::default(), response: tx });
+            (result, rx)
+        };
+        
+        // Alice's queue is full, Bob's is not
+        let (queued, alice_rx) = call_tool("alice");
+        queued.unwrap();
+        let (rejected, _) = call_tool("alice");
+        assert_eq!(rejected.unwrap_err().downcast_ref::<ServerBusy>().unwrap().queued, 1);
+        let (queued, bob_rx) = call_tool("bob");
+        queued.unwrap();
+        let (queued, carol_rx) = call_tool("carol");
+        queued.unwrap();
+        
+        // The queue as a whole is still bounded
+        let (rejected, _) = call_tool("dave");
+        assert_eq!(rejected.unwrap_err().downcast_ref::<ServerBusy>().unwrap().queued, 3);
+        
+        let stats = executor.stats();
+        assert_eq!(stats.queue.capacity, 3);
+        assert_eq!(stats.queue.queued, 3);
+        let waiting: Vec<(&str, usize)> = stats.tenants.iter().map(|tenant| (tenant.tenant.as_str(), tenant.queued)).collect();
+        assert_eq!(waiting, vec![("/alice", 1), ("/bob", 1), ("/carol", 1), ("system", 0)]);
+        
+        assert!(cancellations.cancel(&serde_json::json!(1)));
+        assert!(busy_rx.await.unwrap().is_err());
+        for rx in [alice_rx, bob_rx, carol_rx] {
+            assert!(rx.await.unwrap().unwrap_err().to_string().contains("not found"));
+        }
     }
-}
\ No newline at end of file
+}
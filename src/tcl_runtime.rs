@@ -1,5 +1,11 @@
 use anyhow::{Result, anyhow};
+use std::any::Any;
+use std::collections::{HashMap, HashSet};
 use std::env;
+use std::fmt;
+use std::sync::atomic::{AtomicBool, Ordering};
+use std::sync::Arc;
+use std::time::Instant;
 
 #[derive(Debug, Clone, PartialEq)]
 pub enum RuntimeType {
@@ -51,6 +57,71 @@ impl Default for RuntimeConfig {
     }
 }
 
+/// A script prepared by a runtime for repeated evaluation.
+///
+/// The contents are runtime specific (e.g. a Molt value carrying its parsed
+/// form); runtimes without a compiled representation keep the source text.
+pub struct CompiledScript {
+    inner: Box<dyn Any>,
+}
+
+impl CompiledScript {
+    pub fn new<T: Any>(inner: T) -> Self {
+        Self { inner: Box::new(inner) }
+    }
+    
+    pub fn downcast_ref<T: Any>(&self) -> Option<&T> {
+        self.inner.downcast_ref::<T>()
+    }
+}
+
+/// Receives script output (`puts`) while a script runs
+pub type OutputSink = Box<dyn FnMut(String)>;
+
+/// Bounds on the evaluations that follow, checked by the runtime as scripts run
+#[derive(Debug, Clone, Default)]
+pub struct ExecutionLimits {
+    /// Stop once this instant has passed
+    pub deadline: Option<Instant>,
+    /// Stop after this many loop iterations and proc calls
+    pub max_steps: Option<u64>,
+    /// Stop once this flag is set
+    pub cancel: Option<Arc<AtomicBool>>,
+}
+
+/// Why a script was stopped before it finished
+#[derive(Debug, Clone, Copy, PartialEq, Eq)]
+pub enum Interrupt {
+    Deadline,
+    StepBudget,
+    Cancelled,
+}
+
+impl fmt::Display for Interrupt {
+    fn fmt(&self, f: &mut fmt::Formatter<'_>) -> fmt::Result {
+        match self {
+            Interrupt::Deadline => write!(f, "Script timed out"),
+            Interrupt::StepBudget => write!(f, "Script exceeded its step budget"),
+            Interrupt::Cancelled => write!(f, "Script was cancelled"),
+        }
+    }
+}
+
+impl ExecutionLimits {
+    /// The first limit reached after `steps` loop iterations and proc calls, if any
+    pub fn check(&self, steps: u64) -> Option<Interrupt> {
+        if self.cancel.as_ref().map_or(false, |cancel| cancel.load(Ordering::Relaxed)) {
+            Some(Interrupt::Cancelled)
+        } else if self.max_steps.map_or(false, |max_steps| steps > max_steps) {
+            Some(Interrupt::StepBudget)
+        } else if self.deadline.map_or(false, |deadline| Instant::now() >= deadline) {
+            Some(Interrupt::Deadline)
+        } else {
+            None
+        }
+    }
+}
+
 /// Trait defining the interface for TCL runtime implementations
 pub trait TclRuntime {
     /// Create a new instance of the TCL runtime
@@ -59,15 +130,64 @@ pub trait TclRuntime {
     /// Evaluate a TCL script and return the result
     fn eval(&mut self, script: &str) -> Result<String>;
     
+    /// Prepare a script for repeated evaluation without re-parsing
+    fn compile(&mut self, script: &str) -> Result<CompiledScript> {
+        Ok(CompiledScript::new(script.to_string()))
+    }
+    
+    /// Send script output to `sink` as it is produced, or back to stdout with `None`.
+    ///
+    /// Runtimes that cannot redirect their output ignore the sink.
+    fn set_output(&mut self, sink: Option<OutputSink>) {
+        let _ = sink;
+    }
+    
+    /// Apply `limits` to the evaluations that follow, clearing any earlier interrupt.
+    ///
+    /// Runtimes that cannot stop a running script ignore the limits.
+    fn set_limits(&mut self, limits: ExecutionLimits) {
+        let _ = limits;
+    }
+    
+    /// The limit that stopped a script since `set_limits`, if any. Scripts cannot
+    /// catch the interruption, so once set every evaluation fails until new limits
+    /// are applied.
+    fn interrupted(&self) -> Option<Interrupt> {
+        None
+    }
+    
+    /// Evaluate a script prepared by `compile`
+    fn eval_compiled(&mut self, script: &CompiledScript) -> Result<String> {
+        match script.downcast_ref::<String>() {
+            Some(source) => self.eval(source),
+            None => Err(anyhow!("Script was compiled by a different runtime")),
+        }
+    }
+    
     /// Set a variable in the TCL runtime
     fn set_var(&mut self, name: &str, value: &str) -> Result<()>;
     
     /// Get a variable from the TCL runtime
     fn get_var(&self, name: &str) -> Result<String>;
     
+    /// Remove a global variable from the TCL runtime
+    fn unset_var(&mut self, name: &str) -> Result<()>;
+    
     /// Check if the runtime supports a specific command
     fn has_command(&self, command: &str) -> bool;
     
+    /// Remove a command or procedure from the TCL runtime
+    fn remove_command(&mut self, name: &str) -> Result<()>;
+    
+    /// Get the names of all global variables
+    fn global_var_names(&self) -> Vec<String>;
+    
+    /// Get the names of all commands, including procedures
+    fn command_names(&self) -> Vec<String>;
+    
+    /// Get the names of all script-defined procedures
+    fn proc_names(&self) -> Vec<String>;
+    
     /// Get runtime name for logging/debugging
     fn name(&self) -> &'static str;
     
@@ -81,6 +201,130 @@ pub trait TclRuntime {
     fn is_safe(&self) -> bool;
 }
 
+/// Baseline interpreter state that can be cheaply restored after each call.
+///
+/// Only the differences from the baseline are undone: globals and commands created
+/// by a call are removed and modified baseline scalars and arrays are reset to their
+/// original values, so the warm interpreter is reused instead of being recreated.
+#[derive(Debug, Clone, Default)]
+pub struct RuntimeSnapshot {
+    /// Baseline globals with their scalar value (None for arrays)
+    globals: HashMap<String, Option<String>>,
+    /// Contents of the baseline arrays, as returned by `array get`
+    arrays: HashMap<String, String>,
+    commands: HashSet<String>,
+    /// Baseline procedures with their arguments and body
+    procs: HashMap<String, (String, String)>,
+}
+
+/// Scalar the baseline contents of an array are passed through when it is restored
+const RESTORE_VAR: &str = "__tcl_mcp_restore";
+
+impl RuntimeSnapshot {
+    /// Capture the current state of a runtime as the baseline
+    pub fn capture(runtime: &mut dyn TclRuntime) -> Self {
+        let globals: HashMap<String, Option<String>> = runtime.global_var_names()
+            .into_iter()
+            .map(|name| {
+                let value = runtime.get_var(&name).ok();
+                (name, value)
+            })
+            .collect();
+        
+        let arrays = globals.iter()
+            .filter(|(_, value)| value.is_none())
+            .filter_map(|(name, _)| Some((name.clone(), array_contents(runtime, name)?)))
+            .collect();
+        let procs = runtime.proc_names()
+            .into_iter()
+            .filter_map(|name| {
+                let definition = proc_definition(runtime, &name)?;
+                Some((name, definition))
+            })
+            .collect();
+        
+        Self {
+            globals,
+            arrays,
+            commands: runtime.command_names().into_iter().collect(),
+            procs,
+        }
+    }
+    
+    /// Roll a runtime back to this baseline.
+    ///
+    /// Returns `Ok(false)` when the interpreter drifted in a way that cannot be
+    /// undone (a baseline command was renamed away or redefined as a procedure,
+    /// a baseline procedure was redefined, or a baseline array was removed); the
+    /// caller must then recreate it.
+    pub fn restore(&self, runtime: &mut dyn TclRuntime) -> Result<bool> {
+        // Commands: drop anything new, bail out if baseline commands were touched
+        let commands: HashSet<String> = runtime.command_names().into_iter().collect();
+        if self.commands.iter().any(|name| !commands.contains(name)) {
+            return Ok(false);
+        }
+        if runtime.proc_names().iter().any(|name| self.commands.contains(name) && !self.procs.contains_key(name)) {
+            return Ok(false);
+        }
+        for (name, definition) in &self.procs {
+            if proc_definition(runtime, name).as_ref() != Some(definition) {
+                return Ok(false);
+            }
+        }
+        for name in commands.difference(&self.commands) {
+            runtime.remove_command(name)?;
+        }
+        
+        // Globals: drop anything new, restore modified or removed baseline scalars
+        // and arrays
+        let globals: HashSet<String> = runtime.global_var_names().into_iter().collect();
+        for name in globals.iter().filter(|name| !self.globals.contains_key(*name)) {
+            runtime.unset_var(name)?;
+        }
+        for (name, baseline) in &self.globals {
+            match baseline {
+                Some(value) => {
+                    if runtime.get_var(name).ok().as_ref() != Some(value) {
+                        runtime.set_var(name, value)?;
+                    }
+                }
+                None if !globals.contains(name) => return Ok(false),
+                None => {
+                    let contents = match self.arrays.get(name) {
+                        Some(contents) => contents,
+                        None => return Ok(false),
+                    };
+                    if array_contents(runtime, name).as_ref() != Some(contents) {
+                        restore_array(runtime, name, contents)?;
+                    }
+                }
+            }
+        }
+        
+        Ok(true)
+    }
+}
+
+/// The contents of a global array as a `key value ...` list
+fn array_contents(runtime: &mut dyn TclRuntime, name: &str) -> Option<String> {
+    runtime.eval(&format!("array get {{{}}}", name)).ok()
+}
+
+/// The argument list and body of a procedure
+fn proc_definition(runtime: &mut dyn TclRuntime, name: &str) -> Option<(String, String)> {
+    let args = runtime.eval(&format!("info args {{{}}}", name)).ok()?;
+    let body = runtime.eval(&format!("info body {{{}}}", name)).ok()?;
+    Some((args, body))
+}
+
+/// Replace the contents of a global array with `contents`
+fn restore_array(runtime: &mut dyn TclRuntime, name: &str, contents: &str) -> Result<()> {
+    runtime.set_var(RESTORE_VAR, contents)?;
+    let restored = runtime.eval(&format!("array unset {{{0}}}; array set {{{0}}} ${1}", name, RESTORE_VAR));
+    runtime.unset_var(RESTORE_VAR)?;
+    restored.map(|_| ())
+}
+
 #[cfg(feature = "molt")]
 mod molt_runtime;
 #[cfg(feature = "molt")]
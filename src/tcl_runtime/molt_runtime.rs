@@ -1,25 +1,285 @@
 use anyhow::{Result, anyhow};
-use molt::Interp;
-use super::TclRuntime;
+use std::cell::RefCell;
+use std::rc::Rc;
+use molt::types::{ContextID, Exception, MoltResult, ResultCode, Value};
+use molt::{check_args, molt_err, molt_ok, Interp};
+use super::{CompiledScript, ExecutionLimits, Interrupt, OutputSink, TclRuntime};
 
 /// Molt TCL interpreter implementation
 pub struct MoltRuntime {
     interp: Interp,
+    /// Context holding the `Option<OutputSink>` used by `puts`
+    output: ContextID,
+    /// Limits of the current evaluation, shared with the loop commands
+    budget: Rc<RefCell<Budget>>,
 }
 
-impl TclRuntime for MoltRuntime {
-    fn new() -> Self {
-        Self {
-            interp: Interp::new(),
+/// Loop iterations and limits of the current evaluation
+#[derive(Default)]
+struct Budget {
+    limits: ExecutionLimits,
+    steps: u64,
+    interrupt: Option<Interrupt>,
+}
+
+/// `puts ?-nonewline? string`, written to the attached output sink or to stdout
+fn cmd_puts(interp: &mut Interp, output: ContextID, argv: &[Value]) -> MoltResult {
+    check_args(1, argv, 2, 3, "?-nonewline? string")?;
+    
+    let newline = argv.len() == 2;
+    if !newline && argv[1].as_str() != "-nonewline" {
+        return molt_err!("bad option \"{}\": must be -nonewline", argv[1]);
+    }
+    let text = argv[argv.len() - 1].as_str();
+    
+    match interp.context::<Option<OutputSink>>(output) {
+        Some(sink) if newline => sink(format!("{}\n", text)),
+        Some(sink) => sink(text.to_string()),
+        None if newline => println!("{}", text),
+        None => print!("{}", text),
+    }
+    
+    molt_ok!()
+}
+
+/// Command run at the start of every proc body to count the call as a step
+const PROC_TICK: &str = "__tcl_mcp_tick";
+
+/// Name the built-in `info` is moved to, so that `info body` can hide the step check
+const BUILTIN_INFO: &str = "__tcl_mcp_info";
+
+/// Commands the runtime relies on, which scripts may not rename or redefine
+const RESERVED_COMMANDS: [&str; 2] = [PROC_TICK, BUILTIN_INFO];
+
+/// Prefix put in front of every proc body. It shares the first line with the body, so
+/// line numbers reported for errors inside the proc are unchanged
+fn proc_prefix() -> String {
+    format!("{};", PROC_TICK)
+}
+
+fn check_not_reserved(name: &str) -> Result<(), Exception> {
+    if RESERVED_COMMANDS.contains(&name) {
+        return molt_err!("\"{}\" is reserved by the server", name);
+    }
+    Ok(())
+}
+
+/// Count one loop iteration or proc call, failing once a limit is reached. The interrupt is
+/// remembered, so a script that catches the error is still stopped at its next
+/// iteration and its result is discarded.
+fn tick(interp: &mut Interp, budget: ContextID) -> MoltResult {
+    let mut budget = interp.context::<Rc<RefCell<Budget>>>(budget).borrow_mut();
+    if budget.interrupt.is_none() {
+        budget.steps += 1;
+        budget.interrupt = budget.limits.check(budget.steps);
+    }
+    
+    match budget.interrupt {
+        Some(interrupt) => molt_err!("{}", interrupt),
+        None => molt_ok!(),
+    }
+}
+
+/// `__tcl_mcp_tick`, the step check run on entry to every proc
+fn cmd_tick(interp: &mut Interp, budget: ContextID, _argv: &[Value]) -> MoltResult {
+    tick(interp, budget)
+}
+
+/// `proc name args body`, defining a proc whose every call counts as a step, so that
+/// recursion without loops is still stopped by the execution limits
+fn cmd_proc(interp: &mut Interp, _budget: ContextID, argv: &[Value]) -> MoltResult {
+    check_args(1, argv, 4, 4, "name args body")?;
+    check_not_reserved(argv[1].as_str())?;
+    
+    let params = argv[2].as_list()?;
+    for param in params.iter() {
+        let spec = param.as_list()?;
+        if spec.is_empty() {
+            return molt_err!("argument with no name");
+        } else if spec.len() > 2 {
+            return molt_err!("too many fields in argument specifier \"{}\"", param);
         }
     }
     
-    fn eval(&mut self, script: &str) -> Result<String> {
-        match self.interp.eval(script) {
+    let body = Value::from(format!("{}{}", proc_prefix(), argv[3]));
+    interp.add_proc(argv[1].as_str(), &params, &body);
+    molt_ok!()
+}
+
+/// `rename oldName newName`, refusing to move, replace or delete the commands the
+/// runtime relies on
+fn cmd_rename(interp: &mut Interp, _budget: ContextID, argv: &[Value]) -> MoltResult {
+    check_args(1, argv, 3, 3, "oldName newName")?;
+    
+    let (old_name, new_name) = (argv[1].as_str(), argv[2].as_str());
+    check_not_reserved(old_name)?;
+    check_not_reserved(new_name)?;
+    if !interp.has_command(old_name) {
+        return molt_err!("can't rename \"{}\": command doesn't exist", old_name);
+    }
+    
+    if new_name.is_empty() {
+        interp.remove_command(old_name);
+    } else {
+        interp.rename_command(old_name, new_name);
+    }
+    molt_ok!()
+}
+
+/// `info subcommand ?arg ...?`, passed on to the built-in `info` except that `info body`
+/// leaves out the step check added to every proc
+fn cmd_info(interp: &mut Interp, _budget: ContextID, argv: &[Value]) -> MoltResult {
+    let mut words = argv.to_vec();
+    words[0] = Value::from(BUILTIN_INFO);
+    let result = interp.eval_value(&Value::from(words))?;
+    
+    if argv.len() == 3 && argv[1].as_str() == "body" {
+        if let Some(body) = result.as_str().strip_prefix(&proc_prefix()) {
+            return molt_ok!(body.to_string());
+        }
+    }
+    Ok(result)
+}
+
+/// Run one pass of a loop body; `Ok(false)` when the body breaks out of the loop
+fn run_body(interp: &mut Interp, body: &Value) -> Result<bool, Exception> {
+    match interp.eval_value(body) {
+        Ok(_) => Ok(true),
+        Err(exception) => match exception.code() {
+            ResultCode::Break => Ok(false),
+            ResultCode::Continue => Ok(true),
+            _ => Err(exception),
+        },
+    }
+}
+
+/// `while test command`, checking the execution limits on every iteration
+fn cmd_while(interp: &mut Interp, budget: ContextID, argv: &[Value]) -> MoltResult {
+    check_args(1, argv, 3, 3, "test command")?;
+    
+    while interp.expr_bool(&argv[1])? {
+        tick(interp, budget)?;
+        if !run_body(interp, &argv[2])? {
+            break;
+        }
+    }
+    
+    molt_ok!()
+}
+
+/// `for start test next command`, checking the execution limits on every iteration
+fn cmd_for(interp: &mut Interp, budget: ContextID, argv: &[Value]) -> MoltResult {
+    check_args(1, argv, 5, 5, "start test next command")?;
+    
+    interp.eval_value(&argv[1])?;
+    while interp.expr_bool(&argv[2])? {
+        tick(interp, budget)?;
+        if !run_body(interp, &argv[4])? {
+            break;
+        }
+        interp.eval_value(&argv[3])?;
+    }
+    
+    molt_ok!()
+}
+
+/// `foreach varList list body`, checking the execution limits on every iteration
+fn cmd_foreach(interp: &mut Interp, budget: ContextID, argv: &[Value]) -> MoltResult {
+    check_args(1, argv, 4, 4, "varList list body")?;
+    
+    let vars = argv[1].as_list()?;
+    let items = argv[2].as_list()?;
+    if vars.is_empty() {
+        return molt_err!("foreach varlist is empty");
+    }
+    
+    for values in items.chunks(vars.len()) {
+        tick(interp, budget)?;
+        for (i, var) in vars.iter().enumerate() {
+            let value = values.get(i).cloned().unwrap_or_else(Value::empty);
+            interp.set_scalar(var.as_str(), value)?;
+        }
+        if !run_body(interp, &argv[3])? {
+            break;
+        }
+    }
+    
+    molt_ok!()
+}
+
+impl MoltRuntime {
+    /// Convert an evaluation result, failing it if a limit stopped the script
+    fn finish(&self, result: MoltResult) -> Result<String> {
+        if let Some(interrupt) = self.interrupted() {
+            return Err(anyhow!("{}", interrupt));
+        }
+        
+        match result {
             Ok(value) => Ok(value.to_string()),
             Err(error) => Err(anyhow!("Molt execution error: {:?}", error)),
         }
     }
+}
+
+impl TclRuntime for MoltRuntime {
+    fn new() -> Self {
+        let mut interp = Interp::new();
+        let output = interp.save_context::<Option<OutputSink>>(None);
+        interp.add_context_command("puts", cmd_puts, output);
+        
+        // Molt has no interrupt hook, so the looping commands are replaced with ones
+        // that check the execution limits on every iteration, and procs check them
+        // on every call. `info body` hides the check, and scripts cannot rename or
+        // redefine the commands it depends on
+        let budget = Rc::new(RefCell::new(Budget::default()));
+        let budget_id = interp.save_context(budget.clone());
+        interp.add_context_command("while", cmd_while, budget_id);
+        interp.add_context_command("for", cmd_for, budget_id);
+        interp.add_context_command("foreach", cmd_foreach, budget_id);
+        interp.add_context_command(PROC_TICK, cmd_tick, budget_id);
+        interp.add_context_command("proc", cmd_proc, budget_id);
+        interp.rename_command("info", BUILTIN_INFO);
+        interp.add_context_command("info", cmd_info, budget_id);
+        interp.add_context_command("rename", cmd_rename, budget_id);
+        
+        Self { interp, output, budget }
+    }
+    
+    fn eval(&mut self, script: &str) -> Result<String> {
+        let result = self.interp.eval(script);
+        self.finish(result)
+    }
+    
+    fn set_limits(&mut self, limits: ExecutionLimits) {
+        *self.budget.borrow_mut() = Budget {
+            limits,
+            ..Default::default()
+        };
+    }
+    
+    fn interrupted(&self) -> Option<Interrupt> {
+        self.budget.borrow().interrupt
+    }
+    
+    fn compile(&mut self, script: &str) -> Result<CompiledScript> {
+        // Molt caches the parsed script inside the value on first evaluation,
+        // so keeping the value around skips parsing on every later call
+        Ok(CompiledScript::new(molt::Value::from(script)))
+    }
+    
+    fn set_output(&mut self, sink: Option<OutputSink>) {
+        *self.interp.context::<Option<OutputSink>>(self.output) = sink;
+    }
+    
+    fn eval_compiled(&mut self, script: &CompiledScript) -> Result<String> {
+        match script.downcast_ref::<molt::Value>() {
+            Some(value) => {
+                let result = self.interp.eval_value(value);
+                self.finish(result)
+            }
+            None => Err(anyhow!("Script was not compiled by the Molt runtime")),
+        }
+    }
     
     fn set_var(&mut self, name: &str, value: &str) -> Result<()> {
         match self.interp.set_scalar(name, molt::Value::from(value)) {
@@ -35,10 +295,32 @@ impl TclRuntime for MoltRuntime {
         }
     }
     
+    fn unset_var(&mut self, name: &str) -> Result<()> {
+        self.interp.unset(name);
+        Ok(())
+    }
+    
     fn has_command(&self, command: &str) -> bool {
         self.interp.has_command(command)
     }
     
+    fn remove_command(&mut self, name: &str) -> Result<()> {
+        self.interp.remove_command(name);
+        Ok(())
+    }
+    
+    fn global_var_names(&self) -> Vec<String> {
+        self.interp.vars_in_global_scope().iter().map(|v| v.to_string()).collect()
+    }
+    
+    fn command_names(&self) -> Vec<String> {
+        self.interp.command_names().iter().map(|v| v.to_string()).collect()
+    }
+    
+    fn proc_names(&self) -> Vec<String> {
+        self.interp.proc_names().iter().map(|v| v.to_string()).collect()
+    }
+    
     fn name(&self) -> &'static str {
         "Molt"
     }
@@ -68,6 +350,7 @@ impl TclRuntime for MoltRuntime {
 #[cfg(test)]
 mod tests {
     use super::*;
+    use crate::tcl_runtime::RuntimeSnapshot;
 
     #[test]
     fn test_molt_runtime_eval() {
@@ -99,4 +382,178 @@ mod tests {
         let result = runtime.eval("string length $text").unwrap();
         assert_eq!(result, "5");
     }
-}
\ No newline at end of file
+    
+    #[test]
+    fn test_molt_runtime_snapshot_restore() {
+        let mut runtime = MoltRuntime::new();
+        runtime.set_var("baseline", "keep").unwrap();
+        let snapshot = RuntimeSnapshot::capture(&mut runtime);
+        
+        runtime.set_var("leaked", "value").unwrap();
+        runtime.set_var("baseline", "changed").unwrap();
+        runtime.eval("proc helper {} { return 1 }").unwrap();
+        
+        assert!(snapshot.restore(&mut runtime).unwrap());
+        assert!(runtime.get_var("leaked").is_err());
+        assert_eq!(runtime.get_var("baseline").unwrap(), "keep");
+        assert!(!runtime.has_command("helper"));
+        
+        // Redefining a built-in cannot be undone in place
+        runtime.eval("proc set {args} { return overridden }").unwrap();
+        assert!(!snapshot.restore(&mut runtime).unwrap());
+    }
+    
+    #[test]
+    fn test_molt_runtime_snapshot_restores_arrays() {
+        let mut runtime = MoltRuntime::new();
+        runtime.eval("array set config {mode fast retries 3}").unwrap();
+        let snapshot = RuntimeSnapshot::capture(&mut runtime);
+        
+        runtime.eval("set config(mode) slow; set config(extra) 1; unset config(retries)").unwrap();
+        assert!(snapshot.restore(&mut runtime).unwrap());
+        assert_eq!(runtime.eval("set config(mode)").unwrap(), "fast");
+        assert_eq!(runtime.eval("set config(retries)").unwrap(), "3");
+        assert_eq!(runtime.eval("info exists config(extra)").unwrap(), "0");
+        assert!(runtime.get_var("__tcl_mcp_restore").is_err());
+    }
+    
+    #[test]
+    fn test_molt_runtime_snapshot_detects_redefined_procs() {
+        let mut runtime = MoltRuntime::new();
+        runtime.eval("proc greet {name} { return \"hello $name\" }").unwrap();
+        let snapshot = RuntimeSnapshot::capture(&mut runtime);
+        
+        // An untouched baseline proc is kept
+        assert!(snapshot.restore(&mut runtime).unwrap());
+        assert_eq!(runtime.eval("greet you").unwrap(), "hello you");
+        
+        runtime.eval("proc greet {name} { return \"bye $name\" }").unwrap();
+        assert!(!snapshot.restore(&mut runtime).unwrap());
+        
+        let mut runtime = MoltRuntime::new();
+        runtime.eval("proc greet {name} { return \"hello $name\" }").unwrap();
+        runtime.eval("proc greet {who} { return \"hello $who\" }").unwrap();
+        assert!(!snapshot.restore(&mut runtime).unwrap());
+    }
+    
+    #[test]
+    fn test_molt_runtime_procs_keep_their_body() {
+        let mut runtime = MoltRuntime::new();
+        let body = "\n    # greet someone\n    return \"hello $name\"\n";
+        runtime.set_var("body", body).unwrap();
+        runtime.eval("proc greet {name} $body").unwrap();
+        
+        assert_eq!(runtime.eval("info body greet").unwrap(), body);
+        assert_eq!(runtime.eval("info args greet").unwrap(), "name");
+        assert_eq!(runtime.eval("greet you").unwrap(), "hello you");
+        
+        // A proc copied through `info body` behaves like the original
+        runtime.eval("proc copy {name} [info body greet]").unwrap();
+        assert_eq!(runtime.eval("info body copy").unwrap(), body);
+        assert_eq!(runtime.eval("copy me").unwrap(), "hello me");
+        
+        runtime.eval("rename copy renamed").unwrap();
+        assert_eq!(runtime.eval("renamed again").unwrap(), "hello again");
+        runtime.eval("rename renamed {}").unwrap();
+        assert!(!runtime.has_command("renamed"));
+    }
+    
+    #[test]
+    fn test_molt_runtime_step_check_cannot_be_replaced() {
+        let mut runtime = MoltRuntime::new();
+        runtime.eval("proc answer {} { return 42 }").unwrap();
+        
+        assert!(runtime.eval("rename __tcl_mcp_tick {}").is_err());
+        assert!(runtime.eval("rename __tcl_mcp_tick other").is_err());
+        assert!(runtime.eval("rename answer __tcl_mcp_tick").is_err());
+        assert!(runtime.eval("proc __tcl_mcp_tick {} {}").is_err());
+        assert!(runtime.eval("rename __tcl_mcp_info {}").is_err());
+        assert_eq!(runtime.eval("answer").unwrap(), "42");
+    }
+    
+    #[test]
+    fn test_molt_runtime_output_sink() {
+        use std::cell::RefCell;
+        use std::rc::Rc;
+        
+        let mut runtime = MoltRuntime::new();
+        let written = Rc::new(RefCell::new(Vec::new()));
+        let sink = written.clone();
+        runtime.set_output(Some(Box::new(move |text| sink.borrow_mut().push(text))));
+        
+        let result = runtime.eval("puts first; puts -nonewline second; set done 1").unwrap();
+        assert_eq!(result, "1");
+        assert_eq!(*written.borrow(), vec!["first\n".to_string(), "second".to_string()]);
+        assert!(runtime.eval("puts -bogus text").is_err());
+        
+        runtime.set_output(None);
+        runtime.eval("puts detached").unwrap();
+        assert_eq!(written.borrow().len(), 2);
+    }
+    
+    #[test]
+    fn test_molt_runtime_loops() {
+        let mut runtime = MoltRuntime::new();
+        let total = runtime.eval("set total 0; foreach {a b} {1 2 3 4} { incr total [expr {$a * $b}] }; set total").unwrap();
+        assert_eq!(total, "14");
+        
+        let n = runtime.eval("set n 0; while {$n < 10} { incr n; if {$n == 3} break }; set n").unwrap();
+        assert_eq!(n, "3");
+        
+        let odd = runtime.eval("set odd {}; for {set i 0} {$i < 6} {incr i} { if {$i % 2 == 0} continue; lappend odd $i }; set odd").unwrap();
+        assert_eq!(odd, "1 3 5");
+    }
+    
+    #[test]
+    fn test_molt_runtime_limits_stop_runaway_loops() {
+        use crate::tcl_runtime::{ExecutionLimits, Interrupt};
+        use std::time::{Duration, Instant};
+        
+        let mut runtime = MoltRuntime::new();
+        runtime.set_limits(ExecutionLimits { max_steps: Some(100), ..Default::default() });
+        
+        // Catching the error does not let the script carry on
+        let error = runtime.eval("catch { while 1 {} }; set survived 1").unwrap_err();
+        assert_eq!(error.to_string(), Interrupt::StepBudget.to_string());
+        assert_eq!(runtime.interrupted(), Some(Interrupt::StepBudget));
+        
+        runtime.set_limits(ExecutionLimits {
+            deadline: Some(Instant::now() + Duration::from_millis(50)),
+            ..Default::default()
+        });
+        assert!(runtime.eval("for {set i 0} {1} {incr i} {}").is_err());
+        assert_eq!(runtime.interrupted(), Some(Interrupt::Deadline));
+        
+        runtime.set_limits(ExecutionLimits::default());
+        assert_eq!(runtime.interrupted(), None);
+        assert_eq!(runtime.eval("expr {1 + 1}").unwrap(), "2");
+    }
+    
+    #[test]
+    fn test_molt_runtime_limits_stop_recursion_without_loops() {
+        use crate::tcl_runtime::{ExecutionLimits, Interrupt};
+        use std::time::{Duration, Instant};
+        
+        // 2^31 calls, far beyond the deadline
+        let script = "proc f {d} { if {$d < 30} { f [expr {$d + 1}]; f [expr {$d + 1}] } }; f 0";
+        let mut runtime = MoltRuntime::new();
+        runtime.set_limits(ExecutionLimits {
+            deadline: Some(Instant::now() + Duration::from_millis(50)),
+            ..Default::default()
+        });
+        let started = Instant::now();
+        assert!(runtime.eval(script).is_err());
+        assert_eq!(runtime.interrupted(), Some(Interrupt::Deadline));
+        assert!(started.elapsed() < Duration::from_secs(5));
+        
+        let mut runtime = MoltRuntime::new();
+        runtime.set_limits(ExecutionLimits { max_steps: Some(1000), ..Default::default() });
+        assert!(runtime.eval(script).is_err());
+        assert_eq!(runtime.interrupted(), Some(Interrupt::StepBudget));
+        
+        // Procs still take their arguments and return their results
+        runtime.set_limits(ExecutionLimits::default());
+        assert_eq!(runtime.eval("proc add {a {b 2}} { return [expr {$a + $b}] }; add 1").unwrap(), "3");
+        assert!(runtime.eval("proc bad {{}} {}").is_err());
+    }
+}
@@ -7,6 +7,15 @@ pub struct TclInterpreter {
     interp: tcl::Interpreter,
 }
 
+#[cfg(feature = "tcl")]
+impl TclInterpreter {
+    /// Evaluate an `info` query and split the resulting list one name per line
+    fn eval_name_list(&self, query: &str) -> Vec<String> {
+        self.interp.eval(format!("join [{}] \\n", query))
+            .map(|result| result.to_string().lines().map(String::from).collect())
+            .unwrap_or_default()
+    }
+}
 
 #[cfg(feature = "tcl")]
 impl TclRuntime for TclInterpreter {
@@ -36,6 +45,13 @@ impl TclRuntime for TclInterpreter {
         }
     }
     
+    fn unset_var(&mut self, name: &str) -> Result<()> {
+        match self.interp.eval(format!("unset -nocomplain {{::{}}}", name)) {
+            Ok(_) => Ok(()),
+            Err(err) => Err(anyhow!("Failed to unset variable '{}': {}", name, err)),
+        }
+    }
+    
     fn has_command(&self, command: &str) -> bool {
         // Check if command exists by trying to get its info
         let check_cmd = format!("info commands {}", command);
@@ -44,6 +60,25 @@ impl TclRuntime for TclInterpreter {
             .unwrap_or(false)
     }
     
+    fn remove_command(&mut self, name: &str) -> Result<()> {
+        match self.interp.eval(format!("rename {{::{}}} {{}}", name)) {
+            Ok(_) => Ok(()),
+            Err(err) => Err(anyhow!("Failed to remove command '{}': {}", name, err)),
+        }
+    }
+    
+    fn global_var_names(&self) -> Vec<String> {
+        self.eval_name_list("info globals")
+    }
+    
+    fn command_names(&self) -> Vec<String> {
+        self.eval_name_list("info commands")
+    }
+    
+    fn proc_names(&self) -> Vec<String> {
+        self.eval_name_list("info procs")
+    }
+    
     fn name(&self) -> &'static str {
         "TCL (Official)"
     }
@@ -1,11 +1,16 @@
 use anyhow::{Result, anyhow};
 use serde::{Deserialize, Serialize};
-use tokio::sync::{mpsc, oneshot};
+use std::sync::atomic::AtomicBool;
+use std::sync::Arc;
+use std::time::Duration;
+use tokio::sync::oneshot;
 use tracing::info;
 
-use crate::tcl_executor::TclCommand;
+use crate::tcl_executor::{TclCommand, RegistryCommand, CallOptions, CommandQueue, ExecutorStatsSnapshot};
 
 use crate::namespace::ToolPath;
+use crate::tool_listing::ToolPage;
+use crate::streaming::ScriptOutput;
 
 #[derive(Debug, Clone, Serialize, Deserialize)]
 pub struct ToolDefinition {
@@ -25,13 +30,18 @@ pub struct ParameterDefinition {
 
 #[derive(Clone)]
 pub struct TclToolBox {
-    executor: mpsc::Sender<TclCommand>,
+    executor: CommandQueue,
+    /// Output stream and cancel flag of scripts run through this tool box
+    call: CallOptions,
 }
 
 #[derive(Debug, Clone, Serialize, Deserialize)]
 pub struct TclExecuteRequest {
     /// TCL script to execute
     pub script: String,
+    /// Stop the script after this many milliseconds (optional)
+    #[serde(default, skip_serializing_if = "Option::is_none")]
+    pub timeout_ms: Option<u64>,
 }
 
 #[derive(Debug, Clone, Serialize, Deserialize)]
@@ -84,18 +94,37 @@ pub struct TclExecToolRequest {
 }
 
 impl TclToolBox {
-    pub fn new(executor: mpsc::Sender<TclCommand>) -> Self {
-        Self { executor }
+    pub fn new(executor: CommandQueue) -> Self {
+        Self { executor, call: CallOptions::default() }
+    }
+    
+    /// A tool box whose script runs stream their `puts` output to `output`. The stream
+    /// ends once this tool box and every call made through it are done.
+    pub fn with_output(&self, output: ScriptOutput) -> Self {
+        let mut tool_box = self.clone();
+        tool_box.call.output = Some(output);
+        tool_box
+    }
+    
+    /// A tool box whose script runs stop once `cancel` is set
+    pub fn with_cancel(&self, cancel: Arc<AtomicBool>) -> Self {
+        let mut tool_box = self.clone();
+        tool_box.call.cancel = Some(cancel);
+        tool_box
     }
 
     pub async fn tcl_execute(&self, request: TclExecuteRequest) -> Result<String> {
         info!("Executing TCL script: {}", request.script);
         
         let (tx, rx) = oneshot::channel();
-        self.executor.send(TclCommand::Execute {
+        self.executor.try_send(TclCommand::Execute {
             script: request.script,
+            call: CallOptions {
+                timeout: request.timeout_ms.map(Duration::from_millis),
+                ..self.call.clone()
+            },
             response: tx,
-        }).await.map_err(|_| anyhow!("Failed to send command to executor"))?;
+        })?;
         
         rx.await.map_err(|_| anyhow!("Failed to receive response from executor"))?
     }
@@ -105,13 +134,13 @@ impl TclToolBox {
         info!("Adding new TCL tool: {}", path);
         
         let (tx, rx) = oneshot::channel();
-        self.executor.send(TclCommand::AddTool {
+        self.executor.update_registry(RegistryCommand::AddTool {
             path,
             description: request.description,
             script: request.script,
             parameters: request.parameters,
             response: tx,
-        }).await.map_err(|_| anyhow!("Failed to send command to executor"))?;
+        })?;
         
         rx.await.map_err(|_| anyhow!("Failed to receive response from executor"))?
     }
@@ -121,10 +150,10 @@ impl TclToolBox {
         info!("Removing TCL tool: {}", path);
         
         let (tx, rx) = oneshot::channel();
-        self.executor.send(TclCommand::RemoveTool {
+        self.executor.update_registry(RegistryCommand::RemoveTool {
             path,
             response: tx,
-        }).await.map_err(|_| anyhow!("Failed to send command to executor"))?;
+        })?;
         
         rx.await.map_err(|_| anyhow!("Failed to receive response from executor"))?
     }
@@ -132,46 +161,45 @@ impl TclToolBox {
     pub async fn tcl_tool_list(&self, request: TclToolListRequest) -> Result<String> {
         info!("Listing TCL tools with namespace: {:?}, filter: {:?}", request.namespace, request.filter);
         
-        let (tx, rx) = oneshot::channel();
-        self.executor.send(TclCommand::ListTools {
-            namespace: request.namespace,
-            filter: request.filter,
-            response: tx,
-        }).await.map_err(|_| anyhow!("Failed to send command to executor"))?;
-        
-        let tools = rx.await.map_err(|_| anyhow!("Failed to receive response from executor"))??;
+        let tools = self.executor.registry().list_tools(request.namespace, request.filter);
         
         // Format as JSON with full paths
         Ok(serde_json::to_string_pretty(&tools)?)
     }
     
-    pub async fn execute_custom_tool(&self, mcp_name: &str, params: serde_json::Value) -> Result<String> {
-        let path = ToolPath::from_mcp_name(mcp_name)?;
+    /// Run a user or discovered tool by its MCP name. The name is resolved against the
+    /// published registry, so an unknown tool fails without queueing.
+    pub async fn execute_custom_tool(&self, mcp_name: String, params: serde_json::Value) -> Result<String> {
+        let path = self.executor.registry().resolve(&mcp_name).cloned()
+            .ok_or_else(|| anyhow!("Tool '{}' not found", mcp_name))?;
         
         let (tx, rx) = oneshot::channel();
-        self.executor.send(TclCommand::ExecuteCustomTool {
+        self.executor.try_send(TclCommand::CallTool {
             path,
             params,
+            call: self.call.clone(),
             response: tx,
-        }).await.map_err(|_| anyhow!("Failed to send command to executor"))?;
+        })?;
         
         rx.await.map_err(|_| anyhow!("Failed to receive response from executor"))?
     }
     
+    /// Read from the published registry, without queueing behind running scripts
     pub async fn get_tool_definitions(&self) -> Result<Vec<ToolDefinition>> {
-        let (tx, rx) = oneshot::channel();
-        self.executor.send(TclCommand::GetToolDefinitions {
-            response: tx,
-        }).await.map_err(|_| anyhow!("Failed to send command to executor"))?;
-        
-        Ok(rx.await.map_err(|_| anyhow!("Failed to receive response from executor"))?)
+        Ok(self.executor.registry().get_tool_definitions())
+    }
+    
+    /// A page of user and discovered tools as `tools/list` entries, starting after `cursor`.
+    /// Read from the published registry, without queueing behind running scripts.
+    pub async fn list_tools_page(&self, cursor: Option<String>) -> Result<Arc<ToolPage>> {
+        Ok(self.executor.registry().tool_page(cursor.as_deref()))
     }
     
     pub async fn initialize_persistence(&self) -> Result<String> {
         let (tx, rx) = oneshot::channel();
-        self.executor.send(TclCommand::InitializePersistence {
+        self.executor.update_registry(RegistryCommand::InitializePersistence {
             response: tx,
-        }).await.map_err(|_| anyhow!("Failed to send command to executor"))?;
+        })?;
         
         rx.await.map_err(|_| anyhow!("Failed to receive response from executor"))?
     }
@@ -180,11 +208,12 @@ impl TclToolBox {
         info!("Executing tool: {} with params: {:?}", request.tool_path, request.params);
         
         let (tx, rx) = oneshot::channel();
-        self.executor.send(TclCommand::ExecTool {
+        self.executor.try_send(TclCommand::ExecTool {
             tool_path: request.tool_path,
             params: request.params,
+            call: self.call.clone(),
             response: tx,
-        }).await.map_err(|_| anyhow!("Failed to send command to executor"))?;
+        })?;
         
         rx.await.map_err(|_| anyhow!("Failed to receive response from executor"))?
     }
@@ -193,10 +222,15 @@ impl TclToolBox {
         info!("Discovering tools from filesystem");
         
         let (tx, rx) = oneshot::channel();
-        self.executor.send(TclCommand::DiscoverTools {
+        self.executor.update_registry(RegistryCommand::DiscoverTools {
             response: tx,
-        }).await.map_err(|_| anyhow!("Failed to send command to executor"))?;
+        })?;
         
         rx.await.map_err(|_| anyhow!("Failed to receive response from executor"))?
     }
+    
+    /// Pool counters, including the queue's, read without queueing behind other work
+    pub async fn get_stats(&self) -> Result<ExecutorStatsSnapshot> {
+        Ok(self.executor.stats())
+    }
 }
\ No newline at end of file
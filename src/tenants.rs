@@ -0,0 +1,419 @@
+//! Fair sharing of the interpreter workers between user namespaces.
+//!
+//! Each tenant, a user namespace or the shared system tools, has a queue of its own.
+//! Workers take the next command from the waiting tenant that has used the least
+//! worker time so far (start-time fair queuing), so one user flooding the server
+//! with calls only lengthens their own queue. A tenant can also be capped to a
+//! number of commands running at once.
+
+use anyhow::{anyhow, Result};
+use serde::{Deserialize, Serialize};
+use std::collections::{HashMap, VecDeque};
+use std::fmt;
+use std::sync::Mutex;
+use std::time::Duration;
+use tokio::sync::Notify;
+
+use crate::namespace::{Namespace, ToolPath};
+
+/// Worker time charged for a tenant's command before any of its commands have run
+const INITIAL_COST_MICROS: u64 = 1_000;
+
+/// Commands a single tenant may have waiting, out of the queue's total
+pub const DEFAULT_TENANT_QUEUE_DEPTH: usize = 25;
+
+/// Who a command runs for
+#[derive(Debug, Clone, PartialEq, Eq, Hash)]
+pub enum Tenant {
+    /// Built-in and system namespace tools, shared by every client
+    System,
+    /// A user namespace
+    User(String),
+}
+
+impl Tenant {
+    /// The tenant a tool belongs to
+    pub fn of(path: &ToolPath) -> Self {
+        match path.namespace() {
+            Namespace::User(user) => Tenant::User(user.clone()),
+            _ => Tenant::System,
+        }
+    }
+}
+
+impl fmt::Display for Tenant {
+    fn fmt(&self, f: &mut fmt::Formatter<'_>) -> fmt::Result {
+        match self {
+            Tenant::System => f.write_str("system"),
+            Tenant::User(user) => write!(f, "/{}", user),
+        }
+    }
+}
+
+/// Caps on the commands each user namespace may have running at once
+#[derive(Debug, Clone, Default, PartialEq, Eq)]
+pub struct TenantLimits {
+    /// Cap for every user namespace without one of its own (`None` = no cap)
+    pub max_in_flight: Option<usize>,
+    /// Caps for particular user namespaces, 0 meaning no cap
+    pub overrides: HashMap<String, usize>,
+}
+
+impl TenantLimits {
+    /// The cap for `tenant`. The system tenant is never capped.
+    pub fn cap(&self, tenant: &Tenant) -> Option<usize> {
+        match tenant {
+            Tenant::System => None,
+            Tenant::User(user) => match self.overrides.get(user) {
+                Some(0) => None,
+                Some(cap) => Some(*cap),
+                None => self.max_in_flight,
+            },
+        }
+    }
+
+    /// Parse per-namespace caps of the form "alice=2,bob=4"
+    pub fn parse_overrides(spec: &str) -> Result<HashMap<String, usize>> {
+        let mut overrides = HashMap::new();
+        for entry in spec.split(',').map(str::trim).filter(|entry| !entry.is_empty()) {
+            let (user, cap) = entry.split_once('=')
+                .ok_or_else(|| anyhow!("Invalid tenant limit '{}'. Expected USER=N", entry))?;
+            let cap = cap.trim().parse()
+                .map_err(|_| anyhow!("Invalid tenant limit '{}'. Expected USER=N with N a non-negative integer", entry))?;
+            overrides.insert(user.trim().to_string(), cap);
+        }
+        Ok(overrides)
+    }
+}
+
+/// Why a command could not be queued
+#[derive(Debug, Clone, Copy, PartialEq, Eq)]
+pub enum PushError {
+    /// The tenant's queue or the queue as a whole is full, holding `queued` commands
+    Full { queued: usize },
+    /// The queue is closed
+    Closed,
+}
+
+/// A command handed to a worker. Pass it back to `TenantQueue::finish` once the
+/// command has run.
+#[derive(Debug)]
+pub struct Ticket {
+    tenant: Tenant,
+    /// Worker time charged up front, corrected once the command has run
+    charged_micros: u64,
+}
+
+impl Ticket {
+    pub fn tenant(&self) -> &Tenant {
+        &self.tenant
+    }
+}
+
+/// Queue occupancy of one tenant
+#[derive(Debug, Clone, Default, Serialize, Deserialize)]
+pub struct TenantStatsSnapshot {
+    pub tenant: String,
+    pub queued: usize,
+    pub running: usize,
+}
+
+struct TenantEntry<T> {
+    waiting: VecDeque<T>,
+    running: usize,
+    /// Worker time used so far, in microseconds
+    service: u64,
+    /// Recent worker time per command, charged when a command is handed out
+    cost: u64,
+}
+
+struct QueueState<T> {
+    /// Tenants with commands waiting or running. Idle tenants are dropped, so they
+    /// build up no credit while away.
+    tenants: HashMap<Tenant, TenantEntry<T>>,
+    /// Commands waiting across all tenants
+    waiting: usize,
+    /// Service of the tenant served last. A tenant that starts queueing again
+    /// starts from here.
+    clock: u64,
+    closed: bool,
+}
+
+impl<T> QueueState<T> {
+    /// Add `item` to the tenant's queue. When that queue or the whole queue is full,
+    /// hands the item back with the length of the full queue.
+    fn enqueue(&mut self, tenant: Tenant, item: T, depth: usize, tenant_depth: usize) -> std::result::Result<(), (T, usize)> {
+        if self.waiting >= depth {
+            return Err((item, self.waiting));
+        }
+
+        let clock = self.clock;
+        let entry = self.tenants.entry(tenant).or_insert_with(|| TenantEntry {
+            waiting: VecDeque::new(),
+            running: 0,
+            service: clock,
+            cost: INITIAL_COST_MICROS,
+        });
+        if entry.waiting.len() >= tenant_depth {
+            return Err((item, entry.waiting.len()));
+        }
+        if entry.waiting.is_empty() {
+            entry.service = entry.service.max(clock);
+        }
+        entry.waiting.push_back(item);
+        self.waiting += 1;
+        Ok(())
+    }
+
+    /// The waiting tenant below its cap with the least service
+    fn next_tenant(&self, limits: &TenantLimits) -> Option<Tenant> {
+        self.tenants.iter()
+            .filter(|(tenant, entry)| {
+                !entry.waiting.is_empty() && limits.cap(tenant).map_or(true, |cap| entry.running < cap)
+            })
+            .min_by_key(|(_, entry)| entry.service)
+            .map(|(tenant, _)| tenant.clone())
+    }
+
+    /// Hand out the next command of the tenant with the least service, charging the
+    /// tenant its recent cost per command
+    fn take(&mut self, limits: &TenantLimits) -> Option<(Ticket, T)> {
+        let tenant = self.next_tenant(limits)?;
+        let entry = self.tenants.get_mut(&tenant)?;
+        let item = entry.waiting.pop_front()?;
+        self.waiting -= 1;
+        let charged_micros = entry.cost;
+        self.clock = self.clock.max(entry.service);
+        entry.service += charged_micros;
+        entry.running += 1;
+        Some((Ticket { tenant, charged_micros }, item))
+    }
+
+    fn is_empty(&self) -> bool {
+        self.waiting == 0
+    }
+}
+
+/// Per-tenant command queues shared by a pool of workers
+pub struct TenantQueue<T> {
+    state: Mutex<QueueState<T>>,
+    /// Commands that may be waiting across all tenants
+    depth: usize,
+    /// Commands each tenant may have waiting
+    tenant_depth: usize,
+    limits: TenantLimits,
+    /// Signalled when a command may have become ready to run, or the queue closed
+    ready: Notify,
+    /// Signalled when a command leaves its queue, or the queue closed
+    space: Notify,
+}
+
+impl<T> TenantQueue<T> {
+    /// A queue holding up to `depth` commands, of which up to `tenant_depth` may
+    /// belong to any one tenant
+    pub fn new(depth: usize, tenant_depth: usize, limits: TenantLimits) -> Self {
+        let depth = depth.max(1);
+        Self {
+            state: Mutex::new(QueueState { tenants: HashMap::new(), waiting: 0, clock: 0, closed: false }),
+            depth,
+            tenant_depth: tenant_depth.clamp(1, depth),
+            limits,
+            ready: Notify::new(),
+            space: Notify::new(),
+        }
+    }
+
+    /// Queue `item` for `tenant`, failing at once when the tenant's queue or the
+    /// whole queue is full
+    pub fn try_push(&self, tenant: Tenant, item: T) -> std::result::Result<(), PushError> {
+        {
+            let mut state = self.state.lock().unwrap();
+            if state.closed {
+                return Err(PushError::Closed);
+            }
+            if let Err((_, queued)) = state.enqueue(tenant, item, self.depth, self.tenant_depth) {
+                return Err(PushError::Full { queued });
+            }
+        }
+
+        self.ready.notify_one();
+        Ok(())
+    }
+
+    /// Queue `item` for `tenant`, waiting while the tenant's queue or the whole queue
+    /// is full
+    pub async fn push(&self, tenant: Tenant, mut item: T) -> std::result::Result<(), PushError> {
+        loop {
+            let space = self.space.notified();
+            {
+                let mut state = self.state.lock().unwrap();
+                if state.closed {
+                    return Err(PushError::Closed);
+                }
+                match state.enqueue(tenant.clone(), item, self.depth, self.tenant_depth) {
+                    Ok(()) => break,
+                    Err((returned, _)) => item = returned,
+                }
+            }
+            space.await;
+        }
+
+        self.ready.notify_one();
+        Ok(())
+    }
+
+    /// Take the next command, waiting while no tenant below its cap has one.
+    /// Returns `None` once the queue is closed and empty.
+    pub async fn pop(&self) -> Option<(Ticket, T)> {
+        loop {
+            let ready = self.ready.notified();
+            let next = {
+                let mut state = self.state.lock().unwrap();
+                match state.take(&self.limits) {
+                    Some(next) => Some((next, state.next_tenant(&self.limits).is_some())),
+                    None if state.closed && state.is_empty() => return None,
+                    None => None,
+                }
+            };
+
+            if let Some((next, more)) = next {
+                // Each push wakes a single worker, so pass the wakeup on while other
+                // commands are ready
+                if more {
+                    self.ready.notify_one();
+                }
+                self.space.notify_waiters();
+                return Some(next);
+            }
+            ready.await;
+        }
+    }
+
+    /// Record that the command behind `ticket` has run for `elapsed`
+    pub fn finish(&self, ticket: Ticket, elapsed: Duration) {
+        let elapsed = elapsed.as_micros().min(u64::MAX as u128) as u64;
+        {
+            let mut state = self.state.lock().unwrap();
+            let idle = match state.tenants.get_mut(&ticket.tenant) {
+                Some(entry) => {
+                    entry.running = entry.running.saturating_sub(1);
+                    entry.service = entry.service.saturating_add(elapsed).saturating_sub(ticket.charged_micros);
+                    entry.cost = ((entry.cost * 3 + elapsed) / 4).max(1);
+                    entry.running == 0 && entry.waiting.is_empty()
+                }
+                None => false,
+            };
+            if idle {
+                state.tenants.remove(&ticket.tenant);
+            }
+        }
+
+        // A capped tenant may be able to run another command
+        self.ready.notify_one();
+    }
+
+    /// Stop taking new commands. Those already queued are still handed out.
+    pub fn close(&self) {
+        self.state.lock().unwrap().closed = true;
+        self.ready.notify_waiters();
+        self.space.notify_waiters();
+    }
+
+    /// Occupancy of every tenant with commands waiting or running
+    pub fn snapshot(&self) -> Vec<TenantStatsSnapshot> {
+        let state = self.state.lock().unwrap();
+        let mut tenants: Vec<TenantStatsSnapshot> = state.tenants.iter()
+            .map(|(tenant, entry)| TenantStatsSnapshot {
+                tenant: tenant.to_string(),
+                queued: entry.waiting.len(),
+                running: entry.running,
+            })
+            .collect();
+        tenants.sort_by(|a, b| a.tenant.cmp(&b.tenant));
+        tenants
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    fn user(name: &str) -> Tenant {
+        Tenant::User(name.to_string())
+    }
+
+    #[tokio::test]
+    async fn test_new_tenant_overtakes_backlog() {
+        let queue = TenantQueue::new(16, 16, TenantLimits::default());
+        for n in 0..4 {
+            queue.try_push(user("alice"), format!("alice{}", n)).unwrap();
+        }
+        let (first, item) = queue.pop().await.unwrap();
+        assert_eq!(item, "alice0");
+
+        // Bob has used no worker time yet, so his call goes ahead of Alice's backlog
+        queue.try_push(user("bob"), "bob0".to_string()).unwrap();
+        let (second, item) = queue.pop().await.unwrap();
+        assert_eq!(item, "bob0");
+        assert_eq!(second.tenant(), &user("bob"));
+
+        queue.finish(first, Duration::from_millis(5));
+        queue.finish(second, Duration::from_millis(5));
+        let tenants = queue.snapshot();
+        assert_eq!(tenants.len(), 1);
+        assert_eq!(tenants[0].tenant, "/alice");
+        assert_eq!(tenants[0].queued, 3);
+    }
+
+    #[tokio::test]
+    async fn test_tenant_cap_limits_running_commands() {
+        let limits = TenantLimits { max_in_flight: Some(1), ..Default::default() };
+        let queue = TenantQueue::new(16, 16, limits);
+        queue.try_push(user("alice"), 1).unwrap();
+        queue.try_push(user("alice"), 2).unwrap();
+        let (running, _) = queue.pop().await.unwrap();
+
+        // Alice is at her cap, so her second call waits while other tenants run
+        assert!(tokio::time::timeout(Duration::from_millis(50), queue.pop()).await.is_err());
+        queue.try_push(Tenant::System, 3).unwrap();
+        let (ticket, item) = queue.pop().await.unwrap();
+        assert_eq!(ticket.tenant(), &Tenant::System);
+        assert_eq!(item, 3);
+
+        queue.finish(running, Duration::from_millis(1));
+        let (ticket, item) = queue.pop().await.unwrap();
+        assert_eq!(ticket.tenant(), &user("alice"));
+        assert_eq!(item, 2);
+    }
+
+    #[test]
+    fn test_full_tenant_queue_only_turns_that_tenant_away() {
+        let queue = TenantQueue::new(3, 1, TenantLimits::default());
+        queue.try_push(user("alice"), 1).unwrap();
+        assert_eq!(queue.try_push(user("alice"), 2), Err(PushError::Full { queued: 1 }));
+        assert_eq!(queue.try_push(user("bob"), 3), Ok(()));
+        assert_eq!(queue.try_push(Tenant::System, 4), Ok(()));
+
+        // The total still bounds the queue however many tenants there are
+        assert_eq!(queue.try_push(user("carol"), 5), Err(PushError::Full { queued: 3 }));
+        assert_eq!(queue.snapshot().len(), 3);
+
+        queue.close();
+        assert_eq!(queue.try_push(user("dave"), 6), Err(PushError::Closed));
+    }
+
+    #[test]
+    fn test_tenant_limits() {
+        let limits = TenantLimits {
+            max_in_flight: Some(2),
+            overrides: TenantLimits::parse_overrides("alice=4, bob=0").unwrap(),
+        };
+        assert_eq!(limits.cap(&user("alice")), Some(4));
+        assert_eq!(limits.cap(&user("bob")), None);
+        assert_eq!(limits.cap(&user("carol")), Some(2));
+        assert_eq!(limits.cap(&Tenant::System), None);
+
+        assert!(TenantLimits::parse_overrides("alice").is_err());
+        assert!(TenantLimits::parse_overrides("alice=many").is_err());
+    }
+}
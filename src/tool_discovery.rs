@@ -1,11 +1,27 @@
 use anyhow::Result;
-use std::collections::HashMap;
+use std::collections::{HashMap, HashSet};
+use std::io::{BufRead, BufReader};
 use std::path::{Path, PathBuf};
+use std::sync::{Arc, Mutex};
+use std::time::{Duration, Instant, SystemTime};
 use tokio::fs;
+use tokio::task::JoinSet;
+#[cfg(feature = "watch")]
+use tokio::sync::mpsc;
 use serde::{Deserialize, Serialize};
 use crate::namespace::{ToolPath, Namespace};
+use crate::persistence::calculate_checksum;
 use crate::tcl_tools::ParameterDefinition;
 
+/// Default number of discovered tool scripts kept in memory
+pub const DEFAULT_SCRIPT_STORE_CAPACITY: usize = 1024;
+
+/// How long a cached script is trusted before its file is stat'ed again
+const SCRIPT_REVALIDATE_INTERVAL: Duration = Duration::from_secs(2);
+
+/// Maximum number of directory listings or header reads in flight during a scan
+const DISCOVERY_CONCURRENCY: usize = 64;
+
 /// Tool discovery system for finding and indexing tools from the filesystem
 #[derive(Debug, Clone)]
 pub struct ToolDiscovery {
@@ -13,6 +29,162 @@ pub struct ToolDiscovery {
     tools_dir: PathBuf,
     /// Cache of discovered tools
     discovered_tools: HashMap<ToolPath, DiscoveredTool>,
+    /// Tool files seen so far, for incremental updates
+    files: HashMap<PathBuf, TrackedFile>,
+    /// Whether a full scan (or a validated index) has populated `files`
+    scanned: bool,
+    /// Where discovery results are saved between runs
+    index_path: Option<PathBuf>,
+    /// In-memory tool bodies, loaded on first use
+    scripts: Arc<ScriptStore>,
+}
+
+/// Identity of a tool file on disk, used to detect edits and replacements
+#[derive(Debug, Clone, Copy, PartialEq, Eq, Serialize, Deserialize)]
+pub struct FileFingerprint {
+    modified: Option<SystemTime>,
+    len: u64,
+    inode: u64,
+}
+
+impl FileFingerprint {
+    pub fn from_metadata(metadata: &std::fs::Metadata) -> Self {
+        #[cfg(unix)]
+        let inode = {
+            use std::os::unix::fs::MetadataExt;
+            metadata.ino()
+        };
+        #[cfg(not(unix))]
+        let inode = 0;
+        
+        Self {
+            modified: metadata.modified().ok(),
+            len: metadata.len(),
+            inode,
+        }
+    }
+}
+
+/// A discovered tool body held in memory
+#[derive(Debug, Clone)]
+pub struct StoredScript {
+    pub source: Arc<str>,
+    pub checksum: String,
+}
+
+/// Bounded in-memory cache of discovered tool bodies with LRU eviction.
+///
+/// Entries are validated against the file's mtime, size and inode, but at most once
+/// per `SCRIPT_REVALIDATE_INTERVAL`, so hot tools are served without touching the disk.
+#[derive(Debug)]
+pub struct ScriptStore {
+    capacity: usize,
+    inner: Mutex<ScriptStoreInner>,
+}
+
+#[derive(Debug, Default)]
+struct ScriptStoreInner {
+    entries: HashMap<PathBuf, ScriptEntry>,
+    /// Monotonic use counter for LRU ordering
+    tick: u64,
+}
+
+#[derive(Debug)]
+struct ScriptEntry {
+    script: StoredScript,
+    fingerprint: FileFingerprint,
+    validated_at: Instant,
+    last_used: u64,
+}
+
+impl ScriptStore {
+    pub fn new(capacity: usize) -> Self {
+        Self {
+            capacity: capacity.max(1),
+            inner: Mutex::new(ScriptStoreInner::default()),
+        }
+    }
+    
+    /// Store a tool body read from disk, evicting the least recently used entry if full
+    pub fn insert(&self, file_path: PathBuf, source: String, fingerprint: FileFingerprint) -> StoredScript {
+        let script = StoredScript {
+            checksum: calculate_checksum(&source),
+            source: Arc::from(source),
+        };
+        
+        let mut inner = self.inner.lock().unwrap();
+        inner.tick += 1;
+        let tick = inner.tick;
+        
+        if !inner.entries.contains_key(&file_path) && inner.entries.len() >= self.capacity {
+            let oldest = inner.entries.iter()
+                .min_by_key(|(_, entry)| entry.last_used)
+                .map(|(path, _)| path.clone());
+            if let Some(oldest) = oldest {
+                inner.entries.remove(&oldest);
+            }
+        }
+        
+        inner.entries.insert(file_path, ScriptEntry {
+            script: script.clone(),
+            fingerprint,
+            validated_at: Instant::now(),
+            last_used: tick,
+        });
+        script
+    }
+    
+    /// Get a tool body, reading the file only if it is not cached or has changed
+    pub async fn load(&self, file_path: &Path) -> Result<StoredScript> {
+        if let Some(script) = self.get_fresh(file_path) {
+            return Ok(script);
+        }
+        
+        // Revalidate against the file's identity before re-reading it
+        let fingerprint = FileFingerprint::from_metadata(&fs::metadata(file_path).await?);
+        {
+            let mut inner = self.inner.lock().unwrap();
+            inner.tick += 1;
+            let tick = inner.tick;
+            if let Some(entry) = inner.entries.get_mut(file_path) {
+                if entry.fingerprint == fingerprint {
+                    entry.validated_at = Instant::now();
+                    entry.last_used = tick;
+                    return Ok(entry.script.clone());
+                }
+            }
+        }
+        
+        tracing::debug!("Loading tool script {}", file_path.display());
+        let source = fs::read_to_string(file_path).await?;
+        Ok(self.insert(file_path.to_path_buf(), source, fingerprint))
+    }
+    
+    /// Cached body that was validated recently enough to skip the stat
+    fn get_fresh(&self, file_path: &Path) -> Option<StoredScript> {
+        let mut inner = self.inner.lock().unwrap();
+        inner.tick += 1;
+        let tick = inner.tick;
+        let entry = inner.entries.get_mut(file_path)?;
+        if entry.validated_at.elapsed() < SCRIPT_REVALIDATE_INTERVAL {
+            entry.last_used = tick;
+            Some(entry.script.clone())
+        } else {
+            None
+        }
+    }
+    
+    pub fn remove(&self, file_path: &Path) {
+        self.inner.lock().unwrap().entries.remove(file_path);
+    }
+    
+    pub fn clear(&self) {
+        self.inner.lock().unwrap().entries.clear();
+    }
+    
+    pub fn len(&self) -> usize {
+        self.inner.lock().unwrap().entries.len()
+    }
 }
 
 #[derive(Debug, Clone, Serialize, Deserialize)]
@@ -23,6 +195,49 @@ pub struct DiscoveredTool {
     pub parameters: Vec<ParameterDefinition>,
 }
 
+/// A tool file seen during discovery and the tool it provided
+#[derive(Debug, Clone)]
+struct TrackedFile {
+    fingerprint: FileFingerprint,
+    tool: ToolPath,
+}
+
+/// Where a tool file lives in the tools directory layout
+enum ToolLocation {
+    System(Namespace, String),
+    User { user: String, package: String, name: String },
+}
+
+/// Format version of the on-disk discovery index
+const DISCOVERY_INDEX_VERSION: u32 = 1;
+
+/// Discovery results saved between runs, so a restart only has to stat tool files
+#[derive(Debug, Serialize, Deserialize)]
+struct DiscoveryIndex {
+    version: u32,
+    tools_dir: PathBuf,
+    files: Vec<IndexedFile>,
+}
+
+#[derive(Debug, Serialize, Deserialize)]
+struct IndexedFile {
+    fingerprint: FileFingerprint,
+    tool: DiscoveredTool,
+}
+
+/// Tools added, changed or removed by an incremental discovery pass
+#[derive(Debug, Clone, Default)]
+pub struct DiscoveryDelta {
+    pub updated: Vec<DiscoveredTool>,
+    pub removed: Vec<ToolPath>,
+}
+
+impl DiscoveryDelta {
+    pub fn is_empty(&self) -> bool {
+        self.updated.is_empty() && self.removed.is_empty()
+    }
+}
+
 impl ToolDiscovery {
     /// Create a new tool discovery instance
     pub fn new() -> Self {
@@ -31,8 +246,18 @@ impl ToolDiscovery {
         Self {
             tools_dir,
             discovered_tools: HashMap::new(),
+            files: HashMap::new(),
+            scanned: false,
+            index_path: None,
+            scripts: Arc::new(ScriptStore::new(DEFAULT_SCRIPT_STORE_CAPACITY)),
         }
     }
+    
+    /// Drop cached tool bodies from the given store when their files go away
+    pub fn with_script_store(mut self, scripts: Arc<ScriptStore>) -> Self {
+        self.scripts = scripts;
+        self
+    }
 
     /// Set the base directory for tool discovery (for testing)
     #[cfg(test)]
@@ -40,160 +265,577 @@ impl ToolDiscovery {
         self.tools_dir = dir;
         self
     }
+    
+    /// Save discovery results to this file and reuse them on the next start
+    pub fn with_index_path(mut self, index_path: PathBuf) -> Self {
+        self.index_path = Some(index_path);
+        self
+    }
+    
+    pub fn tools_dir(&self) -> &Path {
+        &self.tools_dir
+    }
+    
+    /// Whether a full scan has been done, so that incremental updates are possible
+    pub fn has_scanned(&self) -> bool {
+        self.scanned
+    }
 
     /// Discover all tools in the filesystem
     pub async fn discover_tools(&mut self) -> Result<Vec<DiscoveredTool>> {
         self.discovered_tools.clear();
+        self.files.clear();
+        self.scripts.clear();
         
-        // Scan system directories
-        self.scan_directory(&self.tools_dir.join("bin"), Namespace::Bin).await?;
-        self.scan_directory(&self.tools_dir.join("sbin"), Namespace::Sbin).await?;
-        self.scan_directory(&self.tools_dir.join("docs"), Namespace::Docs).await?;
-        
-        // Scan user directories
-        let user_dir = self.tools_dir.join("users");
-        if user_dir.exists() {
-            self.scan_user_directories(&user_dir).await?;
-        }
+        let files = self.list_tool_files(&self.tools_dir).await?;
+        let mut delta = DiscoveryDelta::default();
+        self.load_tool_files(files.into_iter().map(|(file, _)| file).collect(), &mut delta).await?;
+        self.scanned = true;
+        self.save_index().await;
         
         Ok(self.discovered_tools.values().cloned().collect())
     }
-
-    /// Scan a specific directory for tools
-    async fn scan_directory(&mut self, dir: &Path, namespace: Namespace) -> Result<()> {
-        if !dir.exists() {
-            return Ok(());
+    
+    /// Stat every tool file and re-read only the ones that were added or changed
+    /// since they were last seen.
+    pub async fn refresh(&mut self) -> Result<DiscoveryDelta> {
+        let mut delta = DiscoveryDelta::default();
+        let files = self.list_tool_files(&self.tools_dir).await?;
+        let seen: HashSet<&PathBuf> = files.iter().map(|(file, _)| file).collect();
+        
+        let gone: Vec<PathBuf> = self.files.keys()
+            .filter(|file| !seen.contains(file))
+            .cloned()
+            .collect();
+        for file in gone {
+            self.forget_file(&file, &mut delta);
         }
-
-        let mut entries = fs::read_dir(dir).await?;
-        while let Some(entry) = entries.next_entry().await? {
-            let path = entry.path();
+        
+        let changed: Vec<PathBuf> = files.iter()
+            .filter(|(file, fingerprint)| !self.is_unchanged(file, fingerprint))
+            .map(|(file, _)| file.clone())
+            .collect();
+        self.load_tool_files(changed, &mut delta).await?;
+        self.scanned = true;
+        if !delta.is_empty() {
+            self.save_index().await;
+        }
+        
+        Ok(delta)
+    }
+    
+    /// Apply filesystem change notifications. Only the given paths (and the tool
+    /// directories below any that are directories) are examined.
+    pub async fn apply_changes(&mut self, paths: &[PathBuf]) -> Result<DiscoveryDelta> {
+        let mut delta = DiscoveryDelta::default();
+        let mut changed = Vec::new();
+        let canonical_dir = std::fs::canonicalize(&self.tools_dir).ok();
+        
+        for path in paths {
+            // Watchers may report absolute paths for a relative tools directory
+            let path = match (path.strip_prefix(&self.tools_dir), &canonical_dir) {
+                (Ok(_), _) => path.clone(),
+                (Err(_), Some(canonical)) => match path.strip_prefix(canonical) {
+                    Ok(relative) => self.tools_dir.join(relative),
+                    Err(_) => continue,
+                },
+                (Err(_), None) => continue,
+            };
             
-            // Only process .tcl files
-            if path.extension().and_then(|s| s.to_str()) == Some("tcl") {
-                if let Some(tool_name) = path.file_stem().and_then(|s| s.to_str()) {
-                    // Read tool metadata from file header
-                    let metadata = self.read_tool_metadata(&path).await?;
-                    
-                    let tool_path = match &namespace {
-                        Namespace::Bin => ToolPath::bin(tool_name),
-                        Namespace::Sbin => ToolPath::sbin(tool_name),
-                        Namespace::Docs => ToolPath::docs(tool_name),
-                        Namespace::User(_) => continue, // Handled separately
-                    };
-                    
-                    let discovered = DiscoveredTool {
-                        path: tool_path.clone(),
-                        description: metadata.description,
-                        file_path: path,
-                        parameters: metadata.parameters,
-                    };
-                    
-                    self.discovered_tools.insert(tool_path, discovered);
+            match fs::metadata(&path).await {
+                Ok(metadata) if metadata.is_dir() => {
+                    if !may_contain_tools(&self.tools_dir, &path) {
+                        continue;
+                    }
+                    for (file, fingerprint) in self.list_tool_files(&path).await? {
+                        if !self.is_unchanged(&file, &fingerprint) {
+                            changed.push(file);
+                        }
+                    }
+                }
+                Ok(metadata) => {
+                    let fingerprint = FileFingerprint::from_metadata(&metadata);
+                    if classify(&self.tools_dir, &path).is_some() && !self.is_unchanged(&path, &fingerprint) {
+                        changed.push(path);
+                    }
+                }
+                Err(_) => {
+                    // Removed: forget the file, or everything below a removed directory
+                    let gone: Vec<PathBuf> = self.files.keys()
+                        .filter(|file| file.starts_with(&path))
+                        .cloned()
+                        .collect();
+                    for file in gone {
+                        self.forget_file(&file, &mut delta);
+                    }
                 }
             }
         }
         
-        Ok(())
+        changed.sort();
+        changed.dedup();
+        self.load_tool_files(changed, &mut delta).await?;
+        if !delta.is_empty() {
+            self.save_index().await;
+        }
+        
+        Ok(delta)
     }
-
-    /// Scan user directories for tools
-    async fn scan_user_directories(&mut self, users_dir: &Path) -> Result<()> {
-        let mut user_entries = fs::read_dir(users_dir).await?;
+    
+    /// List the tool files below `root` that fit the tools directory layout, with
+    /// their fingerprints. Directories are read concurrently, at most
+    /// `DISCOVERY_CONCURRENCY` at a time.
+    async fn list_tool_files(&self, root: &Path) -> Result<Vec<(PathBuf, FileFingerprint)>> {
+        let mut files = Vec::new();
+        let mut pending = vec![root.to_path_buf()];
+        let mut listings = JoinSet::new();
         
-        while let Some(user_entry) = user_entries.next_entry().await? {
-            let user_path = user_entry.path();
-            if !user_path.is_dir() {
-                continue;
+        loop {
+            while listings.len() < DISCOVERY_CONCURRENCY {
+                let dir = match pending.pop() {
+                    Some(dir) => dir,
+                    None => break,
+                };
+                let tools_dir = self.tools_dir.clone();
+                listings.spawn_blocking(move || list_directory(&tools_dir, &dir));
             }
             
-            let user_name = user_entry.file_name().to_string_lossy().to_string();
-            
-            // Scan packages within user directory
-            let mut package_entries = fs::read_dir(&user_path).await?;
-            while let Some(package_entry) = package_entries.next_entry().await? {
-                let package_path = package_entry.path();
-                if !package_path.is_dir() {
-                    continue;
-                }
-                
-                let package_name = package_entry.file_name().to_string_lossy().to_string();
-                
-                // Scan tools within package
-                let mut tool_entries = fs::read_dir(&package_path).await?;
-                while let Some(tool_entry) = tool_entries.next_entry().await? {
-                    let tool_file = tool_entry.path();
-                    
-                    if tool_file.extension().and_then(|s| s.to_str()) == Some("tcl") {
-                        if let Some(tool_name) = tool_file.file_stem().and_then(|s| s.to_str()) {
-                            let metadata = self.read_tool_metadata(&tool_file).await?;
-                            
-                            let tool_path = ToolPath::user(
-                                &user_name,
-                                &package_name,
-                                tool_name,
-                                metadata.version.unwrap_or_else(|| "latest".to_string())
-                            );
-                            
-                            let discovered = DiscoveredTool {
-                                path: tool_path.clone(),
-                                description: metadata.description,
-                                file_path: tool_file,
-                                parameters: metadata.parameters,
-                            };
-                            
-                            self.discovered_tools.insert(tool_path, discovered);
-                        }
-                    }
+            match listings.join_next().await {
+                Some(listing) => {
+                    let (dirs, tool_files) = listing??;
+                    pending.extend(dirs);
+                    files.extend(tool_files);
                 }
+                None => break,
             }
         }
         
-        Ok(())
+        Ok(files)
     }
-
-    /// Read tool metadata from file header comments
-    async fn read_tool_metadata(&self, file_path: &Path) -> Result<ToolMetadata> {
-        let content = fs::read_to_string(file_path).await?;
-        let mut metadata = ToolMetadata::default();
+    
+    /// Whether a tracked file still has the fingerprint it had when it was read
+    fn is_unchanged(&self, file: &Path, fingerprint: &FileFingerprint) -> bool {
+        self.files.get(file)
+            .map(|tracked| tracked.fingerprint == *fingerprint)
+            .unwrap_or(false)
+    }
+    
+    /// Read the headers of the given tool files concurrently, at most
+    /// `DISCOVERY_CONCURRENCY` at a time, and index the tools they provide.
+    async fn load_tool_files(&mut self, files: Vec<PathBuf>, delta: &mut DiscoveryDelta) -> Result<()> {
+        let read = |file: PathBuf| {
+            let header = read_tool_header(&file);
+            (file, header)
+        };
+        for_each_blocking(files, read, |(file, header)| {
+            let (metadata, fingerprint) = header?;
+            self.index_tool_file(&file, metadata, fingerprint, delta);
+            Ok(())
+        }).await
+    }
+    
+    /// Add (or replace) the tool provided by a file whose header has been read
+    fn index_tool_file(
+        &mut self,
+        file: &Path,
+        metadata: ToolMetadata,
+        fingerprint: FileFingerprint,
+        delta: &mut DiscoveryDelta,
+    ) {
+        let location = match classify(&self.tools_dir, file) {
+            Some(location) => location,
+            None => return,
+        };
         
-        // Parse header comments for metadata
-        for line in content.lines() {
-            if !line.trim_start().starts_with('#') {
-                break; // Stop at first non-comment line
+        let tool_path = match location {
+            ToolLocation::System(Namespace::Bin, name) => ToolPath::bin(name),
+            ToolLocation::System(Namespace::Sbin, name) => ToolPath::sbin(name),
+            ToolLocation::System(_, name) => ToolPath::docs(name),
+            ToolLocation::User { user, package, name } => ToolPath::user(
+                user,
+                package,
+                name,
+                metadata.version.unwrap_or_else(|| "latest".to_string())
+            ),
+        };
+        
+        // A changed @version header moves the tool to a new path
+        if let Some(previous) = self.files.get(file) {
+            if previous.tool != tool_path {
+                let previous = previous.tool.clone();
+                self.discovered_tools.remove(&previous);
+                delta.removed.push(previous);
             }
-            
-            let comment = line.trim_start_matches('#').trim();
-            
-            if let Some(desc) = comment.strip_prefix("@description ") {
-                metadata.description = desc.to_string();
-            } else if let Some(version) = comment.strip_prefix("@version ") {
-                metadata.version = Some(version.to_string());
-            } else if let Some(param_line) = comment.strip_prefix("@param ") {
-                // Parse parameter definition: @param name:type:required description
-                if let Some((def, desc)) = param_line.split_once(' ') {
-                    let parts: Vec<&str> = def.split(':').collect();
-                    if parts.len() >= 2 {
-                        let param = ParameterDefinition {
-                            name: parts[0].to_string(),
-                            type_name: parts[1].to_string(),
-                            required: parts.get(2).map(|&r| r == "required").unwrap_or(false),
-                            description: desc.to_string(),
-                        };
-                        metadata.parameters.push(param);
-                    }
+        }
+        
+        let discovered = DiscoveredTool {
+            path: tool_path.clone(),
+            description: metadata.description,
+            file_path: file.to_path_buf(),
+            parameters: metadata.parameters,
+        };
+        
+        self.files.insert(file.to_path_buf(), TrackedFile {
+            fingerprint,
+            tool: tool_path.clone(),
+        });
+        self.discovered_tools.insert(tool_path, discovered.clone());
+        delta.updated.push(discovered);
+    }
+    
+    /// Drop the tool provided by a file that no longer exists
+    fn forget_file(&mut self, file: &Path, delta: &mut DiscoveryDelta) {
+        if let Some(tracked) = self.files.remove(file) {
+            self.discovered_tools.remove(&tracked.tool);
+            self.scripts.remove(file);
+            delta.removed.push(tracked.tool);
+        }
+    }
+    
+    /// Restore the results of the last run from the discovery index.
+    ///
+    /// Every indexed file is stat'ed once (no directory walk): unchanged files are
+    /// reused as-is, changed ones have their header re-read and vanished ones are
+    /// dropped. Returns all tools now known. Does nothing if there is no usable index.
+    pub async fn load_index(&mut self) -> Result<DiscoveryDelta> {
+        let mut delta = DiscoveryDelta::default();
+        let index_path = match &self.index_path {
+            Some(index_path) => index_path.clone(),
+            None => return Ok(delta),
+        };
+        
+        let content = match fs::read(&index_path).await {
+            Ok(content) => content,
+            Err(e) if e.kind() == std::io::ErrorKind::NotFound => return Ok(delta),
+            Err(e) => return Err(e.into()),
+        };
+        let index: DiscoveryIndex = match serde_json::from_slice(&content) {
+            Ok(index) => index,
+            Err(e) => {
+                tracing::warn!("Ignoring unreadable discovery index {}: {}", index_path.display(), e);
+                return Ok(delta);
+            }
+        };
+        if index.version != DISCOVERY_INDEX_VERSION || index.tools_dir != self.index_tools_dir() {
+            tracing::info!("Discovery index {} is for another tools directory, ignoring it", index_path.display());
+            return Ok(delta);
+        }
+        
+        let stat = |entry: IndexedFile| {
+            let current = std::fs::metadata(&entry.tool.file_path)
+                .ok()
+                .map(|metadata| FileFingerprint::from_metadata(&metadata));
+            (entry, current)
+        };
+        let mut changed = Vec::new();
+        let mut dropped = 0;
+        for_each_blocking(index.files, stat, |(entry, current)| {
+            match current {
+                Some(fingerprint) if fingerprint == entry.fingerprint => {
+                    let file = entry.tool.file_path.clone();
+                    self.files.insert(file, TrackedFile {
+                        fingerprint,
+                        tool: entry.tool.path.clone(),
+                    });
+                    self.discovered_tools.insert(entry.tool.path.clone(), entry.tool.clone());
+                    delta.updated.push(entry.tool);
                 }
+                Some(_) => changed.push(entry.tool.file_path),
+                None => dropped += 1,
             }
+            Ok(())
+        }).await?;
+        
+        let reused = delta.updated.len();
+        self.load_tool_files(changed, &mut delta).await?;
+        self.scanned = true;
+        tracing::info!(
+            "Loaded {} tools from discovery index ({} re-read, {} removed)",
+            delta.updated.len(), delta.updated.len() - reused, dropped
+        );
+        if reused != delta.updated.len() || dropped > 0 {
+            self.save_index().await;
         }
         
-        if metadata.description.is_empty() {
-            metadata.description = format!("Tool from {}", file_path.display());
+        Ok(delta)
+    }
+    
+    /// Write the current discovery results to the index, if one is configured.
+    /// Failures are logged; the index is only an optimisation.
+    async fn save_index(&self) {
+        let index_path = match &self.index_path {
+            Some(index_path) => index_path,
+            None => return,
+        };
+        
+        let index = DiscoveryIndex {
+            version: DISCOVERY_INDEX_VERSION,
+            tools_dir: self.index_tools_dir(),
+            files: self.files.values()
+                .filter_map(|tracked| {
+                    self.discovered_tools.get(&tracked.tool).map(|tool| IndexedFile {
+                        fingerprint: tracked.fingerprint,
+                        tool: tool.clone(),
+                    })
+                })
+                .collect(),
+        };
+        
+        if let Err(e) = write_index(index_path, &index).await {
+            tracing::warn!("Failed to save discovery index {}: {}", index_path.display(), e);
+        }
+    }
+    
+    /// Tools directory as recorded in the index, absolute where possible
+    fn index_tools_dir(&self) -> PathBuf {
+        std::fs::canonicalize(&self.tools_dir).unwrap_or_else(|_| self.tools_dir.clone())
+    }
+}
+
+/// Write the discovery index through a temporary file so a crash never leaves a torn index
+async fn write_index(index_path: &Path, index: &DiscoveryIndex) -> Result<()> {
+    if let Some(parent) = index_path.parent() {
+        fs::create_dir_all(parent).await?;
+    }
+    let temp_path = index_path.with_extension("tmp");
+    fs::write(&temp_path, serde_json::to_vec(index)?).await?;
+    fs::rename(&temp_path, index_path).await?;
+    Ok(())
+}
+
+/// Run blocking filesystem work for each item on the blocking pool, at most
+/// `DISCOVERY_CONCURRENCY` at a time, handing results to `on_result` as they complete
+async fn for_each_blocking<T, R>(
+    items: impl IntoIterator<Item = T>,
+    work: fn(T) -> R,
+    mut on_result: impl FnMut(R) -> Result<()>,
+) -> Result<()>
+where
+    T: Send + 'static,
+    R: Send + 'static,
+{
+    let mut items = items.into_iter();
+    let mut tasks = JoinSet::new();
+    
+    loop {
+        while tasks.len() < DISCOVERY_CONCURRENCY {
+            let item = match items.next() {
+                Some(item) => item,
+                None => break,
+            };
+            tasks.spawn_blocking(move || work(item));
+        }
+        
+        match tasks.join_next().await {
+            Some(result) => on_result(result?)?,
+            None => break,
+        }
+    }
+    
+    Ok(())
+}
+
+/// Directory components of `path` relative to the tools directory
+fn relative_components<'a>(tools_dir: &Path, path: &'a Path) -> Option<Vec<&'a str>> {
+    path.strip_prefix(tools_dir).ok()?
+        .iter()
+        .map(|component| component.to_str())
+        .collect()
+}
+
+/// Whether a directory is one of bin, sbin, docs or part of users/<user>/<package>
+fn may_contain_tools(tools_dir: &Path, dir: &Path) -> bool {
+    match relative_components(tools_dir, dir).as_deref() {
+        Some([]) | Some(["users"]) | Some(["users", _]) | Some(["users", _, _]) => true,
+        Some(["bin"]) | Some(["sbin"]) | Some(["docs"]) => true,
+        _ => false,
+    }
+}
+
+/// Work out which tool a `.tcl` file provides from its location
+fn classify(tools_dir: &Path, file: &Path) -> Option<ToolLocation> {
+    if file.extension().and_then(|s| s.to_str()) != Some("tcl") {
+        return None;
+    }
+    let name = file.file_stem()?.to_str()?.to_string();
+    
+    match relative_components(tools_dir, file.parent()?)?.as_slice() {
+        ["bin"] => Some(ToolLocation::System(Namespace::Bin, name)),
+        ["sbin"] => Some(ToolLocation::System(Namespace::Sbin, name)),
+        ["docs"] => Some(ToolLocation::System(Namespace::Docs, name)),
+        ["users", user, package] => Some(ToolLocation::User {
+            user: user.to_string(),
+            package: package.to_string(),
+            name,
+        }),
+        _ => None,
+    }
+}
+
+/// Read one directory, returning the subdirectories worth descending into and the
+/// tool files it holds
+fn list_directory(tools_dir: &Path, dir: &Path) -> Result<(Vec<PathBuf>, Vec<(PathBuf, FileFingerprint)>)> {
+    let mut dirs = Vec::new();
+    let mut files = Vec::new();
+    if !dir.exists() {
+        return Ok((dirs, files));
+    }
+    
+    for entry in std::fs::read_dir(dir)? {
+        let entry = entry?;
+        let path = entry.path();
+        // Follow symlinks, as tool directories are often linked in; skip dangling ones
+        let metadata = match std::fs::metadata(&path) {
+            Ok(metadata) => metadata,
+            Err(_) => continue,
+        };
+        if metadata.is_dir() {
+            if may_contain_tools(tools_dir, &path) {
+                dirs.push(path);
+            }
+        } else if classify(tools_dir, &path).is_some() {
+            files.push((path, FileFingerprint::from_metadata(&metadata)));
+        }
+    }
+    
+    Ok((dirs, files))
+}
+
+/// Read tool metadata from the leading comment block of a tool file. Only the
+/// header is read; the body is loaded on demand by the `ScriptStore`.
+fn read_tool_header(file_path: &Path) -> Result<(ToolMetadata, FileFingerprint)> {
+    let file = std::fs::File::open(file_path)?;
+    let fingerprint = FileFingerprint::from_metadata(&file.metadata()?);
+    let mut metadata = ToolMetadata::default();
+    
+    // Parse header comments for metadata
+    for line in BufReader::new(file).lines() {
+        let line = line?;
+        if !line.trim_start().starts_with('#') {
+            break; // Stop at first non-comment line
         }
         
-        Ok(metadata)
+        let comment = line.trim_start_matches('#').trim();
+        
+        if let Some(desc) = comment.strip_prefix("@description ") {
+            metadata.description = desc.to_string();
+        } else if let Some(version) = comment.strip_prefix("@version ") {
+            metadata.version = Some(version.to_string());
+        } else if let Some(param_line) = comment.strip_prefix("@param ") {
+            // Parse parameter definition: @param name:type:required description
+            if let Some((def, desc)) = param_line.split_once(' ') {
+                let parts: Vec<&str> = def.split(':').collect();
+                if parts.len() >= 2 {
+                    let param = ParameterDefinition {
+                        name: parts[0].to_string(),
+                        type_name: parts[1].to_string(),
+                        required: parts.get(2).map(|&r| r == "required").unwrap_or(false),
+                        description: desc.to_string(),
+                    };
+                    metadata.parameters.push(param);
+                }
+            }
+        }
     }
+    
+    if metadata.description.is_empty() {
+        metadata.description = format!("Tool from {}", file_path.display());
+    }
+    
+    Ok((metadata, fingerprint))
+}
+
+/// How often the tools directory is rescanned when native notifications are unavailable
+pub const WATCH_POLL_INTERVAL: Duration = Duration::from_secs(5);
+
+/// Quiet period used to coalesce bursts of filesystem events into one batch
+const WATCH_DEBOUNCE: Duration = Duration::from_millis(200);
 
+/// A unit of work produced by a `ToolWatcher`
+#[derive(Debug)]
+pub enum WatchBatch {
+    /// These paths changed; pass them to `ToolDiscovery::apply_changes`
+    Paths(Vec<PathBuf>),
+    /// No event detail is available; run `ToolDiscovery::refresh`
+    Rescan,
+}
+
+/// Watches the tools directory for changes, using inotify (or the platform
+/// equivalent) when built with the `watch` feature and polling otherwise.
+pub struct ToolWatcher {
+    source: WatchSource,
+}
 
+enum WatchSource {
+    #[cfg(feature = "watch")]
+    Native {
+        _watcher: notify::RecommendedWatcher,
+        events: mpsc::UnboundedReceiver<PathBuf>,
+    },
+    Polling {
+        interval: Duration,
+    },
+}
+
+impl ToolWatcher {
+    pub fn new(tools_dir: &Path, poll_interval: Duration) -> Self {
+        match Self::native_source(tools_dir) {
+            Ok(source) => {
+                tracing::info!("Watching {} for tool changes", tools_dir.display());
+                Self { source }
+            }
+            Err(e) => {
+                tracing::info!(
+                    "Native file watching unavailable for {} ({}), polling every {:?}",
+                    tools_dir.display(), e, poll_interval
+                );
+                Self { source: WatchSource::Polling { interval: poll_interval } }
+            }
+        }
+    }
+    
+    #[cfg(feature = "watch")]
+    fn native_source(tools_dir: &Path) -> Result<WatchSource> {
+        use notify::{RecursiveMode, Watcher};
+        
+        let (tx, events) = mpsc::unbounded_channel();
+        let mut watcher = notify::recommended_watcher(move |result: notify::Result<notify::Event>| {
+            if let Ok(event) = result {
+                for path in event.paths {
+                    let _ = tx.send(path);
+                }
+            }
+        })?;
+        watcher.watch(tools_dir, RecursiveMode::Recursive)?;
+        
+        Ok(WatchSource::Native { _watcher: watcher, events })
+    }
+    
+    #[cfg(not(feature = "watch"))]
+    fn native_source(_tools_dir: &Path) -> Result<WatchSource> {
+        Err(anyhow::anyhow!("built without the 'watch' feature"))
+    }
+    
+    /// Wait for the next batch of changes. Returns None once the watcher has stopped.
+    pub async fn next_batch(&mut self) -> Option<WatchBatch> {
+        match &mut self.source {
+            #[cfg(feature = "watch")]
+            WatchSource::Native { events, .. } => {
+                let mut paths = HashSet::new();
+                paths.insert(events.recv().await?);
+                
+                // Editors often save in several steps; wait for things to settle
+                while let Ok(Some(path)) = tokio::time::timeout(WATCH_DEBOUNCE, events.recv()).await {
+                    paths.insert(path);
+                }
+                Some(WatchBatch::Paths(paths.into_iter().collect()))
+            }
+            WatchSource::Polling { interval } => {
+                tokio::time::sleep(*interval).await;
+                Some(WatchBatch::Rescan)
+            }
+        }
+    }
 }
 
 #[derive(Debug, Default)]
@@ -235,11 +877,138 @@ puts [glob -directory $path *]
         let tools = discovery.discover_tools().await.unwrap();
         
         assert_eq!(tools.len(), 1);
-        assert_eq!(tools[0].path.name, "list_dir");
+        assert_eq!(tools[0].path.name(), "list_dir");
         assert_eq!(tools[0].description, "List directory contents");
         assert_eq!(tools[0].parameters.len(), 1);
         assert_eq!(tools[0].parameters[0].name, "path");
         assert_eq!(tools[0].parameters[0].type_name, "string");
         assert!(tools[0].parameters[0].required);
     }
-}
\ No newline at end of file
+    
+    #[tokio::test]
+    async fn test_script_store_serves_and_revalidates() {
+        let temp_dir = tempfile::tempdir().unwrap();
+        let bin_dir = temp_dir.path().join("tools").join("bin");
+        fs::create_dir_all(&bin_dir).await.unwrap();
+        let tool_path = bin_dir.join("hello.tcl");
+        fs::write(&tool_path, "# @description Say hello\nreturn hello\n").await.unwrap();
+        
+        let store = Arc::new(ScriptStore::new(1));
+        let mut discovery = ToolDiscovery::new()
+            .with_tools_dir(temp_dir.path().join("tools"))
+            .with_script_store(store.clone());
+        discovery.discover_tools().await.unwrap();
+        // Discovery only reads headers; bodies are loaded on first use
+        assert_eq!(store.len(), 0);
+        
+        let script = store.load(&tool_path).await.unwrap();
+        assert!(script.source.contains("return hello"));
+        
+        // An edited file is picked up once its fingerprint changes
+        fs::write(&tool_path, "# @description Say hello\nreturn {hello again}\n").await.unwrap();
+        store.inner.lock().unwrap().entries.get_mut(&tool_path).unwrap().validated_at -= SCRIPT_REVALIDATE_INTERVAL;
+        let script = store.load(&tool_path).await.unwrap();
+        assert!(script.source.contains("hello again"));
+        
+        // Capacity is bounded
+        let other = bin_dir.join("other.tcl");
+        fs::write(&other, "return other\n").await.unwrap();
+        store.load(&other).await.unwrap();
+        assert_eq!(store.len(), 1);
+    }
+
+    #[tokio::test]
+    async fn test_discovery_reads_only_header() {
+        let temp_dir = tempfile::tempdir().unwrap();
+        let tools_dir = temp_dir.path().join("tools");
+        let package_dir = tools_dir.join("users").join("bob").join("bin_data");
+        fs::create_dir_all(&package_dir).await.unwrap();
+        
+        // The body is not valid UTF-8, which would fail a whole-file read
+        let mut content = b"# @description Binary payload\n# @version 0.1\nreturn \n".to_vec();
+        content.extend_from_slice(&[0xff, 0xfe, 0xfd]);
+        fs::write(package_dir.join("blob.tcl"), content).await.unwrap();
+        
+        let mut discovery = ToolDiscovery::new().with_tools_dir(tools_dir);
+        let tools = discovery.discover_tools().await.unwrap();
+        assert_eq!(tools.len(), 1);
+        assert_eq!(tools[0].path, ToolPath::user("bob", "bin_data", "blob", "0.1"));
+        assert_eq!(tools[0].description, "Binary payload");
+    }
+    
+    #[tokio::test]
+    async fn test_incremental_discovery() {
+        let temp_dir = tempfile::tempdir().unwrap();
+        let tools_dir = temp_dir.path().join("tools");
+        let package_dir = tools_dir.join("users").join("alice").join("utils");
+        fs::create_dir_all(&package_dir).await.unwrap();
+        let tool_file = package_dir.join("greet.tcl");
+        fs::write(&tool_file, "# @version 1.0\nreturn hi\n").await.unwrap();
+        
+        let mut discovery = ToolDiscovery::new().with_tools_dir(tools_dir.clone());
+        assert!(!discovery.has_scanned());
+        assert_eq!(discovery.discover_tools().await.unwrap().len(), 1);
+        
+        // Nothing changed, nothing re-read
+        assert!(discovery.refresh().await.unwrap().is_empty());
+        
+        // New files are picked up; files outside the layout are ignored
+        let bin_dir = tools_dir.join("bin");
+        fs::create_dir_all(&bin_dir).await.unwrap();
+        fs::write(bin_dir.join("hello.tcl"), "return hello\n").await.unwrap();
+        fs::write(tools_dir.join("stray.tcl"), "return stray\n").await.unwrap();
+        let delta = discovery.refresh().await.unwrap();
+        assert_eq!(delta.updated.len(), 1);
+        assert_eq!(delta.updated[0].path, ToolPath::bin("hello"));
+        
+        // A version bump replaces the old path
+        fs::write(&tool_file, "# @version 2.0\nreturn {hi there}\n").await.unwrap();
+        let delta = discovery.apply_changes(&[tool_file.clone()]).await.unwrap();
+        assert_eq!(delta.removed, vec![ToolPath::user("alice", "utils", "greet", "1.0")]);
+        assert_eq!(delta.updated[0].path, ToolPath::user("alice", "utils", "greet", "2.0"));
+        
+        // Removing a directory removes everything below it
+        fs::remove_dir_all(tools_dir.join("users")).await.unwrap();
+        let delta = discovery.apply_changes(&[tools_dir.join("users").join("alice")]).await.unwrap();
+        assert_eq!(delta.removed, vec![ToolPath::user("alice", "utils", "greet", "2.0")]);
+        assert_eq!(discovery.discovered_tools.len(), 1);
+    }
+
+    #[tokio::test]
+    async fn test_discovery_index_round_trip() {
+        let temp_dir = tempfile::tempdir().unwrap();
+        let tools_dir = temp_dir.path().join("tools");
+        let index_path = temp_dir.path().join("discovery-index.json");
+        let bin_dir = tools_dir.join("bin");
+        fs::create_dir_all(&bin_dir).await.unwrap();
+        fs::write(bin_dir.join("keep.tcl"), "# @description Kept\nreturn keep\n").await.unwrap();
+        fs::write(bin_dir.join("edit.tcl"), "# @description Before\nreturn edit\n").await.unwrap();
+        fs::write(bin_dir.join("gone.tcl"), "return gone\n").await.unwrap();
+        
+        let mut discovery = ToolDiscovery::new()
+            .with_tools_dir(tools_dir.clone())
+            .with_index_path(index_path.clone());
+        assert_eq!(discovery.discover_tools().await.unwrap().len(), 3);
+        assert!(index_path.exists());
+        
+        // Change the tree while "stopped"
+        fs::write(bin_dir.join("edit.tcl"), "# @description After the edit\nreturn edit\n").await.unwrap();
+        fs::remove_file(bin_dir.join("gone.tcl")).await.unwrap();
+        
+        let mut restarted = ToolDiscovery::new()
+            .with_tools_dir(tools_dir.clone())
+            .with_index_path(index_path.clone());
+        let delta = restarted.load_index().await.unwrap();
+        assert!(restarted.has_scanned());
+        assert_eq!(delta.updated.len(), 2);
+        assert_eq!(restarted.discovered_tools[&ToolPath::bin("edit")].description, "After the edit");
+        assert!(!restarted.discovered_tools.contains_key(&ToolPath::bin("gone")));
+        
+        // An index for a different tools directory is ignored
+        let mut elsewhere = ToolDiscovery::new()
+            .with_tools_dir(temp_dir.path().join("other"))
+            .with_index_path(index_path);
+        assert!(elsewhere.load_index().await.unwrap().is_empty());
+        assert!(!elsewhere.has_scanned());
+    }
+}
@@ -0,0 +1,490 @@
+use serde_json::{json, Value};
+use std::collections::{BTreeMap, BTreeSet, HashMap};
+use std::ops::Bound;
+use std::sync::{Arc, Mutex};
+
+use crate::namespace::{Namespace, ToolPath};
+use crate::persistence::calculate_checksum;
+use crate::tcl_tools::ParameterDefinition;
+
+/// Default number of user and discovered tools returned per `tools/list` page
+pub const DEFAULT_LIST_PAGE_SIZE: usize = 1000;
+
+/// MCP tool entries for user and discovered tools, kept sorted by tool path and
+/// updated in place as tools are added and removed
+#[derive(Debug, Clone, Default)]
+pub struct ToolCatalog {
+    entries: BTreeMap<Arc<str>, CatalogEntry>,
+    index: PathIndex,
+    /// MCP name -> tools, so `tools/call` resolves a name with one lookup. Names are
+    /// not guaranteed unique ("1.0" and "1_0" both map to "v1_0"), so every tool with
+    /// the name is kept, in the order they were added
+    by_mcp_name: HashMap<Box<str>, Vec<ToolPath>>,
+}
+
+#[derive(Debug, Clone)]
+struct CatalogEntry {
+    path: ToolPath,
+    tool: Value,
+}
+
+impl ToolCatalog {
+    pub fn new() -> Self {
+        Self::default()
+    }
+
+    /// Add or replace the entry for a tool
+    pub fn insert(&mut self, path: &ToolPath, description: &str, parameters: &[ParameterDefinition]) {
+        let key: Arc<str> = Arc::from(path.as_str());
+        let entry = CatalogEntry {
+            path: path.clone(),
+            tool: tool_entry(path, description, parameters),
+        };
+
+        if self.entries.insert(key.clone(), entry).is_none() {
+            self.index.insert(path, key);
+            self.by_mcp_name.entry(path.mcp_name().into()).or_default().push(path.clone());
+        }
+    }
+
+    pub fn remove(&mut self, path: &ToolPath) {
+        if let Some((key, _)) = self.entries.remove_entry(path.as_str()) {
+            self.index.remove(path, &key);
+            if let Some(paths) = self.by_mcp_name.get_mut(path.mcp_name()) {
+                paths.retain(|other| other != path);
+                if paths.is_empty() {
+                    self.by_mcp_name.remove(path.mcp_name());
+                }
+            }
+        }
+    }
+
+    pub fn contains(&self, path: &ToolPath) -> bool {
+        self.entries.contains_key(path.as_str())
+    }
+
+    /// The user or discovered tool with the given MCP name. When several tools share
+    /// the name, the one added first wins, so a later tool cannot take it over
+    pub fn resolve(&self, mcp_name: &str) -> Option<&ToolPath> {
+        self.by_mcp_name.get(mcp_name).and_then(|paths| paths.first())
+    }
+
+    pub fn len(&self) -> usize {
+        self.entries.len()
+    }
+
+    /// Paths of the tools in `namespace` (if given) whose path contains `filter`
+    /// (if given), in sorted order.
+    ///
+    /// Only the namespace's own tools, or the tools sharing the filter's rarest
+    /// trigram, are looked at; filters shorter than a trigram fall back to a scan.
+    pub fn search(&self, namespace: Option<&str>, filter: Option<&str>) -> Vec<&str> {
+        let filter = filter.filter(|f| !f.is_empty());
+        let matches_filter = |key: &str| filter.map_or(true, |f| key.contains(f));
+
+        if let Some(candidates) = filter.and_then(|f| self.index.trigram_candidates(f)) {
+            return candidates
+                .filter(|key| matches_filter(key))
+                .filter(|key| namespace.map_or(true, |ns| {
+                    self.entries.get(*key).map_or(false, |entry| namespace_key(&entry.path) == ns)
+                }))
+                .collect();
+        }
+
+        let mut found: Vec<&str> = match namespace {
+            Some(ns) => self.index.in_namespace(ns).filter(|key| matches_filter(key)).collect(),
+            None => self.entries.keys().map(|key| key.as_ref()).filter(|key| matches_filter(key)).collect(),
+        };
+        found.sort_unstable();
+        found
+    }
+
+    /// Up to `limit` entries (0 = all) following the tool named by `cursor`.
+    ///
+    /// Cursors are tool paths, so a cursor stays valid when tools are added or
+    /// removed between pages.
+    pub fn page(&self, generation: u64, cursor: Option<&str>, limit: usize) -> ToolPage {
+        let limit = if limit == 0 { usize::MAX } else { limit };
+        let mut entries = match cursor {
+            Some(cursor) => self.entries.range::<str, _>((Bound::Excluded(cursor), Bound::Unbounded)),
+            None => self.entries.range::<str, _>(..),
+        };
+
+        let mut tools = Vec::new();
+        let mut last = None;
+        for (key, entry) in entries.by_ref().take(limit) {
+            tools.push(entry.tool.clone());
+            last = Some(key);
+        }
+
+        let next_cursor = match entries.next() {
+            Some(_) => last.map(|key| key.to_string()),
+            None => None,
+        };
+
+        ToolPage {
+            generation,
+            cursor: cursor.map(str::to_string),
+            tools,
+            next_cursor,
+        }
+    }
+}
+
+/// Secondary indexes over catalog paths, used by `tcl_tool_list` filters
+#[derive(Debug, Clone, Default)]
+struct PathIndex {
+    /// Namespace -> package ("" for tools without one) -> paths
+    namespaces: HashMap<String, BTreeMap<String, BTreeSet<Arc<str>>>>,
+    /// Every three-byte window of a path -> paths containing it
+    trigrams: HashMap<[u8; 3], BTreeSet<Arc<str>>>,
+}
+
+impl PathIndex {
+    fn insert(&mut self, path: &ToolPath, key: Arc<str>) {
+        for trigram in trigrams(&key) {
+            self.trigrams.entry(trigram).or_default().insert(key.clone());
+        }
+
+        self.namespaces
+            .entry(namespace_key(path).to_string())
+            .or_default()
+            .entry(path.package().unwrap_or_default().to_string())
+            .or_default()
+            .insert(key);
+    }
+
+    fn remove(&mut self, path: &ToolPath, key: &str) {
+        for trigram in trigrams(key) {
+            if let Some(keys) = self.trigrams.get_mut(&trigram) {
+                keys.remove(key);
+                if keys.is_empty() {
+                    self.trigrams.remove(&trigram);
+                }
+            }
+        }
+
+        let namespace = namespace_key(path);
+        if let Some(packages) = self.namespaces.get_mut(namespace) {
+            let package = path.package().unwrap_or("");
+            if let Some(keys) = packages.get_mut(package) {
+                keys.remove(key);
+                if keys.is_empty() {
+                    packages.remove(package);
+                }
+            }
+            if packages.is_empty() {
+                self.namespaces.remove(namespace);
+            }
+        }
+    }
+
+    /// Paths in a namespace, grouped by package
+    fn in_namespace<'a>(&'a self, namespace: &str) -> impl Iterator<Item = &'a str> + 'a {
+        self.namespaces
+            .get(namespace)
+            .into_iter()
+            .flat_map(|packages| packages.values())
+            .flat_map(|keys| keys.iter().map(|key| key.as_ref()))
+    }
+
+    /// Sorted paths sharing the rarest trigram of `filter`; a superset of the paths
+    /// containing it. `None` if the filter is too short to have a trigram.
+    fn trigram_candidates<'a>(&'a self, filter: &str) -> Option<Box<dyn Iterator<Item = &'a str> + 'a>> {
+        let mut rarest: Option<&BTreeSet<Arc<str>>> = None;
+        for trigram in trigrams(filter) {
+            match self.trigrams.get(&trigram) {
+                Some(keys) => {
+                    if rarest.map_or(true, |rarest| keys.len() < rarest.len()) {
+                        rarest = Some(keys);
+                    }
+                }
+                // No path contains this trigram, so none contains the filter
+                None => return Some(Box::new(std::iter::empty())),
+            }
+        }
+
+        rarest.map(|keys| Box::new(keys.iter().map(|key| key.as_ref())) as Box<dyn Iterator<Item = &'a str> + 'a>)
+    }
+}
+
+/// The `tcl_tool_list` namespace argument that selects a tool
+fn namespace_key(path: &ToolPath) -> &str {
+    match path.namespace() {
+        Namespace::Bin => "bin",
+        Namespace::Sbin => "sbin",
+        Namespace::Docs => "docs",
+        Namespace::User(user) => user,
+    }
+}
+
+fn trigrams(text: &str) -> impl Iterator<Item = [u8; 3]> + '_ {
+    text.as_bytes().windows(3).map(|window| [window[0], window[1], window[2]])
+}
+
+/// One page of catalog entries
+#[derive(Debug)]
+pub struct ToolPage {
+    /// Registry generation the page was taken from
+    pub generation: u64,
+    /// Cursor the page was requested with (`None` for the first page)
+    pub cursor: Option<String>,
+    pub tools: Vec<Value>,
+    /// Cursor of the following page, if there is one
+    pub next_cursor: Option<String>,
+}
+
+/// Build the `tools/list` entry for a tool with the given parameters
+pub fn tool_entry(path: &ToolPath, description: &str, parameters: &[ParameterDefinition]) -> Value {
+    let mut properties = serde_json::Map::new();
+    let mut required = Vec::new();
+
+    for param in parameters {
+        properties.insert(
+            param.name.clone(),
+            json!({
+                "type": json_schema_type(&param.type_name),
+                "description": param.description,
+            }),
+        );
+
+        if param.required {
+            required.push(param.name.clone());
+        }
+    }
+
+    let mut schema_obj = serde_json::Map::new();
+    schema_obj.insert("$schema".to_string(), json!("https://json-schema.org/draft/2020-12/schema"));
+    schema_obj.insert("type".to_string(), json!("object"));
+    schema_obj.insert("properties".to_string(), json!(properties));
+
+    // Only add "required" array if there are required parameters
+    if !required.is_empty() {
+        schema_obj.insert("required".to_string(), json!(required));
+    }
+
+    system_tool_entry(path, description, Value::Object(schema_obj))
+}
+
+/// Build the `tools/list` entry for a tool with a hand-written schema
+pub fn system_tool_entry(path: &ToolPath, description: &str, input_schema: Value) -> Value {
+    json!({
+        "name": path.mcp_name(),
+        "description": format!("{} [{}]", description, path),
+        "inputSchema": input_schema,
+    })
+}
+
+/// Validate and normalize a parameter type name to a JSON Schema type
+fn json_schema_type(type_name: &str) -> &'static str {
+    match type_name.to_lowercase().as_str() {
+        "string" | "str" | "text" => "string",
+        "number" | "float" | "double" | "real" => "number",
+        "integer" | "int" | "long" => "integer",
+        "boolean" | "bool" => "boolean",
+        "array" | "list" => "array",
+        "object" | "dict" | "map" => "object",
+        "null" | "nil" | "none" => "null",
+        // Default to string for unknown types to maintain compatibility
+        _ => "string"
+    }
+}
+
+/// A complete `tools/list` result, serialized once
+#[derive(Debug)]
+pub struct RenderedToolList {
+    pub generation: u64,
+    pub value: Value,
+    /// `value` serialized as JSON
+    pub body: String,
+    /// Strong HTTP entity tag for `body`
+    pub etag: String,
+}
+
+/// The `tools/list` result of one server: its fixed system tools followed by the
+/// catalog, re-rendered only when the catalog's generation changes
+pub struct ToolListCache {
+    system_tools: Vec<Value>,
+    rendered: Mutex<Option<Arc<RenderedToolList>>>,
+}
+
+impl ToolListCache {
+    pub fn new(system_tools: Vec<Value>) -> Self {
+        Self {
+            system_tools,
+            rendered: Mutex::new(None),
+        }
+    }
+
+    /// Render a page of the listing. The first page also carries the system tools
+    /// and is cached until the registry generation changes.
+    pub fn render(&self, page: &ToolPage) -> Arc<RenderedToolList> {
+        if page.cursor.is_some() {
+            return Arc::new(render_listing(page, Vec::new()));
+        }
+
+        let mut rendered = self.rendered.lock().unwrap();
+        if let Some(cached) = rendered.as_ref() {
+            if cached.generation == page.generation {
+                return cached.clone();
+            }
+        }
+
+        let listing = Arc::new(render_listing(page, self.system_tools.clone()));
+        *rendered = Some(listing.clone());
+        listing
+    }
+
+    /// The listing without user or discovered tools, for when the registry is unavailable
+    pub fn system_only(&self) -> Value {
+        json!({ "tools": self.system_tools })
+    }
+}
+
+fn render_listing(page: &ToolPage, mut tools: Vec<Value>) -> RenderedToolList {
+    tools.extend(page.tools.iter().cloned());
+    let mut value = json!({ "tools": tools });
+    if let Some(ref next_cursor) = page.next_cursor {
+        value["nextCursor"] = json!(next_cursor);
+    }
+
+    let body = value.to_string();
+    RenderedToolList {
+        generation: page.generation,
+        etag: format!("\"{}-{}\"", page.generation, calculate_checksum(&body)),
+        value,
+        body,
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    fn param(name: &str, type_name: &str, required: bool) -> ParameterDefinition {
+        ParameterDefinition {
+            name: name.to_string(),
+            description: format!("The {}", name),
+            required,
+            type_name: type_name.to_string(),
+        }
+    }
+
+    #[test]
+    fn test_rendered_listing_is_cached_per_generation() {
+        let system = vec![system_tool_entry(&ToolPath::bin("tcl_execute"), "Execute", json!({"type": "object"}))];
+        let cache = ToolListCache::new(system);
+
+        let zeta = ToolPath::user("alice", "utils", "zeta", "1.0");
+        let alpha = ToolPath::user("alice", "utils", "alpha", "1.0");
+        let mut catalog = ToolCatalog::new();
+        catalog.insert(&zeta, "Last", &[param("count", "int", true), param("label", "whatever", false)]);
+        catalog.insert(&alpha, "First", &[]);
+
+        let first = cache.render(&catalog.page(1, None, 0));
+        let tools = first.value["tools"].as_array().unwrap();
+        assert_eq!(tools.len(), 3);
+        assert_eq!(tools[1]["name"], alpha.to_mcp_name());
+        assert_eq!(tools[2]["inputSchema"]["properties"]["count"]["type"], "integer");
+        assert_eq!(tools[2]["inputSchema"]["properties"]["label"]["type"], "string");
+        assert_eq!(tools[2]["inputSchema"]["required"], json!(["count"]));
+        assert!(tools[1]["inputSchema"].get("required").is_none());
+        assert!(first.value.get("nextCursor").is_none());
+
+        // Same generation: same rendering, no rebuild
+        assert!(Arc::ptr_eq(&first, &cache.render(&catalog.page(1, None, 0))));
+
+        // New generation: new rendering and entity tag
+        catalog.remove(&zeta);
+        catalog.remove(&alpha);
+        let second = cache.render(&catalog.page(2, None, 0));
+        assert_eq!(second.value["tools"].as_array().unwrap().len(), 1);
+        assert_ne!(first.etag, second.etag);
+    }
+
+    #[test]
+    fn test_catalog_pages_follow_cursor() {
+        let mut catalog = ToolCatalog::new();
+        for i in 0..5 {
+            catalog.insert(&ToolPath::user("alice", "utils", format!("tool{}", i), "1.0"), "Tool", &[]);
+        }
+
+        let page = catalog.page(1, None, 2);
+        assert_eq!(page.tools.len(), 2);
+        assert_eq!(page.tools[0]["name"], ToolPath::user("alice", "utils", "tool0", "1.0").to_mcp_name());
+        let cursor = page.next_cursor.unwrap();
+
+        // A tool removed before the cursor does not shift the following pages
+        catalog.remove(&ToolPath::user("alice", "utils", "tool0", "1.0"));
+        let page = catalog.page(2, Some(&cursor), 2);
+        assert_eq!(page.tools[0]["name"], ToolPath::user("alice", "utils", "tool2", "1.0").to_mcp_name());
+
+        let page = catalog.page(2, page.next_cursor.as_deref(), 2);
+        assert_eq!(page.tools.len(), 1);
+        assert!(page.next_cursor.is_none());
+
+        let rendered = ToolListCache::new(Vec::new()).render(&catalog.page(2, None, 3));
+        assert!(rendered.value["nextCursor"].is_string());
+    }
+
+    #[test]
+    fn test_search_by_namespace_and_filter() {
+        let mut catalog = ToolCatalog::new();
+        catalog.insert(&ToolPath::user("alice", "utils", "reverse", "1.0"), "Reverse", &[]);
+        catalog.insert(&ToolPath::user("alice", "text", "upper", "latest"), "Upper", &[]);
+        catalog.insert(&ToolPath::user("bob", "utils", "reverse", "latest"), "Reverse", &[]);
+        catalog.insert(&ToolPath::bin("list_dir"), "List", &[]);
+
+        assert_eq!(catalog.search(Some("alice"), None), vec!["/alice/text/upper", "/alice/utils/reverse:1.0"]);
+        assert_eq!(catalog.search(None, Some("reverse")), vec!["/alice/utils/reverse:1.0", "/bob/utils/reverse"]);
+        assert_eq!(catalog.search(Some("bob"), Some("reverse")), vec!["/bob/utils/reverse"]);
+        assert_eq!(catalog.search(Some("bin"), None), vec!["/bin/list_dir"]);
+        assert!(catalog.search(None, Some("missing")).is_empty());
+        assert!(catalog.search(Some("carol"), None).is_empty());
+
+        // Filters shorter than a trigram are still honoured
+        assert_eq!(catalog.search(None, Some("up")), vec!["/alice/text/upper"]);
+        assert_eq!(catalog.search(None, None).len(), 4);
+
+        catalog.remove(&ToolPath::user("bob", "utils", "reverse", "latest"));
+        assert_eq!(catalog.search(None, Some("reverse")), vec!["/alice/utils/reverse:1.0"]);
+        assert!(catalog.search(Some("bob"), None).is_empty());
+        assert!(catalog.index.namespaces.get("bob").is_none());
+    }
+
+    #[test]
+    fn test_resolve_mcp_names() {
+        let mut catalog = ToolCatalog::new();
+        let path = ToolPath::user("alice", "utils", "reverse", "1.0");
+        catalog.insert(&path, "Reverse", &[]);
+
+        assert_eq!(catalog.resolve("user_alice__utils___reverse__v1_0"), Some(&path));
+        assert!(catalog.resolve("user_alice__utils___reverse").is_none());
+
+        catalog.remove(&path);
+        assert!(catalog.resolve("user_alice__utils___reverse__v1_0").is_none());
+    }
+
+    #[test]
+    fn test_resolve_colliding_mcp_names() {
+        let mut catalog = ToolCatalog::new();
+        let dotted = ToolPath::user("alice", "utils", "reverse", "1.0");
+        let underscored = ToolPath::user("alice", "utils", "reverse", "1_0");
+        assert_eq!(dotted.mcp_name(), underscored.mcp_name());
+        let name = dotted.mcp_name().to_string();
+
+        catalog.insert(&dotted, "Reverse", &[]);
+        catalog.insert(&underscored, "Reverse again", &[]);
+        assert_eq!(catalog.resolve(&name), Some(&dotted));
+
+        // Removing either tool leaves the other one reachable
+        catalog.remove(&underscored);
+        assert_eq!(catalog.resolve(&name), Some(&dotted));
+        catalog.insert(&underscored, "Reverse again", &[]);
+        catalog.remove(&dotted);
+        assert_eq!(catalog.resolve(&name), Some(&underscored));
+
+        catalog.remove(&underscored);
+        assert!(catalog.resolve(&name).is_none());
+    }
+}